@@ -1,8 +1,19 @@
+import time
+
+# Measured from the start of the container init phase
+INIT_START = time.perf_counter()
+
 import decimal
 import json
 import logging
 import os
+import queue
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import boto3
 
 from strands_agent import StrandsAgent
 from utils.dynamo import DynamoDB
@@ -18,80 +29,177 @@ logger.setLevel(logging.INFO)
 # DynamoDB table name
 user_history_table = os.environ["USER_HISTORY_TABLE"]
 locale = os.environ["LOCALE"]
+# Conversations (phone numbers) processed in parallel within one invocation
+max_concurrent_conversations = int(os.environ.get("MAX_CONCURRENT_CONVERSATIONS", "4"))
+
+# Clients and agents are created once per container and reused by warm invocations
+whatsapp_client = boto3.client("socialmessaging")
+dynamo = DynamoDB()
+# An agent holds one conversation at a time, so each worker borrows its own
+agent_pool = queue.SimpleQueue()
+agent_pool.put(StrandsAgent())
+
+INIT_MS = (time.perf_counter() - INIT_START) * 1000
+cold_start = True
+
+TIMING_KEYS = ("setup_ms", "history_ms", "agent_ms", "store_ms", "reply_ms")
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+@contextmanager
+def borrow_agent():
+    try:
+        agent = agent_pool.get_nowait()
+    except queue.Empty:
+        agent = StrandsAgent()
+    try:
+        yield agent
+    finally:
+        agent_pool.put(agent)
 
 
-def process_record(record):
+def record_id(record, index):
+    """Identifier reported for a failed record (SNS or SQS message id)."""
+    return record.get("messageId") or record.get("Sns", {}).get("MessageId") or str(index)
+
+
+def parse_record(record):
     sns = record.get("Sns", {})
     sns_message = json.loads(sns.get("Message", "{}"), parse_float=decimal.Decimal)
     print(f"sns_message: {sns_message}")
+    return WhatsappService(sns_message, client=whatsapp_client)
 
-    whatsapp_info = WhatsappService(sns_message)
-    dynamo = DynamoDB()
-    bedrock = StrandsAgent()
-
-    for message in whatsapp_info.messages:
-        message_type = message.message.get("type")
-        print("type:", message_type)
-
-        if message_type == "text":
-            data = {
-                "message": message.message,
-                "id": message.message_id,
-                "phone_number": message.phone_number,
-                "phone_number_id": message.phone_number_id,
-                "metadata": message.metadata,
-            }
-        else:
-            data = {
-                "message": MESSAGES[locale]["error"],
-                "phone_number_id": message.phone_number_id,
-                "metadata": message.metadata,
-            }
-            logger.error("Error on input. Not text")
-            return {
-                "statusCode": 500,
-                "body": json.dumps(
-                    "Error processing input type. Video, audio, image not supported yet."
-                ),
-            }
-
-        # get history
-        history = dynamo.query_by_day(user_history_table, message.phone_number)
-        # print(f'History: {history}')
-        hist_build = (
-            history[0] if history != [] else None
-        ) 
-        print(f"History after Build: {hist_build}")
-
-        # invoking agent
-        llm_response, agent_messages, sys_prompt = bedrock.agent_invoke(
-            message.get_text(), hist_build
-        )
-        # logger.info(f'LLM answer: {llm_response}')
-
-        # Creating new row with bedrock response (for logging)
-        row = message.build_whatsapp_row(
-            phone_number=message.phone_number,
-            messages=agent_messages,
-            role="assistant",
-            meta_phone_number_id=message.meta_phone_number_id,
-            id=message.message_id,
-            phone_number_id=message.phone_number_id,
-            timestamp=message.timestamp,
-            system_prompt=sys_prompt,
-        )
 
-        # Insert Log on Dynamo (LLM answer)
-        ret = dynamo.insert_user_message(user_history_table, row)
-
-        data["message"] = remove_thinking_tags(
-            llm_response.message["content"][0]["text"]
-        )
-        logger.info(f"Data after processing: {data}")
+def process_message(whatsapp_info, message, timings):
+    message_type = message.message.get("type")
+    print("type:", message_type)
 
+    if message_type != "text":
+        logger.error("Error on input. Not text")
+        start = time.perf_counter()
         whatsapp_info.text_reply(
-            data["phone_number"], data["id"], data["phone_number_id"], data["message"]
+            message.phone_number, message.message_id, message.phone_number_id, MESSAGES[locale]["error"]
+        )
+        timings["reply_ms"] += elapsed_ms(start)
+        return "unsupported"
+
+    data = {
+        "message": message.message,
+        "id": message.message_id,
+        "phone_number": message.phone_number,
+        "phone_number_id": message.phone_number_id,
+        "metadata": message.metadata,
+    }
+
+    # get history
+    start = time.perf_counter()
+    hist_build = dynamo.get_history(user_history_table, message.phone_number)
+    timings["history_ms"] += elapsed_ms(start)
+    print(f"History after Build: {hist_build}")
+
+    # invoking agent
+    start = time.perf_counter()
+    with borrow_agent() as bedrock:
+        llm_response, turn_messages, sys_prompt = bedrock.agent_invoke(
+            message.get_text(), hist_build
         )
+    timings["agent_ms"] += elapsed_ms(start)
+    # logger.info(f'LLM answer: {llm_response}')
+
+    # Creating new row with bedrock response (for logging)
+    row = message.build_whatsapp_row(
+        phone_number=message.phone_number,
+        messages=turn_messages,
+        role="assistant",
+        meta_phone_number_id=message.meta_phone_number_id,
+        id=message.message_id,
+        phone_number_id=message.phone_number_id,
+        timestamp=message.timestamp,
+        system_prompt=sys_prompt,
+    )
+
+    # Append the messages of this turn to the history (LLM answer)
+    start = time.perf_counter()
+    ret = dynamo.append_history(user_history_table, row, hist_build, turn_messages)
+    timings["store_ms"] += elapsed_ms(start)
+
+    data["message"] = remove_thinking_tags(
+        llm_response.message["content"][0]["text"]
+    )
+    logger.info(f"Data after processing: {data}")
+
+    start = time.perf_counter()
+    whatsapp_info.text_reply(
+        data["phone_number"], data["id"], data["phone_number_id"], data["message"]
+    )
+    timings["reply_ms"] += elapsed_ms(start)
+    return "processed"
+
+
+def process_conversation(items):
+    """Process the messages of one phone number in arrival order."""
+    results = []
+    for item in items:
+        start = time.perf_counter()
+        timings = dict.fromkeys(TIMING_KEYS, 0)
+        timings["setup_ms"] = item["setup_ms"]
+        result = {"record_id": item["record_id"], "message_id": item["message"].message_id}
+        try:
+            result["status"] = process_message(item["whatsapp_info"], item["message"], timings)
+        except Exception as e:
+            # A failed turn does not stop the following messages of the conversation
+            logger.error(f"Error processing message {result['message_id']}: {str(e)}")
+            result.update(status="failed", error=str(e))
+        result.update(timings, total_ms=elapsed_ms(start))
+        results.append(result)
+    return results
+
+
+def process_records(records):
+    """
+    Process every message of a batch of SNS records.
+
+    Messages are grouped by phone number: each conversation is handled in
+    order, and different conversations run concurrently on a bounded pool.
+
+    Returns:
+        One result per message (or per record that could not be parsed) with
+        its status and timings.
+    """
+    results = []
+    conversations = OrderedDict()
+    for index, record in enumerate(records):
+        start = time.perf_counter()
+        rid = record_id(record, index)
+        try:
+            whatsapp_info = parse_record(record)
+        except Exception as e:
+            logger.error(f"Error parsing record {rid}: {str(e)}")
+            results.append({"record_id": rid, "status": "failed", "error": str(e), "total_ms": elapsed_ms(start)})
+            continue
+        setup_ms = elapsed_ms(start)
+        for position, message in enumerate(whatsapp_info.messages):
+            conversations.setdefault(message.phone_number, []).append(
+                {
+                    "record_id": rid,
+                    "whatsapp_info": whatsapp_info,
+                    "message": message,
+                    # Parsing time is counted once, on the first message of the record
+                    "setup_ms": setup_ms if position == 0 else 0,
+                }
+            )
+
+    if len(conversations) == 1:
+        results.extend(process_conversation(next(iter(conversations.values()))))
+    elif conversations:
+        workers = min(max_concurrent_conversations, len(conversations))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for conversation_results in executor.map(process_conversation, conversations.values()):
+                results.extend(conversation_results)
+    return results
 
 
 def remove_thinking_tags(text):
@@ -106,12 +214,42 @@ def remove_thinking_tags(text):
         raise
 
 
+def log_invocation_metrics(start, results, records):
+    """Log one JSON line per message and per invocation, to compare cold and warm start overhead."""
+    global cold_start
+    for result in results:
+        logger.info(json.dumps({"metric": "message_latency", **result}))
+    metrics = {
+        "metric": "invocation_latency",
+        "cold_start": cold_start,
+        "init_ms": round(INIT_MS, 2) if cold_start else 0,
+        "handler_ms": elapsed_ms(start),
+        "records": records,
+        "messages": len(results),
+        "failed": sum(result["status"] == "failed" for result in results),
+        "slowest_message_ms": max((result["total_ms"] for result in results), default=0),
+    }
+    for key in TIMING_KEYS:
+        metrics[key] = round(sum(result.get(key, 0) for result in results), 2)
+    cold_start = False
+    logger.info(json.dumps(metrics))
+
+
 def lambda_handler(event, context):
+    start = time.perf_counter()
+    records = event.get("Records", [])
+    results = []
     try:
-        records = event.get("Records", [])
-        for record in records:
-            process_record(record)
-        return {"statusCode": 200, "body": json.dumps("Success")}
+        results = process_records(records)
+        failed = list(OrderedDict.fromkeys(r["record_id"] for r in results if r["status"] == "failed"))
+        return {
+            "statusCode": 500 if failed else 200,
+            "body": json.dumps("Error processing request" if failed else "Success"),
+            # Honoured by Lambda for SQS event sources, informational for SNS
+            "batchItemFailures": [{"itemIdentifier": rid} for rid in failed],
+        }
     except Exception as e:
         logger.error(f"Error processing event: {str(e)}")
         return {"statusCode": 500, "body": json.dumps("Error processing request")}
+    finally:
+        log_invocation_metrics(start, results, len(records))
@@ -2,6 +2,9 @@ import os
 import logging
 
 from strands import Agent
+from strands.agent.state import AgentState
+from strands.models import BedrockModel
+from strands.telemetry.metrics import EventLoopMetrics
 
 from tools.cards import get_transactions, put_payment
 from tools.promo import get_promotions, get_day_of_week
@@ -13,31 +16,54 @@ DEFAULT_MODEL=os.environ['DEFAULT_MODEL']
 # Logger configuration
 logger = logging.getLogger()
 
+# Built once per container and shared by every invocation it serves
+TOOLS = [get_transactions, put_payment, get_promotions, get_day_of_week]
+MODEL = BedrockModel(model_id=DEFAULT_MODEL)
+
 
 class StrandsAgent():
     def __init__(self):
         self.agent = Agent(
             system_prompt=MESSAGES[STARTUP_LOCALE]["system"],
-            tools=[get_transactions, put_payment, get_promotions, get_day_of_week],
-            model=DEFAULT_MODEL,
+            tools=TOOLS,
+            model=MODEL,
         )
+
     def get_agent_with_history(self, messages, system_prompt):
-        self.agent = Agent(
-            messages=messages,
-            system_prompt=system_prompt,
-            tools=[get_transactions, put_payment, get_promotions, get_day_of_week],
-            model=DEFAULT_MODEL,
-        )
+        """Load a conversation into the existing agent instead of building a new one."""
+        self.agent.messages = list(messages)
+        self.agent.system_prompt = system_prompt or MESSAGES[STARTUP_LOCALE]["system"]
+        # Metrics and state belong to the previous conversation, a fresh agent starts without them
+        self.agent.event_loop_metrics = EventLoopMetrics()
+        self.agent.state = AgentState()
+        # The stored history keeps every turn of the day, the model only sees the recent window
+        self.agent.conversation_manager.apply_management(self.agent)
+
+    def turn_messages(self, previous_ids):
+        """
+        Messages added by the last turn.
+
+        The conversation manager trims the oldest messages after each turn, so the
+        new messages are the tail of the list after the last message that was
+        already in the conversation, not an offset from its previous length.
+        """
+        messages = self.agent.messages
+        start = len(messages)
+        while start > 0 and id(messages[start - 1]) not in previous_ids:
+            start -= 1
+        return messages[start:]
 
     def agent_invoke(self, user_prompt, history=None):
         try:
             if history is not None:
                 self.get_agent_with_history(messages=history["messages"], system_prompt=history["system_prompt"])
-                result = self.agent(user_prompt)
             else:
-                result = self.agent(user_prompt)
+                # The agent is reused across invocations, so start from an empty conversation
+                self.get_agent_with_history(messages=[], system_prompt=None)
+            previous_ids = {id(message) for message in self.agent.messages}
+            result = self.agent(user_prompt)
             logger.info(f"Agent result: {result}")
-            return result, self.agent.messages, self.agent.system_prompt
+            return result, self.turn_messages(previous_ids), self.agent.system_prompt
         except Exception as e:
             logger.info(f"Error during agent invocation: {e}")
-            raise
\ No newline at end of file
+            raise
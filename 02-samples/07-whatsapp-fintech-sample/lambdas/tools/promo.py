@@ -1,5 +1,7 @@
 import boto3
 import os
+import threading
+import time
 
 from strands import tool
 from boto3.dynamodb.conditions import Key
@@ -7,8 +9,18 @@ from datetime import datetime
 
 
 DEFAULT_LOCALE=os.environ['LOCALE']
-dynamodb_resource=boto3.resource('dynamodb')
+# boto3 resources are not thread-safe, every thread running the tools gets its own
+_local = threading.local()
 dynamodb_table=os.getenv('PROMO_TABLE')
+# Promotions rarely change, so lookups are served from memory for this long
+PROMO_CACHE_TTL_SECONDS=int(os.getenv('PROMO_CACHE_TTL_SECONDS', '3600'))
+MAX_BATCH_WRITE_ATTEMPTS=5
+
+# (week_day, locale) -> (expires_at, promotions)
+_promo_cache = {}
+_cache_lock = threading.Lock()
+_seed_lock = threading.Lock()
+_seeded = False
 
 translations = {
     "pt_BR": {
@@ -35,12 +47,19 @@ translations = {
     }
 }
 
+def get_dynamodb_resource():
+    resource = getattr(_local, 'dynamodb_resource', None)
+    if resource is None:
+        resource = boto3.session.Session().resource('dynamodb')
+        _local.dynamodb_resource = resource
+    return resource
+
 def get_translation(key, **kwargs):
     return translations[DEFAULT_LOCALE][key].format(**kwargs)
 
 def read_dynamodb(table_name: str, pk_value: str):
     try:
-        table = dynamodb_resource.Table(table_name)
+        table = get_dynamodb_resource().Table(table_name)
         # Create expression
         key_expression = Key('week_day').eq(pk_value)
         query_data = table.query(KeyConditionExpression=key_expression)
@@ -49,25 +68,58 @@ def read_dynamodb(table_name: str, pk_value: str):
         print(f'Error querying table: {table_name}.')
         print(f'Exception: {err}')
 
-def load_data(week_day):
-    try:
-        promotions = [
-            {"week_day": 0, "promo1": get_translation("promo1_platinum"), "promo2": get_translation("promo2_diamond")},
-            {"week_day": 1, "promo1": get_translation("promo1_gold"), "promo2": get_translation("promo2_brinde")},
-            {"week_day": 2, "promo1": get_translation("promo1_platinum"), "promo2": get_translation("promo2_brinde")},
-            {"week_day": 3, "promo1": get_translation("promo1_marketplace")},
-            {"week_day": 4, "promo1": get_translation("promo1_seguro"), "promo2": get_translation("promo1_platinum")},
-            {"week_day": 5, "promo1": get_translation("promo2_brinde")},
-            {"week_day": 6, "promo1": get_translation("promo2_diamond"), "promo2": get_translation("promo2_brinde")}
-        ]
-        
-        table = dynamodb_resource.Table(dynamodb_table)
+def build_promotions():
+    return [
+        {"week_day": 0, "promo1": get_translation("promo1_platinum"), "promo2": get_translation("promo2_diamond")},
+        {"week_day": 1, "promo1": get_translation("promo1_gold"), "promo2": get_translation("promo2_brinde")},
+        {"week_day": 2, "promo1": get_translation("promo1_platinum"), "promo2": get_translation("promo2_brinde")},
+        {"week_day": 3, "promo1": get_translation("promo1_marketplace")},
+        {"week_day": 4, "promo1": get_translation("promo1_seguro"), "promo2": get_translation("promo1_platinum")},
+        {"week_day": 5, "promo1": get_translation("promo2_brinde")},
+        {"week_day": 6, "promo1": get_translation("promo2_diamond"), "promo2": get_translation("promo2_brinde")}
+    ]
 
+def load_data():
+    """
+        Seed the promotions table with a single batch write.
+
+        Writing the same seven items is idempotent, so containers cold starting
+        at the same time can all seed safely; within a container the seed runs once.
+    """
+    global _seeded
+    with _seed_lock:
+        if _seeded:
+            return True
+        promotions = build_promotions()
+        try:
+            request_items = {dynamodb_table: [{"PutRequest": {"Item": promo}} for promo in promotions]}
+            for attempt in range(MAX_BATCH_WRITE_ATTEMPTS):
+                response = get_dynamodb_resource().batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems')
+                if not request_items:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise RuntimeError(f"{len(request_items[dynamodb_table])} promotions left unprocessed")
+        except Exception as err:
+            print(get_translation("error_insert", dynamodb_table=dynamodb_table))
+            print(f'Exception: {err}')
+            return False
+        _seeded = True
         for promo in promotions:
-            response = table.put_item(Item=promo)
-    except Exception as err:
-        print(f'Error inserting on table: {dynamodb_table}.')
-        print(f'Exception: {err}')
+            cache_promotions(promo["week_day"], [promo])
+        return True
+
+def cached_promotions(week_day):
+    with _cache_lock:
+        entry = _promo_cache.get((int(week_day), DEFAULT_LOCALE))
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return [dict(promo) for promo in entry[1]]
+
+def cache_promotions(week_day, promotions):
+    with _cache_lock:
+        _promo_cache[(int(week_day), DEFAULT_LOCALE)] = (time.monotonic() + PROMO_CACHE_TTL_SECONDS, promotions)
 
 @tool
 def get_promotions() -> str:
@@ -79,11 +131,17 @@ def get_promotions() -> str:
     #print(f'env-var table: {dynamodb_table}')
     # Day of the week
     week_day = get_day_of_week()
-    
+
+    response = cached_promotions(week_day)
+    if response is not None:
+        return response
+
     response = read_dynamodb(dynamodb_table, week_day)
-    if not response:
-        load_data(week_day)
-        response = read_dynamodb(dynamodb_table, week_day)
+    if response:
+        cache_promotions(week_day, response)
+    elif load_data():
+        # Seeding fills the cache for every day of the week
+        response = cached_promotions(week_day) or read_dynamodb(dynamodb_table, week_day)
     return response
 
 @tool
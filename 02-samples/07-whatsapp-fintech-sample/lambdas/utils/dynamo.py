@@ -1,15 +1,35 @@
 import boto3
 import logging
+import threading
 from datetime import datetime
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 
 
 logger = logging.getLogger(__name__)
 
+# History items of a day are stored under the sort key "<day>#<seq>", one item per
+# turn holding only the messages added by that turn. Items written before this
+# layout use the bare "<day>" sort key and hold the whole conversation.
+SEQ_SEPARATOR = "#"
+SEQ_WIDTH = 6
+MAX_APPEND_ATTEMPTS = 5
+
 
 class DynamoDB:
-    def __init__(self) -> None:
-        self.client = boto3.resource('dynamodb')
+    def __init__(self, **resource_kwargs) -> None:
+        # boto3 resources are not thread-safe and turns of different conversations
+        # run in parallel, so every thread builds its own from its own session
+        self.resource_kwargs = resource_kwargs
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        resource = getattr(self._local, "resource", None)
+        if resource is None:
+            resource = boto3.session.Session().resource('dynamodb', **self.resource_kwargs)
+            self._local.resource = resource
+        return resource
 
     def save_item_ddb(self, table, item):
         try:
@@ -32,20 +52,89 @@ class DynamoDB:
             logger.error("Error querying DynamoDB: %s", e)
             raise
 
-    def query_by_day(self, table, phone_number):
+    def query_all(self, table, key_condition, **kwargs):
+        """Run a Query and follow LastEvaluatedKey until every page has been read."""
+        dynamo_table = self.client.Table(table)
+        items = []
+        while True:
+            response = dynamo_table.query(KeyConditionExpression=key_condition, **kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def query_by_day(self, table, phone_number, day=None):
+        """Return the history items of a phone number for a day (today by default), in order."""
         try:
-            dynamo_table = self.client.Table(table)
-            current_day = datetime.now().strftime("%Y/%m/%d")
-            response = dynamo_table.scan(
-                FilterExpression=Key('phone_number').eq(phone_number) & Key('day').eq(current_day)
+            current_day = day or datetime.now().strftime("%Y/%m/%d")
+            items = self.query_all(
+                table,
+                Key('phone_number').eq(phone_number) & Key('day').begins_with(current_day),
+                ConsistentRead=True,
             )
-            logger.info("Query by day successful: %s", response)
-            #print("Query by day successful: %s", response)
-            return response['Items']
+            logger.info("Query by day returned %d items", len(items))
+            return items
         except Exception as e:
             logger.error("Error querying by day from DynamoDB: %s", e)
             raise
 
+    def get_history(self, table, phone_number, day=None):
+        """
+        Rebuild the conversation of a phone number for a day.
+
+        Returns None when there is no history, otherwise a dict with the
+        concatenated "messages", the latest "system_prompt" and the "next_seq"
+        to use when appending the next turn.
+        """
+        items = self.query_by_day(table, phone_number, day)
+        if not items:
+            return None
+        history = {"messages": [], "system_prompt": None, "next_seq": 0}
+        for item in items:
+            # Legacy items (bare day sort key) sort first and hold the full list
+            history["messages"].extend(item.get("messages", []))
+            if item.get("system_prompt"):
+                history["system_prompt"] = item["system_prompt"]
+            if "seq" in item:
+                history["next_seq"] = int(item["seq"]) + 1
+        return history
+
+    def append_history(self, table, row, history, messages):
+        """
+        Store the messages added by one turn as a new history item.
+
+        Args:
+            table: History table name
+            row: Item attributes built by WhatsappMessage.build_whatsapp_row
+            history: Result of get_history before the turn (None for a new conversation)
+            messages: Messages added by the turn
+
+        Returns:
+            The sequence number of the new item
+        """
+        seq = history["next_seq"] if history else 0
+        item = dict(row, messages=list(messages), session_day=row["day"])
+        if history and history.get("system_prompt") == row.get("system_prompt"):
+            # Stored once per day, on the first item and whenever it changes
+            item.pop("system_prompt", None)
+        dynamo_table = self.client.Table(table)
+        for _ in range(MAX_APPEND_ATTEMPTS):
+            item["seq"] = seq
+            item["day"] = f"{row['day']}{SEQ_SEPARATOR}{seq:0{SEQ_WIDTH}d}"
+            try:
+                dynamo_table.put_item(
+                    Item=item,
+                    ConditionExpression="attribute_not_exists(phone_number)",
+                )
+                return seq
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    logger.error("Error appending history to DynamoDB: %s", e)
+                    raise
+                # Another turn took this sequence number, append after it
+                seq += 1
+        raise RuntimeError(f"Could not append history after {MAX_APPEND_ATTEMPTS} attempts")
+
     def insert_user_message(self, table, row):
         try:
             
@@ -0,0 +1,168 @@
+"""
+Load test of the WhatsApp user history access paths against a local DynamoDB.
+
+Simulates conversation turns (read the day's history, then store the new messages)
+for many users and days, and compares:
+
+  - scan:  the previous path, a Scan filtered on phone_number and day followed by a
+           put of the whole conversation
+  - query: a Query on the phone_number + day key followed by an append of the
+           turn's messages only
+
+Reports turn latency, read capacity consumed and bytes written per turn (moto does not
+meter capacity, use DynamoDB Local for realistic read units). Run it against DynamoDB Local, or
+without --endpoint-url to use moto's in-memory DynamoDB if it is installed.
+
+Usage:
+    docker run -p 8000:8000 amazon/dynamodb-local
+    python scripts/load_test_history.py --endpoint-url http://localhost:8000 --users 200 --days 5 --turns 2000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambdas"))
+from utils.dynamo import DynamoDB  # noqa: E402
+
+TEXT = "Could you show me my card transactions from last week and any promotion for today? " * 3
+
+
+def create_table(client, name):
+    client.create_table(
+        TableName=name,
+        BillingMode="PAY_PER_REQUEST",
+        KeySchema=[
+            {"AttributeName": "phone_number", "KeyType": "HASH"},
+            {"AttributeName": "day", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "phone_number", "AttributeType": "S"},
+            {"AttributeName": "day", "AttributeType": "S"},
+        ],
+    )
+    client.get_waiter("table_exists").wait(TableName=name)
+
+
+def turn_messages():
+    return [
+        {"role": "user", "content": [{"text": TEXT}]},
+        {"role": "assistant", "content": [{"text": TEXT}]},
+    ]
+
+
+def item_bytes(messages):
+    """Approximate size of the messages written by a turn."""
+    return len(json.dumps(messages, default=str))
+
+
+def capacity(response):
+    return response.get("ConsumedCapacity", {}).get("CapacityUnits", 0) or 0
+
+
+def scan_turn(table, phone_number, day):
+    """The previous access path: scan for the day's item, then rewrite it whole."""
+    start = time.perf_counter()
+    items, units, kwargs = [], 0.0, {}
+    while True:
+        response = table.scan(
+            FilterExpression=Attr("phone_number").eq(phone_number) & Attr("day").eq(day),
+            ReturnConsumedCapacity="TOTAL",
+            **kwargs,
+        )
+        items.extend(response["Items"])
+        units += capacity(response)
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    messages = (items[0]["messages"] if items else []) + turn_messages()
+    table.put_item(
+        Item={"phone_number": phone_number, "day": day, "messages": messages, "system_prompt": "system"}
+    )
+    return time.perf_counter() - start, units, item_bytes(messages)
+
+
+def query_turn(dynamo, table, table_name, phone_number, day):
+    """The current access path: query the day's items, then append the turn."""
+    start = time.perf_counter()
+    history = dynamo.get_history(table_name, phone_number, day)
+    messages = turn_messages()
+    row = {"phone_number": phone_number, "day": day, "system_prompt": "system", "id": str(uuid.uuid4())}
+    dynamo.append_history(table_name, row, history, messages)
+    elapsed = time.perf_counter() - start
+
+    # Capacity of the history read, measured outside the timed turn
+    response = table.query(
+        KeyConditionExpression=Key("phone_number").eq(phone_number) & Key("day").begins_with(day),
+        ConsistentRead=True,
+        ReturnConsumedCapacity="TOTAL",
+    )
+    return elapsed, capacity(response), item_bytes(messages)
+
+
+def run(path, args, dynamo, resource):
+    table_name = f"history-{path}-{uuid.uuid4().hex[:8]}"
+    create_table(resource.meta.client, table_name)
+    table = resource.Table(table_name)
+    rng = random.Random(7)
+    users = [f"55119{index:08d}" for index in range(args.users)]
+    days = [f"2025/01/{day + 1:02d}" for day in range(args.days)]
+
+    latencies, read_units, written = [], [], []
+    for _ in range(args.turns):
+        phone_number, day = rng.choice(users), rng.choice(days)
+        if path == "scan":
+            elapsed, reads, size = scan_turn(table, phone_number, day)
+        else:
+            elapsed, reads, size = query_turn(dynamo, table, table_name, phone_number, day)
+        latencies.append(elapsed * 1000)
+        read_units.append(reads)
+        written.append(size)
+
+    latencies.sort()
+    print(
+        f"{path:<6} turns={args.turns:<6} "
+        f"p50={statistics.median(latencies):8.2f} ms  "
+        f"p95={latencies[max(int(len(latencies) * 0.95) - 1, 0)]:8.2f} ms  "
+        f"read units/turn={statistics.mean(read_units):8.2f}  "
+        f"bytes written/turn={statistics.mean(written):10.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the user history access paths")
+    parser.add_argument("--endpoint-url", default=None, help="DynamoDB Local endpoint (default: moto)")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=1000)
+    args = parser.parse_args()
+    os.environ.setdefault("AWS_DEFAULT_REGION", args.region)
+
+    if args.endpoint_url:
+        mock = contextlib.nullcontext()
+    else:
+        from moto import mock_aws
+
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        mock = mock_aws()
+
+    with mock:
+        resource = boto3.resource("dynamodb", endpoint_url=args.endpoint_url, region_name=args.region)
+        dynamo = DynamoDB(endpoint_url=args.endpoint_url, region_name=args.region)
+        for path in ("scan", "query"):
+            run(path, args, dynamo, resource)
+
+
+if __name__ == "__main__":
+    main()
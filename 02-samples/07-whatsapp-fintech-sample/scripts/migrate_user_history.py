@@ -0,0 +1,76 @@
+"""
+Migrate WhatsApp user history items to the per-turn layout.
+
+Items written before the per-turn layout use the bare "<day>" sort key and hold the
+whole conversation of the day. The Lambda reads them as they are, so migrating is
+optional; this script rewrites each one as the base item "<day>#" of its day (it
+sorts before the "<day>#<seq>" turn items) and deletes the original in the same
+transaction.
+
+Usage:
+    python scripts/migrate_user_history.py --table WhatsAppUserHistory            # dry run
+    python scripts/migrate_user_history.py --table WhatsAppUserHistory --apply
+"""
+
+import argparse
+import os
+import sys
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambdas"))
+from utils.dynamo import SEQ_SEPARATOR  # noqa: E402
+
+
+def legacy_items(client, table):
+    """Yield the items whose sort key has no sequence suffix."""
+    paginator = client.get_paginator("scan")
+    for page in paginator.paginate(TableName=table):
+        for item in page["Items"]:
+            if SEQ_SEPARATOR not in item["day"]["S"]:
+                yield item
+
+
+def migrate_item(client, table, item):
+    """Rewrite one legacy item as the base item of its day."""
+    day = item["day"]["S"]
+    migrated = dict(item, day={"S": f"{day}{SEQ_SEPARATOR}"}, session_day={"S": day})
+    client.transact_write_items(
+        TransactItems=[
+            {
+                "Put": {
+                    "TableName": table,
+                    "Item": migrated,
+                    "ConditionExpression": "attribute_not_exists(phone_number)",
+                }
+            },
+            {
+                "Delete": {
+                    "TableName": table,
+                    "Key": {"phone_number": item["phone_number"], "day": item["day"]},
+                }
+            },
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate user history items to the per-turn layout")
+    parser.add_argument("--table", default="WhatsAppUserHistory", help="History table name")
+    parser.add_argument("--endpoint-url", default=None, help="DynamoDB endpoint (e.g. DynamoDB Local)")
+    parser.add_argument("--apply", action="store_true", help="Write the changes (default: dry run)")
+    args = parser.parse_args()
+
+    client = boto3.client("dynamodb", endpoint_url=args.endpoint_url)
+    migrated = 0
+    for item in legacy_items(client, args.table):
+        phone_number, day = item["phone_number"]["S"], item["day"]["S"]
+        if args.apply:
+            migrate_item(client, args.table, item)
+        print(f"{'Migrated' if args.apply else 'Would migrate'} {phone_number} {day}")
+        migrated += 1
+    print(f"{migrated} legacy items {'migrated' if args.apply else 'found'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,15 @@ from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExport
 from strands import Agent
 from strands_tools import calculator
 from strands.models import BedrockModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from utils.prompts import analyzer_prompt, rewriter_prompt, validator_prompt
+from utils.workload import optimize_workload as run_workload, read_query_log
+from utils.benchmark import compare_queries
 from utils.tools import (
+    benchmark_rewrite,
+    extract_sql,
     get_query_execution_plan,
+    get_query_execution_plans,
     suggest_optimizations,
     validate_query_cost,
 )
@@ -25,6 +30,7 @@ import os
 import random
 import re
 import sqlite3
+import threading
 import uuid
 
 # Initialize OpenTelemetry
@@ -62,35 +68,53 @@ model = BedrockModel(
     max_tokens=2000,
 )
 
+def create_agents() -> Tuple[Agent, Agent, Agent]:
+    """Create the analyzer, rewriter and validator agents."""
+    analyzer = Agent(
+        model=model,
+        system_prompt=analyzer_prompt,
+        tools=[get_query_execution_plan, get_query_execution_plans, calculator],
+    )
+    rewriter = Agent(
+        model=model,
+        system_prompt=rewriter_prompt,
+        tools=[suggest_optimizations, calculator],
+    )
+    validator = Agent(
+        model=model,
+        system_prompt=validator_prompt,
+        tools=[validate_query_cost, benchmark_rewrite, calculator],
+    )
+    return analyzer, rewriter, validator
+
+
 # Define agents
-analyzer_agent = Agent(
-    model=model,
-    system_prompt=analyzer_prompt,
-    tools=[get_query_execution_plan, calculator],
-)
-rewriter_agent = Agent(
-    model=model,
-    system_prompt=rewriter_prompt,
-    tools=[suggest_optimizations, calculator],
-)
-validator_agent = Agent(
-    model=model, system_prompt=validator_prompt, tools=[validate_query_cost, calculator]
-)
+analyzer_agent, rewriter_agent, validator_agent = create_agents()
+
+# Agents keep conversation state, so each workload worker thread gets its own set
+_worker_agents = threading.local()
 
 
-def optimize_query(query: str) -> Dict[str, Any]:
+def optimize_query(query: str, agents: Optional[Tuple[Agent, Agent, Agent]] = None) -> Dict[str, Any]:
     """
     Orchestrates the multi-agent query optimization workflow.
 
     Args:
         query (str): The SQL query to optimize.
+        agents (Tuple): Optional (analyzer, rewriter, validator) agents to use
+            instead of the module-level ones.
 
     Returns:
         Dict: Final optimization report with analysis, suggestions, and validation.
     """
+    analyzer, rewriter, validator = agents or (
+        analyzer_agent,
+        rewriter_agent,
+        validator_agent,
+    )
     with tracer.start_as_current_span("optimize_query"):
         try:
-            analysis_result = analyzer_agent(f"Analyze query: {query}")
+            analysis_result = analyzer(f"Analyze query: {query}")
         except Exception as e:
             print(f"Bedrock error in analyzer_agent: {str(e)}")
             analysis = {
@@ -142,7 +166,7 @@ def optimize_query(query: str) -> Dict[str, Any]:
 
         rewriter_input = f"Query: {query}\nExecution Plan: {json.dumps(analysis)}"
         try:
-            rewrite_result = rewriter_agent(rewriter_input)
+            rewrite_result = rewriter(rewriter_input)
         except Exception as e:
             print(f"Bedrock error in rewriter_agent: {str(e)}")
             suggestions = {"status": "error", "message": str(e)}
@@ -172,16 +196,30 @@ def optimize_query(query: str) -> Dict[str, Any]:
                 print(f"Error parsing rewrite result: {str(e)}")
                 suggestions = {"status": "error", "message": str(e)}
 
-        rewritten_query = next(
+        suggestion = next(
             (
                 s["suggestion"]
                 for s in suggestions.get("suggestions", [])
                 if s["type"] == "query_rewrite"
             ),
-            query,
+            None,
         )
+        # Suggestions may wrap the query in prose ("Use selective filters: SELECT ...")
+        rewritten_query = extract_sql(suggestion) if suggestion else None
+        # Measure the rewrite instead of trusting the plan alone
+        benchmark = None
+        validator_input = f"Validate query: {rewritten_query or suggestion or query}"
+        if rewritten_query and rewritten_query != query:
+            try:
+                benchmark = compare_queries(query, rewritten_query)
+            except sqlite3.Error as e:
+                benchmark = {"status": "error", "message": str(e)}
+            validator_input += (
+                f"\nOriginal query: {query}"
+                f"\nMeasured benchmark: {json.dumps(benchmark)}"
+            )
         try:
-            validation_result = validator_agent(f"Validate query: {rewritten_query}")
+            validation_result = validator(validator_input)
         except Exception as e:
             print(f"Bedrock error in validator_agent: {str(e)}")
             validation = {"status": "error", "message": str(e)}
@@ -217,6 +255,7 @@ def optimize_query(query: str) -> Dict[str, Any]:
             "analysis": analysis,
             "suggestions": suggestions,
             "validation": validation,
+            "benchmark": benchmark,
         }
 
         span = trace.get_current_span()
@@ -225,6 +264,17 @@ def optimize_query(query: str) -> Dict[str, Any]:
         return report
 
 
+def optimize_workload_query(query: str) -> Dict[str, Any]:
+    """Optimize one workload query with fresh agents owned by the current thread."""
+    if not hasattr(_worker_agents, "agents"):
+        _worker_agents.agents = create_agents()
+    analyzer, rewriter, validator = _worker_agents.agents
+    # Start every query from an empty conversation
+    for agent in (analyzer, rewriter, validator):
+        agent.messages.clear()
+    return optimize_query(query, agents=(analyzer, rewriter, validator))
+
+
 @click.group()
 def cli():
     """CLI for interacting with the query optimizer."""
@@ -250,6 +300,51 @@ def explain_query(query):
     print(json.dumps(result, indent=2))
 
 
+@cli.command()
+@click.argument("query_log", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", default=4, show_default=True, help="Queries optimized concurrently.")
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="JSONL checkpoint file (default: <QUERY_LOG>.checkpoint.jsonl).",
+)
+@click.option("--limit", type=int, default=None, help="Process at most this many new query fingerprints.")
+@click.option("--top", type=int, default=20, show_default=True, help="Entries of the ranking to print.")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the full report to this file.")
+def optimize_workload(query_log, workers, checkpoint, limit, top, output):
+    """Optimize a query log and rank rewrites by frequency-weighted savings."""
+    with tracer.start_as_current_span("optimize_workload"):
+        queries = read_query_log(query_log)
+        report = run_workload(
+            queries,
+            optimize_workload_query,
+            checkpoint_path=checkpoint or f"{query_log}.checkpoint.jsonl",
+            max_workers=workers,
+            limit=limit,
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    summary = dict(report)
+    summary["ranking"] = [
+        {key: value for key, value in entry.items() if key != "report"}
+        for entry in report["ranking"][:top]
+    ]
+    print(json.dumps(summary, indent=2))
+
+
+@cli.command()
+@click.argument("original_query")
+@click.argument("rewritten_query")
+@click.option("--warmup", default=2, show_default=True, help="Untimed runs before measuring.")
+@click.option("--runs", default=10, show_default=True, help="Timed runs of each query.")
+def benchmark_query(original_query, rewritten_query, warmup, runs):
+    """Time a rewritten query against the original and check the results match."""
+    result = compare_queries(original_query, rewritten_query, warmup=warmup, runs=runs)
+    print(json.dumps(result, indent=2))
+
+
 @cli.command()
 def create_bank_table():
     """Create a bank table with id and balance columns."""
@@ -2,12 +2,45 @@
 Initialize SQLite database with sample sales_data table.
 """
 
+import argparse
+import random
 import sqlite3
+from datetime import date, timedelta
 
+SAMPLE_ROWS = [
+    (1, 101, "2025-01-01", 100.50),
+    (2, 102, "2025-01-02", 200.75),
+    (3, 101, "2025-01-03", 150.25),
+]
 
-def init_db():
-    """Create and populate sales_data table."""
-    conn = sqlite3.connect("query_optimizer.db")
+
+def synthetic_rows(start: int, rows: int, seed: int = 42):
+    """
+    Generate synthetic sales rows with order ids from `start` up to `rows`.
+
+    Customers are skewed (a few large customers place most orders) and dates span
+    three years, so filters on customer_id and order_date have realistic selectivity.
+    """
+    rng = random.Random(seed + start)
+    customers = max(rows // 20, 10)
+    first_day = date(2023, 1, 1)
+    for order_id in range(start, rows + 1):
+        customer_id = 100 + min(int(rng.paretovariate(1.2)) - 1, customers - 1)
+        order_date = first_day + timedelta(days=rng.randrange(3 * 365))
+        yield (order_id, customer_id, order_date.isoformat(), round(rng.uniform(5, 2000), 2))
+
+
+def init_db(rows: int = 3, db_path: str = "query_optimizer.db", batch_size: int = 50000):
+    """
+    Create and populate sales_data table.
+
+    Args:
+        rows (int): Number of orders. The first three are the sample rows, the
+            rest are synthetic.
+        db_path (str): SQLite database file.
+        batch_size (int): Rows inserted per transaction.
+    """
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -19,19 +52,32 @@ def init_db():
         )
     """
     )
-    cursor.executemany(
+    insert = (
         "INSERT OR IGNORE INTO sales_data (order_id, customer_id, order_date, amount) "
-        "VALUES (?, ?, ?, ?)",
-        [
-            (1, 101, "2025-01-01", 100.50),
-            (2, 102, "2025-01-02", 200.75),
-            (3, 101, "2025-01-03", 150.25),
-        ],
+        "VALUES (?, ?, ?, ?)"
     )
+    cursor.executemany(insert, SAMPLE_ROWS)
     conn.commit()
+    if rows > len(SAMPLE_ROWS):
+        generated = synthetic_rows(len(SAMPLE_ROWS) + 1, rows)
+        while True:
+            batch = [row for _, row in zip(range(batch_size), generated)]
+            if not batch:
+                break
+            cursor.executemany(insert, batch)
+            conn.commit()
+        # Refresh the statistics used by the cost estimates
+        cursor.execute("ANALYZE")
+        conn.commit()
     conn.close()
     print("Database initialized with sales_data table.")
 
 
 if __name__ == "__main__":
-    init_db()
+    parser = argparse.ArgumentParser(description="Initialize the query optimizer database")
+    parser.add_argument(
+        "--rows", type=int, default=3, help="Number of sales_data rows (default: 3 sample rows)"
+    )
+    parser.add_argument("--db-path", default="query_optimizer.db", help="SQLite database file")
+    args = parser.parse_args()
+    init_db(rows=args.rows, db_path=args.db_path)
@@ -0,0 +1,103 @@
+"""
+Unit tests for the query benchmarking harness.
+"""
+
+import unittest
+import os
+import sqlite3
+import tempfile
+from scripts.init_db import init_db
+from utils.benchmark import benchmark_query, compare_queries, has_outer_order_by
+
+
+class TestBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db_path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        init_db(rows=5000, db_path=cls.db_path)
+
+    def test_init_db_scale(self):
+        conn = sqlite3.connect(self.db_path)
+        count = conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0]
+        first = conn.execute("SELECT * FROM sales_data WHERE order_id = 1").fetchone()
+        stats = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = 'sales_data'").fetchone()
+        conn.close()
+        self.assertEqual(count, 5000)
+        self.assertEqual(first, (1, 101, "2025-01-01", 100.50))
+        self.assertEqual(stats[0], "5000")
+
+    def test_benchmark_query_measurements(self):
+        result = benchmark_query(
+            "SELECT * FROM sales_data WHERE amount > 1000", self.db_path, warmup=1, runs=5
+        )
+        self.assertEqual(result["runs"], 5)
+        self.assertLessEqual(result["min_ms"], result["median_ms"])
+        self.assertLessEqual(result["median_ms"], result["p95_ms"])
+        self.assertGreater(result["rows_returned"], 0)
+        self.assertEqual(result["rows_scanned_estimate"], 5000.0)
+        self.assertGreater(result["vm_instructions"], 0)
+
+    def test_equivalent_rewrite(self):
+        result = compare_queries(
+            "SELECT * FROM sales_data WHERE customer_id = 101",
+            "SELECT order_id, customer_id, order_date, amount FROM sales_data "
+            "WHERE customer_id = 101 ORDER BY amount",
+            self.db_path,
+            warmup=1,
+            runs=3,
+        )
+        self.assertTrue(result["equivalent_results"])
+        self.assertIsNotNone(result["speedup"])
+
+    def test_different_results_are_never_faster(self):
+        result = compare_queries(
+            "SELECT * FROM sales_data WHERE amount > 1000",
+            "SELECT order_id, customer_id FROM sales_data WHERE amount > 1000",
+            self.db_path,
+            warmup=1,
+            runs=3,
+        )
+        self.assertFalse(result["equivalent_results"])
+        self.assertFalse(result["faster"])
+
+    def test_writes_are_rejected(self):
+        for query in (
+            "DROP TABLE sales_data",
+            "DELETE FROM sales_data",
+            "SELECT 1; DROP TABLE sales_data",
+        ):
+            with self.assertRaises(sqlite3.Error):
+                compare_queries("SELECT * FROM sales_data", query, self.db_path, warmup=1, runs=1)
+        # A WITH prefix passes the statement check but the connection is read-only
+        with self.assertRaises(sqlite3.Error):
+            benchmark_query(
+                "WITH doomed AS (SELECT 1) DELETE FROM sales_data", self.db_path, warmup=1, runs=1
+            )
+        conn = sqlite3.connect(self.db_path)
+        count = conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 5000)
+
+    def test_only_outer_order_by_defines_row_order(self):
+        self.assertFalse(has_outer_order_by("SELECT rank() OVER (ORDER BY amount) FROM sales_data"))
+        self.assertFalse(has_outer_order_by("SELECT * FROM sales_data WHERE note = 'order by'"))
+        self.assertFalse(has_outer_order_by("SELECT * FROM (SELECT * FROM sales_data ORDER BY amount)"))
+        self.assertTrue(
+            has_outer_order_by(
+                "WITH s AS (SELECT * FROM sales_data) SELECT * FROM s ORDER  BY amount;"
+            )
+        )
+
+    def test_row_order_matters_when_both_queries_order(self):
+        result = compare_queries(
+            "SELECT order_id FROM sales_data ORDER BY order_id",
+            "SELECT order_id FROM sales_data ORDER BY order_id DESC",
+            self.db_path,
+            warmup=1,
+            runs=1,
+        )
+        self.assertFalse(result["equivalent_results"])
+
+
+if __name__ == "__main__":
+    unittest.main()
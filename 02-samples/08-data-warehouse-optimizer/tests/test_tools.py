@@ -5,8 +5,18 @@ Unit tests for SQLite database tools.
 import unittest
 import json
 import os
+import sqlite3
+import tempfile
 from scripts.init_db import init_db
-from utils.tools import get_query_execution_plan
+from utils.tools import (
+    PlanCache,
+    estimate_cost,
+    explain_queries,
+    extract_sql,
+    get_query_execution_plan,
+    load_table_stats,
+    normalize_sql,
+)
 
 
 class TestTools(unittest.TestCase):
@@ -23,6 +33,93 @@ class TestTools(unittest.TestCase):
         self.assertIn("execution_plan", result_dict)
         self.assertIn("Full table scan detected", result_dict["bottlenecks"])
 
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *\n  FROM Sales_Data WHERE note = 'A  b';"),
+            "select * from sales_data where note = 'A  b'",
+        )
+
+    def test_extract_sql(self):
+        self.assertEqual(
+            extract_sql("Use selective filters: SELECT order_id FROM sales_data"),
+            "SELECT order_id FROM sales_data",
+        )
+        self.assertEqual(
+            extract_sql("Rewrite with a CTE: WITH s AS (SELECT * FROM sales_data) SELECT * FROM s"),
+            "WITH s AS (SELECT * FROM sales_data) SELECT * FROM s",
+        )
+        self.assertIsNone(extract_sql("Simplify joins/subqueries to avoid temporary tables"))
+
+    def test_explain_queries_batch(self):
+        results = explain_queries(
+            [
+                "SELECT * FROM sales_data",
+                "SELECT * FROM missing_table",
+                "SELECT * FROM sales_data WHERE order_id = 1",
+            ],
+            cache=None,
+        )
+        self.assertEqual(
+            [r["status"] for r in results], ["success", "error", "success"]
+        )
+        self.assertIn("Full table scan detected", results[0]["bottlenecks"])
+        self.assertLess(results[2]["estimated_cost"], results[0]["estimated_cost"])
+
+
+class TestPlanCache(unittest.TestCase):
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), "plans.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b INTEGER, c TEXT)")
+        conn.executemany(
+            "INSERT INTO t VALUES (?, ?, ?)", [(i, i % 50, str(i)) for i in range(5000)]
+        )
+        conn.commit()
+        conn.close()
+
+    def test_cache_hit_on_normalized_query(self):
+        cache = PlanCache()
+        first = explain_queries(["SELECT * FROM t WHERE b = 3"], self.db_path, cache)
+        second = explain_queries(["select *\n from T where b = 3;"], self.db_path, cache)
+        self.assertFalse(first[0]["cached"])
+        self.assertTrue(second[0]["cached"])
+        self.assertEqual(first[0]["execution_plan"], second[0]["execution_plan"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_schema_change_invalidates_plan(self):
+        cache = PlanCache()
+        query = "SELECT * FROM t WHERE b = 3"
+        before = explain_queries([query], self.db_path, cache)[0]
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE INDEX idx_t_b ON t (b)")
+        conn.commit()
+        conn.close()
+        after = explain_queries([query], self.db_path, cache)[0]
+        self.assertFalse(after["cached"])
+        self.assertIn("Full table scan detected", before["bottlenecks"])
+        self.assertEqual(after["bottlenecks"], [])
+
+    def test_estimate_cost_uses_sqlite_stat1(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE INDEX idx_t_b ON t (b)")
+        conn.execute("ANALYZE")
+        conn.commit()
+        stats = load_table_stats(conn)
+        conn.close()
+        self.assertEqual(stats["t"]["rows"], 5000)
+        self.assertEqual(stats["t"]["indexes"]["idx_t_b"], [5000, 100])
+
+        scan = estimate_cost([(2, 0, 0, "SCAN t")], stats)
+        search = estimate_cost([(3, 0, 0, "SEARCH t USING INDEX idx_t_b (b=?)")], stats)
+        self.assertEqual(scan, 5000.0)
+        self.assertLess(search, 200.0)
+        results = explain_queries(
+            ["SELECT * FROM t", "SELECT * FROM t WHERE b = 3"], self.db_path, None
+        )
+        self.assertEqual(results[0]["statistics"], "sqlite_stat1")
+        self.assertEqual(results[0]["estimated_cost"], scan)
+        self.assertEqual(results[1]["estimated_cost"], search)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,150 @@
+"""
+Unit tests for workload-level batch optimization.
+"""
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from scripts.init_db import init_db
+from utils.workload import (
+    fingerprint_query,
+    group_queries,
+    load_checkpoint,
+    optimize_workload,
+    read_query_log,
+)
+
+
+def rewrite_to_primary_key_lookup(query):
+    """Stand-in for the agent pipeline: suggests a primary key lookup."""
+    return {
+        "original_query": query,
+        "suggestions": {
+            "status": "success",
+            "suggestions": [
+                {
+                    "type": "query_rewrite",
+                    "suggestion": "SELECT * FROM sales_data WHERE order_id = 1",
+                }
+            ],
+        },
+    }
+
+
+class TestWorkload(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, "query_optimizer.db")
+        init_db(db_path=self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_log(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_read_query_log_formats(self):
+        semicolons = self.write_log(
+            "log.sql",
+            "-- nightly report\nSELECT * FROM sales_data\nWHERE note = 'a;b';\nSELECT 1;\n",
+        )
+        self.assertEqual(
+            read_query_log(semicolons),
+            ["SELECT * FROM sales_data\nWHERE note = 'a;b'", "SELECT 1"],
+        )
+        lines = self.write_log("log.txt", "SELECT 1\n\nSELECT 2\n")
+        self.assertEqual(read_query_log(lines), ["SELECT 1", "SELECT 2"])
+        jsonl = self.write_log("log.jsonl", json.dumps({"query": "SELECT 3"}) + "\n")
+        self.assertEqual(read_query_log(jsonl), ["SELECT 3"])
+
+    def test_fingerprint_ignores_literals_and_formatting(self):
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM sales_data WHERE customer_id = 101"),
+            fingerprint_query("select *\n from sales_data where customer_id = 102;"),
+        )
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM t WHERE a IN (1, 2, 3)"),
+            fingerprint_query("SELECT * FROM t WHERE a IN (4)"),
+        )
+        self.assertNotEqual(
+            fingerprint_query("SELECT * FROM sales_data WHERE customer_id = 1"),
+            fingerprint_query("SELECT * FROM sales_data WHERE order_id = 1"),
+        )
+
+    def test_group_queries_most_frequent_first(self):
+        groups = group_queries(
+            [
+                "SELECT 1 FROM sales_data WHERE order_id = 1",
+                "SELECT * FROM sales_data WHERE amount > 10",
+                "SELECT * FROM sales_data WHERE amount > 20",
+            ]
+        )
+        self.assertEqual([g["count"] for g in groups.values()], [2, 1])
+        self.assertEqual(
+            next(iter(groups.values()))["query"],
+            "SELECT * FROM sales_data WHERE amount > 10",
+        )
+
+    def test_optimize_workload_ranks_and_resumes(self):
+        queries = [
+            "SELECT * FROM sales_data WHERE amount > 10",
+            "SELECT * FROM sales_data WHERE amount > 99",
+            "SELECT * FROM sales_data WHERE customer_id = 101",
+        ]
+        checkpoint = os.path.join(self.directory, "checkpoint.jsonl")
+
+        first = optimize_workload(
+            queries,
+            rewrite_to_primary_key_lookup,
+            checkpoint_path=checkpoint,
+            limit=1,
+            db_path=self.db_path,
+        )
+        self.assertEqual((first["processed"], first["remaining"]), (1, 1))
+        self.assertEqual(len(load_checkpoint(checkpoint)), 1)
+
+        calls = []
+
+        def optimize(query):
+            calls.append(query)
+            return rewrite_to_primary_key_lookup(query)
+
+        second = optimize_workload(
+            queries, optimize, checkpoint_path=checkpoint, db_path=self.db_path
+        )
+        self.assertEqual(calls, ["SELECT * FROM sales_data WHERE customer_id = 101"])
+        self.assertEqual(
+            (second["processed"], second["resumed_from_checkpoint"], second["remaining"]),
+            (1, 1, 0),
+        )
+        ranking = second["ranking"]
+        self.assertEqual(ranking[0]["count"], 2)
+        self.assertGreater(ranking[0]["estimated_savings"], 0)
+        self.assertEqual(
+            ranking[0]["weighted_savings"], ranking[0]["estimated_savings"] * 2
+        )
+        self.assertGreaterEqual(
+            ranking[0]["weighted_savings"], ranking[1]["weighted_savings"]
+        )
+
+    def test_failed_queries_are_not_checkpointed(self):
+        checkpoint = os.path.join(self.directory, "checkpoint.jsonl")
+
+        def fail(query):
+            raise RuntimeError("model unavailable")
+
+        report = optimize_workload(
+            ["SELECT 1"], fail, checkpoint_path=checkpoint, db_path=self.db_path
+        )
+        self.assertEqual(len(report["failed"]), 1)
+        self.assertEqual(report["remaining"], 1)
+        self.assertEqual(load_checkpoint(checkpoint), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
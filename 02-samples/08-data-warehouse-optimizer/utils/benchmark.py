@@ -0,0 +1,221 @@
+"""
+Execution benchmarks comparing original and rewritten queries.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.tools import DB_PATH, explain_queries
+
+# Virtual machine instructions between two progress handler calls
+PROGRESS_INTERVAL = 100
+
+_LITERAL_OR_COMMENT = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL
+)
+_ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+
+
+def _strip_literals(query: str) -> str:
+    """Blank out string literals, quoted identifiers and comments of a query."""
+    return _LITERAL_OR_COMMENT.sub(" ", query)
+
+
+def _outer_text(query: str) -> str:
+    """Text of a query outside any parentheses (subqueries, CTEs, OVER clauses)."""
+    depth = 0
+    outer = []
+    for char in _strip_literals(query):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            outer.append(char)
+    return "".join(outer)
+
+
+def check_read_only_query(query: str):
+    """
+    Reject anything but a single SELECT or WITH statement.
+
+    Benchmarks run each query several times, so statements that write must never
+    reach them. The connection is read-only as well; this check gives a clear
+    error before anything is executed.
+
+    Raises:
+        sqlite3.ProgrammingError: If the query is not a single SELECT/WITH statement.
+    """
+    text = _strip_literals(query).strip().rstrip(";").strip()
+    if ";" in text:
+        raise sqlite3.ProgrammingError("Only a single statement can be benchmarked")
+    if not re.match(r"(?:select|with)\b", text, re.IGNORECASE):
+        raise sqlite3.ProgrammingError("Only SELECT and WITH queries can be benchmarked")
+
+
+def has_outer_order_by(query: str) -> bool:
+    """Whether the outermost query defines its row order with ORDER BY."""
+    return bool(_ORDER_BY.search(_outer_text(query)))
+
+
+def connect_read_only(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Open a SQLite database so that no statement can modify it."""
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percentile / 100 * len(ordered)) - 1, 0)]
+
+
+def _result_signature(rows: List[tuple], ordered: bool) -> str:
+    """Hash a result set, with or without its row order."""
+    if not ordered:
+        rows = sorted(rows, key=repr)
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def benchmark_query(
+    query: str,
+    db_path: str = DB_PATH,
+    warmup: int = 2,
+    runs: int = 10,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Dict:
+    """
+    Execute a query repeatedly and measure its latency.
+
+    Every run reads the complete result. Warm-up runs are not timed; the first one
+    also counts the virtual machine instructions executed and fingerprints the
+    result set. Only single SELECT/WITH statements are accepted, and they run on a
+    read-only connection (query_only is enabled on a connection passed in for the
+    duration of the benchmark).
+
+    Args:
+        query (str): The SQL query to benchmark.
+        db_path (str): SQLite database file.
+        warmup (int): Untimed runs before measuring.
+        runs (int): Timed runs.
+        conn (sqlite3.Connection): Optional connection to reuse.
+
+    Raises:
+        sqlite3.Error: If the query is not a single SELECT/WITH statement or fails.
+
+    Returns:
+        Dict: median/p95/min latency in milliseconds, result row count, rows
+        scanned estimated from the plan, VM instructions and signatures of the
+        result set with and without its row order.
+    """
+    check_read_only_query(query)
+    own_connection = conn is None
+    conn = conn or connect_read_only(db_path)
+    query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+    conn.execute("PRAGMA query_only = ON")
+    try:
+        steps = [0]
+
+        def count_steps():
+            steps[0] += PROGRESS_INTERVAL
+            return 0
+
+        conn.set_progress_handler(count_steps, PROGRESS_INTERVAL)
+        try:
+            rows = conn.execute(query).fetchall()
+        finally:
+            conn.set_progress_handler(None, 0)
+        columns = len(rows[0]) if rows else 0
+
+        for _ in range(max(warmup - 1, 0)):
+            for _ in conn.execute(query):
+                pass
+
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            for _ in conn.execute(query):
+                pass
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        plan = explain_queries([query], db_path)[0]
+        return {
+            "query": query,
+            "runs": runs,
+            "median_ms": round(statistics.median(latencies), 3) if latencies else None,
+            "p95_ms": round(_percentile(latencies, 95), 3) if latencies else None,
+            "min_ms": round(min(latencies), 3) if latencies else None,
+            "rows_returned": len(rows),
+            "columns": columns,
+            "rows_scanned_estimate": plan.get("estimated_cost"),
+            "vm_instructions": steps[0],
+            "ordered_signature": _result_signature(rows, ordered=True),
+            "unordered_signature": _result_signature(rows, ordered=False),
+        }
+    finally:
+        if own_connection:
+            conn.close()
+        else:
+            conn.execute(f"PRAGMA query_only = {int(query_only)}")
+
+
+def compare_queries(
+    original_query: str,
+    rewritten_query: str,
+    db_path: str = DB_PATH,
+    warmup: int = 2,
+    runs: int = 10,
+) -> Dict:
+    """
+    Benchmark a rewrite against its original query on the same connection.
+
+    The rewrite is only reported as an improvement when it returns the same
+    result set (same rows, in the same order when both outermost queries end with
+    ORDER BY) and its median latency is lower.
+
+    Args:
+        original_query (str): The original SQL query.
+        rewritten_query (str): The rewritten SQL query.
+        db_path (str): SQLite database file.
+        warmup (int): Untimed runs before measuring each query.
+        runs (int): Timed runs of each query.
+
+    Returns:
+        Dict: Measurements of both queries, result equivalence, speedup and verdict.
+    """
+    check_read_only_query(original_query)
+    check_read_only_query(rewritten_query)
+    conn = connect_read_only(db_path)
+    try:
+        original = benchmark_query(original_query, db_path, warmup, runs, conn)
+        rewritten = benchmark_query(rewritten_query, db_path, warmup, runs, conn)
+    finally:
+        conn.close()
+
+    both_ordered = all(has_outer_order_by(q) for q in (original_query, rewritten_query))
+    # Row order only matters when both queries define it
+    signature = "ordered_signature" if both_ordered else "unordered_signature"
+    equivalent = original[signature] == rewritten[signature]
+    speedup = (
+        round(original["median_ms"] / rewritten["median_ms"], 2)
+        if original["median_ms"] and rewritten["median_ms"]
+        else None
+    )
+    return {
+        "original": original,
+        "rewritten": rewritten,
+        "equivalent_results": equivalent,
+        "speedup": speedup,
+        "faster": bool(equivalent and speedup and speedup > 1.0),
+    }
+
@@ -3,12 +3,187 @@ SQLite database tools for query optimization.
 """
 
 import sqlite3
+import hashlib
 import json
+import math
+import os
+import re
+import threading
 import uuid
-from typing import List
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from strands import tool
 from opentelemetry import trace
 
+DB_PATH = "query_optimizer.db"
+
+# SQLite's own assumptions for tables and indexes without sqlite_stat1 rows
+DEFAULT_TABLE_ROWS = 1_000_000
+DEFAULT_ROWS_PER_KEY = 10
+# Selectivity of each range constraint (x > ?, x < ?) on an index
+RANGE_SELECTIVITY = 0.25
+
+_SQL_START = re.compile(r"\b(?:select|with)\b", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_PLAN_STEP = re.compile(
+    r"^(?P<op>SCAN|SEARCH)(?: TABLE)? (?P<table>\S+)(?: AS \S+)?"
+    r"(?: USING (?P<covering>COVERING )?(?:INDEX (?P<index>\S+)|(?P<pk>INTEGER PRIMARY KEY|PRIMARY KEY)))?"
+    r"(?: \((?P<constraints>.*)\))?",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalize a query for caching: collapse whitespace and lowercase everything
+    outside string literals and quoted identifiers, and drop trailing semicolons.
+    """
+    parts = _STRING_LITERAL.split(query.strip().rstrip(";").strip())
+    return "".join(
+        part if index % 2 else re.sub(r"\s+", " ", part).lower()
+        for index, part in enumerate(parts)
+    )
+
+
+class PlanCache:
+    """Thread-safe LRU cache of EXPLAIN QUERY PLAN results."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[List]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, key: Tuple, plan: List):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+plan_cache = PlanCache()
+
+
+def load_table_stats(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """
+    Read table and index statistics gathered by ANALYZE from sqlite_stat1.
+
+    Returns:
+        Dict: table name -> {"rows": row count, "indexes": {index name: stat numbers}}
+    """
+    try:
+        rows = conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    stats = {}
+    for table, index, stat in rows:
+        numbers = [int(value) for value in str(stat).split() if value.isdigit()]
+        if not numbers:
+            continue
+        table_stats = stats.setdefault(table.lower(), {"rows": numbers[0], "indexes": {}})
+        table_stats["rows"] = numbers[0]
+        if index:
+            table_stats["indexes"][index.lower()] = numbers
+    return stats
+
+
+def explain_queries(
+    queries: List[str], db_path: str = DB_PATH, cache: Optional[PlanCache] = plan_cache
+) -> List[Dict]:
+    """
+    Explain a batch of queries over a single connection.
+
+    Plans are cached by normalized SQL text, database schema version and the
+    sqlite_stat1 contents, so re-explaining a query is free until the schema or
+    the statistics change.
+
+    Args:
+        queries (List[str]): SQL queries to explain.
+        db_path (str): SQLite database file.
+        cache (PlanCache): Plan cache to use, or None to always run EXPLAIN.
+
+    Returns:
+        List[Dict]: One result per query, in order, with status, execution_plan,
+        bottlenecks and estimated_cost, or status and message on error.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        stats = load_table_stats(conn)
+        stats_version = hashlib.sha256(
+            json.dumps(stats, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        database = os.path.abspath(db_path)
+        results = []
+        for query in queries:
+            key = (database, schema_version, stats_version, normalize_sql(query))
+            plan = cache.get(key) if cache is not None else None
+            cached = plan is not None
+            if plan is None:
+                try:
+                    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+                except sqlite3.Error as e:
+                    results.append({"query": query, "status": "error", "message": str(e)})
+                    continue
+                if cache is not None:
+                    cache.put(key, plan)
+            results.append(
+                {
+                    "query": query,
+                    "status": "success",
+                    "execution_plan": plan,
+                    "bottlenecks": analyze_plan(plan),
+                    "estimated_cost": estimate_cost(plan, stats),
+                    "statistics": "sqlite_stat1" if stats else "default",
+                    "cached": cached,
+                }
+            )
+        return results
+    finally:
+        conn.close()
+
+
+def extract_sql(text: str, db_path: str = DB_PATH) -> Optional[str]:
+    """
+    Return the SQL statement embedded in a rewrite suggestion, such as the query
+    after "Use selective filters: ".
+
+    The statement starts at the first SELECT or WITH keyword from which the rest of
+    the text can be planned against the database.
+
+    Args:
+        text (str): Suggestion text.
+        db_path (str): SQLite database file.
+
+    Returns:
+        Optional[str]: The statement, or None when the text holds no valid query.
+    """
+    candidates = [text[match.start():].strip() for match in _SQL_START.finditer(text)]
+    if not candidates:
+        return None
+    for candidate, plan in zip(candidates, explain_queries(candidates, db_path)):
+        if plan["status"] == "success":
+            return candidate
+    return None
+
 
 @tool
 def get_query_execution_plan(query: str) -> str:
@@ -23,23 +198,40 @@ def get_query_execution_plan(query: str) -> str:
     """
     with trace.get_tracer(__name__).start_as_current_span("get_query_execution_plan"):
         try:
-            conn = sqlite3.connect("query_optimizer.db")
-            cursor = conn.cursor()
-            cursor.execute(f"EXPLAIN QUERY PLAN {query}")
-            plan = cursor.fetchall()
-            conn.close()
+            result = explain_queries([query])[0]
+            if result["status"] == "error":
+                return json.dumps({"status": "error", "message": result["message"]})
             return json.dumps(
                 {
                     "status": "success",
                     "query_id": str(uuid.uuid4()),
-                    "execution_plan": plan,
-                    "bottlenecks": analyze_plan(plan),
+                    "execution_plan": result["execution_plan"],
+                    "bottlenecks": result["bottlenecks"],
+                    "estimated_cost": result["estimated_cost"],
                 }
             )
         except sqlite3.Error as e:
             return json.dumps({"status": "error", "message": str(e)})
 
 
+@tool
+def get_query_execution_plans(queries: List[str]) -> str:
+    """
+    Retrieves the execution plans and estimated costs of several SQLite queries at once.
+
+    Args:
+        queries (List[str]): The SQL queries to analyze.
+
+    Returns:
+        str: JSON string with one result per query or error message.
+    """
+    with trace.get_tracer(__name__).start_as_current_span("get_query_execution_plans"):
+        try:
+            return json.dumps({"status": "success", "results": explain_queries(queries)})
+        except sqlite3.Error as e:
+            return json.dumps({"status": "error", "message": str(e)})
+
+
 def analyze_plan(plan: List) -> List[str]:
     """Identify bottlenecks in SQLite execution plan."""
     bottlenecks = []
@@ -107,16 +299,15 @@ def validate_query_cost(query: str) -> str:
     """
     with trace.get_tracer(__name__).start_as_current_span("validate_query_cost"):
         try:
-            conn = sqlite3.connect("query_optimizer.db")
-            cursor = conn.cursor()
-            cursor.execute(f"EXPLAIN QUERY PLAN {query}")
-            plan = cursor.fetchall()
-            conn.close()
-            cost = estimate_cost(plan)
+            result = explain_queries([query])[0]
+            if result["status"] == "error":
+                return json.dumps({"status": "error", "message": result["message"]})
+            cost = result["estimated_cost"]
             return json.dumps(
                 {
                     "status": "success",
                     "cost": cost,
+                    "statistics": result["statistics"],
                     "message": f"Estimated query cost: {cost}",
                 }
             )
@@ -124,13 +315,85 @@ def validate_query_cost(query: str) -> str:
             return json.dumps({"status": "error", "message": str(e)})
 
 
-def estimate_cost(plan: List) -> float:
-    """Estimate query cost from SQLite EXPLAIN QUERY PLAN."""
+@tool
+def benchmark_rewrite(original_query: str, rewritten_query: str) -> str:
+    """
+    Executes the original and rewritten queries with warm-up and repeated timed runs,
+    and checks that both return the same results.
+
+    Args:
+        original_query (str): The original SQL query.
+        rewritten_query (str): The rewritten SQL query.
+
+    Returns:
+        str: JSON string with median/p95 latency, rows returned and scanned for each
+        query, result equivalence and speedup, or error message.
+    """
+    from utils.benchmark import compare_queries
+
+    with trace.get_tracer(__name__).start_as_current_span("benchmark_rewrite"):
+        try:
+            comparison = compare_queries(original_query, rewritten_query)
+            return json.dumps({"status": "success", **comparison})
+        except sqlite3.Error as e:
+            return json.dumps({"status": "error", "message": str(e)})
+
+
+def _estimate_step(detail: str, stats: Dict[str, Dict]) -> Optional[Tuple[float, float]]:
+    """
+    Estimate the rows examined and the rows produced by one SCAN/SEARCH plan step.
+
+    Returns:
+        Tuple of (rows examined, rows produced), or None for other steps.
+    """
+    match = _PLAN_STEP.match(detail)
+    if not match:
+        return None
+    if match.group("table").upper() == "CONSTANT":
+        return 1.0, 1.0
+    table_stats = stats.get(match.group("table").lower(), {})
+    table_rows = float(table_stats.get("rows", DEFAULT_TABLE_ROWS))
+    if match.group("op").upper() == "SCAN":
+        return table_rows, table_rows
+
+    constraints = match.group("constraints") or ""
+    equalities = len(re.findall(r"(?<![<>!])=", constraints))
+    ranges = len(re.findall(r"[<>]", constraints))
+    if match.group("pk") and equalities:
+        rows = 1.0
+    elif equalities and match.group("index"):
+        index_stats = table_stats.get("indexes", {}).get(match.group("index").lower())
+        if index_stats and equalities < len(index_stats):
+            rows = float(index_stats[equalities])
+        else:
+            rows = float(min(DEFAULT_ROWS_PER_KEY, table_rows))
+    else:
+        rows = table_rows
+    rows = max(rows * RANGE_SELECTIVITY ** min(ranges, 2), 1.0)
+    # B-tree descent plus the rows visited
+    return math.log2(table_rows + 1) + rows, rows
+
+
+def estimate_cost(plan: List, stats: Optional[Dict[str, Dict]] = None) -> float:
+    """
+    Estimate query cost from SQLite EXPLAIN QUERY PLAN as the number of rows examined.
+
+    Row counts come from sqlite_stat1 (see load_table_stats); tables and indexes
+    without statistics use SQLite's default assumptions. Steps sharing a parent
+    form a nested loop, so each step is repeated for every row of the steps
+    before it; temporary B-trees add the cost of sorting the rows produced so far.
+    """
+    stats = stats or {}
     total_cost = 0.0
+    loop_rows = {}
     for step in plan:
-        detail = step[3].lower()
-        if "scan" in detail and "index" not in detail:
-            total_cost += 100.0
-        elif "index" in detail:
-            total_cost += 10.0
-    return total_cost
+        parent, detail = step[1], step[3]
+        outer_rows = loop_rows.get(parent, 1.0)
+        estimate = _estimate_step(detail, stats)
+        if estimate is not None:
+            examined, produced = estimate
+            total_cost += outer_rows * examined
+            loop_rows[parent] = outer_rows * produced
+        elif "TEMP B-TREE" in detail.upper():
+            total_cost += outer_rows * math.log2(outer_rows + 1)
+    return round(total_cost, 2)
@@ -0,0 +1,223 @@
+"""
+Workload-level batch optimization: query log parsing, fingerprinting,
+checkpointing and savings ranking.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from utils.tools import DB_PATH, explain_queries, extract_sql, normalize_sql
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\bin \((?:\s*\?\s*,)*\s*\?\s*\)")
+
+
+def read_query_log(path: str) -> List[str]:
+    """
+    Read the SQL statements of a query log.
+
+    `.jsonl` logs hold one JSON object per line with a "query" field. Other files
+    are plain SQL: statements are separated by semicolons when the file has any,
+    otherwise each non-empty line is a statement. Lines starting with "--" are
+    comments.
+
+    Args:
+        path (str): Query log file.
+
+    Returns:
+        List[str]: Statements in log order, repeats included.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [
+                json.loads(line)["query"] for line in f if line.strip()
+            ]
+        lines = [line for line in f if not line.lstrip().startswith("--")]
+    text = "".join(lines)
+    if ";" not in _STRING_LITERAL.sub("", text):
+        return [line.strip() for line in lines if line.strip()]
+    statements, start, in_literal = [], 0, False
+    for index, char in enumerate(text):
+        if char == "'":
+            in_literal = not in_literal
+        elif char == ";" and not in_literal:
+            statements.append(text[start:index])
+            start = index + 1
+    statements.append(text[start:])
+    return [s.strip() for s in statements if s.strip()]
+
+
+def fingerprint_query(query: str) -> str:
+    """
+    Fingerprint a query: normalize it and replace literals with placeholders, so
+    statements that differ only by their values share a fingerprint.
+    """
+    shape = normalize_sql(query)
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("in (?)", shape)
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:16]
+
+
+def group_queries(queries: List[str]) -> "OrderedDict[str, Dict]":
+    """
+    Deduplicate queries by fingerprint.
+
+    Returns:
+        OrderedDict: fingerprint -> {"query": first statement seen, "count": occurrences},
+        most frequent first.
+    """
+    groups = {}
+    for query in queries:
+        group = groups.setdefault(fingerprint_query(query), {"query": query, "count": 0})
+        group["count"] += 1
+    return OrderedDict(
+        sorted(groups.items(), key=lambda item: item[1]["count"], reverse=True)
+    )
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict]:
+    """Load the results recorded in a checkpoint file, keyed by fingerprint."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run interrupted mid-write leaves a partial last line
+                continue
+            results[entry["fingerprint"]] = entry
+    return results
+
+
+def append_checkpoint(path: str, entry: Dict):
+    """Append one finished fingerprint to a checkpoint file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def rewritten_query_from_report(report: Dict, db_path: str = DB_PATH) -> Optional[str]:
+    """
+    Return the SQL of the first query rewrite suggested in an optimize_query report,
+    or None when there is no rewrite or it holds no valid query.
+    """
+    suggestions = report.get("suggestions", {})
+    if not isinstance(suggestions, dict):
+        return None
+    suggestion = next(
+        (
+            s.get("suggestion")
+            for s in suggestions.get("suggestions", [])
+            if isinstance(s, dict) and s.get("type") == "query_rewrite"
+        ),
+        None,
+    )
+    return extract_sql(suggestion, db_path) if suggestion else None
+
+
+def evaluate_result(
+    fingerprint: str, group: Dict, report: Dict, db_path: str = DB_PATH
+) -> Dict:
+    """
+    Estimate the savings of a rewrite, weighted by how often the query runs.
+
+    Costs of the original and rewritten queries are estimated rows examined (see
+    utils.tools.estimate_cost); invalid rewrites save nothing.
+    """
+    rewritten_query = rewritten_query_from_report(report, db_path)
+    queries = [group["query"]] + ([rewritten_query] if rewritten_query else [])
+    plans = explain_queries(queries, db_path)
+    original_cost = plans[0].get("estimated_cost")
+    rewritten_cost = plans[1].get("estimated_cost") if len(plans) > 1 else None
+    savings = (
+        max(original_cost - rewritten_cost, 0.0)
+        if original_cost is not None and rewritten_cost is not None
+        else 0.0
+    )
+    return {
+        "fingerprint": fingerprint,
+        "count": group["count"],
+        "query": group["query"],
+        "rewritten_query": rewritten_query,
+        "original_cost": original_cost,
+        "rewritten_cost": rewritten_cost,
+        "estimated_savings": round(savings, 2),
+        "weighted_savings": round(savings * group["count"], 2),
+        "report": report,
+    }
+
+
+def optimize_workload(
+    queries: List[str],
+    optimize: Callable[[str], Dict],
+    checkpoint_path: Optional[str] = None,
+    max_workers: int = 4,
+    limit: Optional[int] = None,
+    db_path: str = DB_PATH,
+) -> Dict:
+    """
+    Optimize every distinct query shape of a workload and rank the savings.
+
+    Unique fingerprints run through `optimize` concurrently, most frequent first.
+    Each finished fingerprint is appended to the checkpoint, so an interrupted or
+    limited run resumes where it stopped.
+
+    Args:
+        queries (List[str]): Workload statements, repeats included.
+        optimize (Callable): Returns the optimization report of one query.
+        checkpoint_path (str): Optional JSONL checkpoint file.
+        max_workers (int): Fingerprints optimized concurrently.
+        limit (int): Optional maximum number of new fingerprints to process.
+        db_path (str): SQLite database file used for cost estimates.
+
+    Returns:
+        Dict: Workload summary and the ranking by frequency-weighted savings.
+    """
+    groups = group_queries(queries)
+    done = load_checkpoint(checkpoint_path) if checkpoint_path else {}
+    pending = [fp for fp in groups if fp not in done]
+    if limit is not None:
+        pending = pending[:limit]
+
+    results = {fp: entry for fp, entry in done.items() if fp in groups}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(optimize, groups[fp]["query"]): fp for fp in pending
+        }
+        for future in as_completed(futures):
+            fp = futures[future]
+            try:
+                entry = evaluate_result(fp, groups[fp], future.result(), db_path)
+            except Exception as e:
+                failed.append({"fingerprint": fp, "query": groups[fp]["query"], "error": str(e)})
+                continue
+            results[fp] = entry
+            if checkpoint_path:
+                append_checkpoint(checkpoint_path, entry)
+
+    ranking = sorted(
+        results.values(), key=lambda entry: entry["weighted_savings"], reverse=True
+    )
+    return {
+        "total_queries": len(queries),
+        "unique_fingerprints": len(groups),
+        "processed": len(results) - len([fp for fp in done if fp in groups]),
+        "resumed_from_checkpoint": len([fp for fp in done if fp in groups]),
+        "remaining": len(groups) - len(results),
+        "failed": failed,
+        "total_weighted_savings": round(
+            sum(entry["weighted_savings"] for entry in ranking), 2
+        ),
+        "ranking": ranking,
+    }
@@ -0,0 +1,132 @@
+"""
+Microbenchmark for StrandsToOpenInferenceProcessor
+
+Replays a synthetic trace (agent -> cycles -> model invoke / tool spans) through the
+processor and reports CPU time and allocated memory per span. Spans are lightweight
+stand-ins, so no exporter or tracer provider is needed.
+
+Usage:
+    python benchmark_span_processor.py --spans 10000 --prompt-chars 20000
+    python benchmark_span_processor.py --max-attribute-length 4096
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from itertools import count
+
+from strands_to_openinference_mapping import StrandsToOpenInferenceProcessor
+
+
+class _SpanContext:
+    def __init__(self, span_id: int, trace_id: int):
+        self.span_id = span_id
+        self.trace_id = trace_id
+
+
+class _Span:
+    """Minimal object exposing the span surface the processor relies on."""
+
+    def __init__(self, name, attributes, span_id, trace_id, parent=None):
+        self.name = name
+        self._attributes = dict(attributes)
+        self._context = _SpanContext(span_id, trace_id)
+        self.parent = parent
+
+    def get_span_context(self):
+        return self._context
+
+
+def build_trace(span_count: int, prompt_chars: int):
+    """Build the spans of a synthetic trace in end order (children before parents)."""
+    ids = count(1)
+    trace_id = 1
+    text = ("The quick brown fox jumps over the lazy dog. " * (prompt_chars // 45 + 1))[:prompt_chars]
+    prompt = json.dumps([
+        {"role": "user", "content": [{"text": text}]},
+        {"role": "assistant", "content": [{"text": "Let me check."}],
+         "toolUse": [{"toolUseId": "tool-1", "name": "retrieve", "input": {"text": "menu"}}]},
+    ])
+    completion = json.dumps([{"role": "assistant", "content": [{"text": text[:500]}], "finish_reason": "end_turn"}])
+
+    agent = _Span("invoke_agent", {"agent.name": "restaurant", "gen_ai.prompt": text[:200]}, next(ids), trace_id)
+    spans = []
+    cycle = None
+    while len(spans) < span_count - 1:
+        if cycle is None or len(spans) % 3 == 0:
+            if cycle is not None:
+                spans.append(cycle)
+            cycle = _Span(f"Cycle {len(spans)}", {"event_loop.cycle_id": str(len(spans))},
+                          next(ids), trace_id, parent=agent.get_span_context())
+        if len(spans) % 2 == 0:
+            attrs = {
+                "gen_ai.prompt": prompt,
+                "gen_ai.completion": completion,
+                "gen_ai.request.model": "us.amazon.nova-pro-v1:0",
+                "gen_ai.usage.prompt_tokens": 1200,
+                "gen_ai.usage.completion_tokens": 120,
+                "gen_ai.usage.total_tokens": 1320,
+                "max_tokens": 4096,
+            }
+            spans.append(_Span("Model invoke", attrs, next(ids), trace_id, parent=cycle.get_span_context()))
+        else:
+            attrs = {
+                "tool.name": "retrieve",
+                "tool.id": "tool-1",
+                "tool.parameters": {"text": "menu"},
+                "tool.result": {"content": [{"text": text[:2000]}]},
+            }
+            spans.append(_Span("Tool: retrieve", attrs, next(ids), trace_id, parent=cycle.get_span_context()))
+    spans.append(agent)
+    return spans
+
+
+def run(spans, processor):
+    for span in spans:
+        processor.on_start(span)
+    for span in spans:
+        processor.on_end(span)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Strands -> OpenInference span processor")
+    parser.add_argument("--spans", type=int, default=10000, help="Number of spans in the synthetic trace")
+    parser.add_argument("--prompt-chars", type=int, default=20000, help="Size of the user prompt text")
+    parser.add_argument("--max-attribute-length", type=int, default=None, help="Processor truncation cap")
+    args = parser.parse_args()
+
+    # CPU time, measured without tracemalloc overhead
+    spans = build_trace(args.spans, args.prompt_chars)
+    processor = StrandsToOpenInferenceProcessor(max_attribute_length=args.max_attribute_length)
+    start = time.process_time()
+    run(spans, processor)
+    cpu_seconds = time.process_time() - start
+
+    # Allocations, measured on a fresh copy of the trace
+    spans = build_trace(args.spans, args.prompt_chars)
+    processor = StrandsToOpenInferenceProcessor(max_attribute_length=args.max_attribute_length)
+    tracemalloc.start()
+    for span in spans:
+        processor.on_start(span)
+    transient_peak = 0
+    baseline, _ = tracemalloc.get_traced_memory()
+    for span in spans:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        processor.on_end(span)
+        _, peak = tracemalloc.get_traced_memory()
+        transient_peak += peak - before
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"spans:                     {len(spans)}")
+    print(f"prompt chars:              {args.prompt_chars}")
+    print(f"cpu time per span:         {cpu_seconds / len(spans) * 1e6:.1f} us")
+    print(f"peak allocation per span:  {transient_peak / len(spans) / 1024:.1f} KiB")
+    print(f"retained growth per span:  {(retained - baseline) / len(spans) / 1024:.1f} KiB")
+    print(f"registry stats:            {processor.get_registry_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,17 @@ IAM roles and OpenSearch Serverless.
 
 import json
 import boto3
+import hashlib
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from opensearchpy import (
     OpenSearch,
     RequestsHttpConnection,
     AWSV4SignerAuth,
+    AuthorizationException,
     RequestError,
 )
 import pprint
@@ -33,6 +37,17 @@ valid_embedding_models = [
     "amazon.titan-embed-text-v2:0",
 ]
 pp = pprint.PrettyPrinter(indent=2)
+upload_manifest_name = ".kb_upload_manifest.json"
+# Sync snapshots are per data source, so they live in the user cache rather than the source tree
+sync_state_dir = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "bedrock-kb-helper"
+)
+s3_transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True,
+)
 
 
 def read_yaml_file(file_path: str):
@@ -62,6 +77,51 @@ def interactive_sleep(seconds: int):
         time.sleep(1)
 
 
+def file_sha256(file_path: str):
+    """
+    Compute the sha256 hex digest of a file, reading it in chunks
+    Args:
+        file_path: the path to the file
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def wait_until(
+    check,
+    description: str,
+    initial_delay: float = 1,
+    max_delay: float = 30,
+    timeout: float = 900,
+):
+    """
+    Poll a resource with exponential backoff (and a little jitter) until it is ready
+    Args:
+        check: callable returning a truthy value once the resource is ready
+        description: what is being waited on, used in progress messages
+        initial_delay: seconds to wait after the first unsuccessful check
+        max_delay: upper bound for the delay between two checks
+        timeout: maximum number of seconds to wait before raising TimeoutError
+
+    Returns:
+        the truthy value returned by check
+    """
+    delay = initial_delay
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        if result:
+            return result
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+        print(f"Waiting for {description} (next check in {delay:.0f}s)")
+        time.sleep(delay + random.uniform(0, delay / 4))
+        delay = min(delay * 2, max_delay)
+
+
 class KnowledgeBasesForAmazonBedrock:
     """
     Support class that allows for:
@@ -104,6 +164,7 @@ class KnowledgeBasesForAmazonBedrock:
         self.awsauth = AWSV4SignerAuth(credentials, self.region_name, "aoss")
         self.oss_client = None
         self.data_bucket_name = None
+        self.step_timings = {}
 
     def create_or_retrieve_knowledge_base(
         self,
@@ -177,84 +238,133 @@ class KnowledgeBasesForAmazonBedrock:
             oss_policy_name = f"AmazonBedrockOSSPolicyForKnowledgeBase_{self.suffix}"
             vector_store_name = f"{kb_name}-{self.suffix}"
             index_name = f"{kb_name}-index-{self.suffix}"
-            print(
-                "========================================================================================"
-            )
-            print(
-                f"Step 1 - Creating or retrieving {data_bucket_name} S3 bucket for Knowledge Base documents"
-            )
-            self.create_s3_bucket(data_bucket_name)
-            print(
-                "========================================================================================"
-            )
-            print(
-                f"Step 2 - Creating Knowledge Base Execution Role ({kb_execution_role_name}) and Policies"
-            )
-            bedrock_kb_execution_role = self.create_bedrock_kb_execution_role(
-                embedding_model,
-                data_bucket_name,
-                fm_policy_name,
-                s3_policy_name,
-                kb_execution_role_name,
-            )
-            print(
-                "========================================================================================"
-            )
-            print(f"Step 3 - Creating OSS encryption, network and data access policies")
-            encryption_policy, network_policy, access_policy = (
-                self.create_policies_in_oss(
-                    encryption_policy_name,
-                    vector_store_name,
-                    network_policy_name,
-                    bedrock_kb_execution_role,
-                    access_policy_name,
-                )
-            )
-            print(
-                "========================================================================================"
-            )
-            print(
-                f"Step 4 - Creating OSS Collection (this step takes a couple of minutes to complete)"
-            )
-            host, collection, collection_id, collection_arn = self.create_oss(
-                vector_store_name, oss_policy_name, bedrock_kb_execution_role
-            )
-            # Build the OpenSearch client
-            self.oss_client = OpenSearch(
-                hosts=[{"host": host, "port": 443}],
-                http_auth=self.awsauth,
-                use_ssl=True,
-                verify_certs=True,
-                connection_class=RequestsHttpConnection,
-                timeout=300,
-            )
-
-            print(
-                "========================================================================================"
-            )
-            print(f"Step 5 - Creating OSS Vector Index")
-            self.create_vector_index(index_name)
-            print(
-                "========================================================================================"
-            )
-            print(f"Step 6 - Creating Knowledge Base")
-            knowledge_base, data_source = self.create_knowledge_base(
-                collection_arn,
-                index_name,
-                data_bucket_name,
-                embedding_model,
-                kb_name,
-                kb_description,
-                bedrock_kb_execution_role,
-            )
-            interactive_sleep(60)
-            print(
-                "========================================================================================"
-            )
+            # Independent steps (bucket, IAM role, OSS security policies) run concurrently;
+            # every other step starts as soon as the steps it depends on are done
+            steps = {
+                "s3_bucket": (
+                    (),
+                    lambda r: self.create_s3_bucket(data_bucket_name),
+                ),
+                "kb_execution_role": (
+                    (),
+                    lambda r: self.create_bedrock_kb_execution_role(
+                        embedding_model,
+                        data_bucket_name,
+                        fm_policy_name,
+                        s3_policy_name,
+                        kb_execution_role_name,
+                    ),
+                ),
+                "oss_security_policies": (
+                    (),
+                    lambda r: self.create_security_policies_in_oss(
+                        encryption_policy_name,
+                        vector_store_name,
+                        network_policy_name,
+                    ),
+                ),
+                "oss_access_policy": (
+                    ("kb_execution_role",),
+                    lambda r: self.create_access_policy_in_oss(
+                        vector_store_name,
+                        r["kb_execution_role"],
+                        access_policy_name,
+                    ),
+                ),
+                "oss_collection": (
+                    ("oss_security_policies", "kb_execution_role"),
+                    lambda r: self.create_oss(
+                        vector_store_name, oss_policy_name, r["kb_execution_role"]
+                    ),
+                ),
+                "oss_vector_index": (
+                    ("oss_collection", "oss_access_policy"),
+                    lambda r: self.create_oss_client_and_index(
+                        r["oss_collection"][0], index_name
+                    ),
+                ),
+                "knowledge_base": (
+                    (
+                        "s3_bucket",
+                        "kb_execution_role",
+                        "oss_collection",
+                        "oss_vector_index",
+                    ),
+                    lambda r: self.create_knowledge_base(
+                        r["oss_collection"][3],
+                        index_name,
+                        data_bucket_name,
+                        embedding_model,
+                        kb_name,
+                        kb_description,
+                        r["kb_execution_role"],
+                    ),
+                ),
+            }
+            results = self._run_steps(steps)
+            knowledge_base, data_source = results["knowledge_base"]
+            self.wait_for_knowledge_base(knowledge_base["knowledgeBaseId"])
+            self._print_step_timings()
             kb_id = knowledge_base["knowledgeBaseId"]
             ds_id = data_source["dataSourceId"]
         return kb_id, ds_id
 
+    def _run_steps(self, steps: dict, max_workers: int = 4):
+        """
+        Run provisioning steps as a dependency graph. Each step starts as soon as all of its
+        dependencies have finished, so independent steps run concurrently
+        Args:
+            steps: dict of step name -> (dependency names, callable). The callable receives
+                the dict of results of the steps completed so far
+            max_workers: maximum number of steps running at the same time
+
+        Returns:
+            dict of step name -> step result
+        """
+        results = {}
+        pending = dict(steps)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name, (dependencies, step) in list(pending.items()):
+                    if all(dependency in results for dependency in dependencies):
+                        del pending[name]
+                        future = executor.submit(self._timed_step, name, step, dict(results))
+                        running[future] = name
+                if not running:
+                    raise ValueError(f"Unresolvable step dependencies: {list(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        return results
+
+    def _timed_step(self, name: str, step, results: dict):
+        """
+        Run a single provisioning step and record its wall-clock duration in step_timings
+        Args:
+            name: step name
+            step: callable receiving the results of the previous steps
+            results: results of the previous steps
+        """
+        print(f"Step {name} - started")
+        start = time.perf_counter()
+        try:
+            return step(results)
+        finally:
+            self.step_timings[name] = time.perf_counter() - start
+            print(f"Step {name} - finished in {self.step_timings[name]:.1f}s")
+
+    def _print_step_timings(self):
+        """
+        Print the wall-clock duration of every provisioning step
+        """
+        print(
+            "========================================================================================"
+        )
+        print("Provisioning step timings:")
+        for name, seconds in self.step_timings.items():
+            print(f"  {name:<24}{seconds:8.1f}s")
+
     def create_s3_bucket(self, bucket_name: str):
         """
         Check if bucket exists, and if not create S3 bucket for knowledge base data source
@@ -275,17 +385,178 @@ class KnowledgeBasesForAmazonBedrock:
                     CreateBucketConfiguration={"LocationConstraint": self.region_name},
                 )
 
-    def upload_directory(self, s3_path, bucket_name):
+    def upload_directory(
+        self,
+        s3_path,
+        bucket_name,
+        prefix: str = "",
+        delete_stale: bool = False,
+        max_workers: int = 8,
+        manifest_path: str = None,
+    ):
         """
-        Upload files from a local path to s3
-            s3_path: local path of the document
+        Synchronize files from a local path to s3.
+        Object keys preserve the path relative to s3_path. Files whose content hash matches the
+        local manifest of the last successful upload (and that still exist in the bucket) are
+        skipped, and the remaining files are uploaded concurrently using multipart transfers
+        Args:
+            s3_path: local path of the documents
             bucket_name: bucket name
+            prefix: optional key prefix for the uploaded objects
+            delete_stale: delete objects under prefix that no longer exist locally
+            max_workers: number of files uploaded in parallel
+            manifest_path: path of the manifest of uploaded content hashes.
+                Defaults to a hidden file inside s3_path
+
+        Returns:
+            dict with the uploaded, skipped, deleted and failed keys
         """
+        manifest_path = manifest_path or os.path.join(s3_path, upload_manifest_name)
+        manifest = self._read_upload_manifest(manifest_path, bucket_name)
+        remote_keys = set(self._list_object_keys(bucket_name, prefix))
+
+        local_files = {}
         for root, dirs, files in os.walk(s3_path):
             for file in files:
-                file_to_upload = os.path.join(root, file)
-                print(f"uploading file {file_to_upload} to {bucket_name}")
-                self.s3_client.upload_file(file_to_upload, bucket_name, file)
+                file_path = os.path.join(root, file)
+                if os.path.abspath(file_path) == os.path.abspath(manifest_path):
+                    continue
+                relative_path = os.path.relpath(file_path, s3_path)
+                local_files[prefix + relative_path.replace(os.sep, "/")] = file_path
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            hashes = dict(
+                zip(local_files, executor.map(file_sha256, local_files.values()))
+            )
+
+        to_upload = [
+            key
+            for key, digest in hashes.items()
+            if manifest.get(key) != digest or key not in remote_keys
+        ]
+        skipped = [key for key in local_files if key not in to_upload]
+
+        def upload(key):
+            print(f"uploading file {local_files[key]} to {bucket_name}/{key}")
+            self.s3_client.upload_file(
+                local_files[key],
+                bucket_name,
+                key,
+                ExtraArgs={"Metadata": {"sha256": hashes[key]}},
+                Config=s3_transfer_config,
+            )
+
+        uploaded = []
+        failed = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(upload, key): key for key in to_upload}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    future.result()
+                    uploaded.append(key)
+                except Exception as e:
+                    print(f"Error uploading {key}: {e}")
+                    failed.append(key)
+
+        deleted = []
+        if delete_stale:
+            stale_keys = sorted(remote_keys - set(local_files))
+            deleted = self._delete_object_keys(bucket_name, stale_keys)
+
+        self._write_upload_manifest(
+            manifest_path,
+            bucket_name,
+            {key: hashes[key] for key in local_files if key not in failed},
+        )
+        print(
+            f"Upload to {bucket_name} complete: {len(uploaded)} uploaded, {len(skipped)} unchanged, "
+            f"{len(deleted)} deleted, {len(failed)} failed"
+        )
+        return {
+            "uploaded": sorted(uploaded),
+            "skipped": sorted(skipped),
+            "deleted": deleted,
+            "failed": sorted(failed),
+        }
+
+    def _read_upload_manifest(self, manifest_path: str, bucket_name: str):
+        """
+        Read the content hashes recorded by the last upload to a bucket
+        Args:
+            manifest_path: path of the manifest file
+            bucket_name: bucket the manifest must belong to
+
+        Returns:
+            dict of object key -> sha256, empty if there is no manifest for this bucket
+        """
+        try:
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("bucket") != bucket_name:
+            return {}
+        return manifest.get("objects", {})
+
+    def _write_upload_manifest(self, manifest_path: str, bucket_name: str, objects: dict):
+        """
+        Persist the content hashes of the objects currently in sync with a bucket
+        Args:
+            manifest_path: path of the manifest file
+            bucket_name: bucket name
+            objects: dict of object key -> sha256
+        """
+        with open(manifest_path, "w") as file:
+            json.dump({"bucket": bucket_name, "objects": objects}, file, indent=2)
+
+    def _list_object_keys(self, bucket_name: str, prefix: str = ""):
+        """
+        List every object key in a bucket, following pagination
+        Args:
+            bucket_name: bucket name
+            prefix: only list keys starting with this prefix
+        """
+        for key, _ in self._list_object_etags(bucket_name, prefix):
+            yield key
+
+    def _delete_object_keys(self, bucket_name: str, keys: list):
+        """
+        Delete objects in batches of up to 1000 keys per request
+        Args:
+            bucket_name: bucket name
+            keys: object keys to delete
+
+        Returns:
+            list of deleted keys
+        """
+        deleted = []
+        for start in range(0, len(keys), 1000):
+            batch = [{"Key": key} for key in keys[start : start + 1000]]
+            deleted.extend(obj["Key"] for obj in self._delete_objects_batch(bucket_name, batch))
+        return deleted
+
+    def _delete_objects_batch(self, bucket_name: str, objects: list):
+        """
+        Delete up to 1000 objects (or object versions) with a single delete_objects request
+        Args:
+            bucket_name: bucket name
+            objects: list of {"Key": ..., "VersionId": ...} identifiers
+
+        Returns:
+            list of the identifiers that were deleted
+        """
+        response = self.s3_client.delete_objects(
+            Bucket=bucket_name, Delete={"Objects": objects, "Quiet": True}
+        )
+        errors = {
+            (error["Key"], error.get("VersionId")) for error in response.get("Errors", [])
+        }
+        for error in response.get("Errors", []):
+            print(f"Error deleting {error['Key']}: {error.get('Message')}")
+        return [
+            obj for obj in objects if (obj["Key"], obj.get("VersionId")) not in errors
+        ]
 
     def get_data_bucket_name(self):
         """
@@ -504,6 +775,31 @@ class KnowledgeBasesForAmazonBedrock:
         Returns:
             encryption_policy, network_policy, access_policy
         """
+        encryption_policy, network_policy = self.create_security_policies_in_oss(
+            encryption_policy_name, vector_store_name, network_policy_name
+        )
+        access_policy = self.create_access_policy_in_oss(
+            vector_store_name, bedrock_kb_execution_role, access_policy_name
+        )
+        return encryption_policy, network_policy, access_policy
+
+    def create_security_policies_in_oss(
+        self,
+        encryption_policy_name: str,
+        vector_store_name: str,
+        network_policy_name: str,
+    ):
+        """
+        Create OpenSearch Serverless encryption and network policies.
+        If policies already exist, retrieve them
+        Args:
+            encryption_policy_name: name of the data encryption policy
+            vector_store_name: name of the vector store
+            network_policy_name: name of the network policy
+
+        Returns:
+            encryption_policy, network_policy
+        """
         try:
             encryption_policy = self.aoss_client.create_security_policy(
                 name=encryption_policy_name,
@@ -549,7 +845,24 @@ class KnowledgeBasesForAmazonBedrock:
             network_policy = self.aoss_client.get_security_policy(
                 name=network_policy_name, type="network"
             )
+        return encryption_policy, network_policy
+
+    def create_access_policy_in_oss(
+        self,
+        vector_store_name: str,
+        bedrock_kb_execution_role: str,
+        access_policy_name: str,
+    ):
+        """
+        Create OpenSearch Serverless data access policy. If it already exists, retrieve it
+        Args:
+            vector_store_name: name of the vector store
+            bedrock_kb_execution_role: knowledge base execution role
+            access_policy_name: name of the data access policy
 
+        Returns:
+            access_policy
+        """
         try:
             access_policy = self.aoss_client.create_access_policy(
                 name=access_policy_name,
@@ -595,7 +908,7 @@ class KnowledgeBasesForAmazonBedrock:
             access_policy = self.aoss_client.get_access_policy(
                 name=access_policy_name, type="data"
             )
-        return encryption_policy, network_policy, access_policy
+        return access_policy
 
     def create_oss(
         self,
@@ -630,30 +943,46 @@ class KnowledgeBasesForAmazonBedrock:
         print(host)
         # wait for collection creation
         # This can take couple of minutes to finish
-        response = self.aoss_client.batch_get_collection(names=[vector_store_name])
-        # Periodically check collection status
-        while (response["collectionDetails"][0]["status"]) == "CREATING":
-            print("Creating collection...")
-            interactive_sleep(30)
+        def collection_ready():
             response = self.aoss_client.batch_get_collection(names=[vector_store_name])
+            if response["collectionDetails"][0]["status"] == "CREATING":
+                return None
+            return response
+
+        response = wait_until(
+            collection_ready, f"collection {vector_store_name}", initial_delay=5
+        )
         print("\nCollection successfully created:")
         pp.pprint(response["collectionDetails"])
         # create opensearch serverless access policy and attach it to Bedrock execution role
         try:
-            created = self.create_oss_policy_attach_bedrock_execution_role(
+            # It can take up to a minute for data access rules to be enforced;
+            # create_vector_index retries with backoff until they are
+            self.create_oss_policy_attach_bedrock_execution_role(
                 collection_id, oss_policy_name, bedrock_kb_execution_role
             )
-            if created:
-                # It can take up to a minute for data access rules to be enforced
-                print(
-                    "Sleeping for a minute to ensure data access rules have been enforced"
-                )
-                interactive_sleep(60)
             return host, collection, collection_id, collection_arn
         except Exception as e:
             print("Policy already exists")
             pp.pprint(e)
 
+    def create_oss_client_and_index(self, host: str, index_name: str):
+        """
+        Build the OpenSearch client for the collection host and create the vector index
+        Args:
+            host: OpenSearch Serverless collection host
+            index_name: name of the vector index
+        """
+        self.oss_client = OpenSearch(
+            hosts=[{"host": host, "port": 443}],
+            http_auth=self.awsauth,
+            use_ssl=True,
+            verify_certs=True,
+            connection_class=RequestsHttpConnection,
+            timeout=300,
+        )
+        self.create_vector_index(index_name)
+
     def create_vector_index(self, index_name: str):
         """
         Create OpenSearch Serverless vector index. If existent, ignore
@@ -684,16 +1013,33 @@ class KnowledgeBasesForAmazonBedrock:
             },
         }
 
+        def try_create_index():
+            try:
+                return self.oss_client.indices.create(
+                    index=index_name, body=json.dumps(body_json)
+                )
+            except AuthorizationException:
+                # data access rules are not enforced yet
+                return None
+
         # Create index
         try:
-            response = self.oss_client.indices.create(
-                index=index_name, body=json.dumps(body_json)
+            response = wait_until(
+                try_create_index,
+                "data access rules to be enforced",
+                initial_delay=2,
+                timeout=300,
             )
             print("\nCreating index:")
             pp.pprint(response)
 
             # index creation can take up to a minute
-            interactive_sleep(60)
+            wait_until(
+                lambda: self.oss_client.indices.exists(index=index_name),
+                f"index {index_name}",
+                max_delay=10,
+                timeout=120,
+            )
         except RequestError as e:
             # you can delete the index if its already exists
             # oss_client.indices.delete(index=index_name)
@@ -702,7 +1048,11 @@ class KnowledgeBasesForAmazonBedrock:
                 f"delete, and recreate the index"
             )
 
-    @retry(wait_random_min=1000, wait_random_max=2000, stop_max_attempt_number=7)
+    @retry(
+        wait_exponential_multiplier=1000,
+        wait_exponential_max=30000,
+        stop_max_delay=300000,
+    )
     def create_knowledge_base(
         self,
         collection_arn: str,
@@ -825,40 +1175,228 @@ class KnowledgeBasesForAmazonBedrock:
             pp.pprint(ds)
         return kb, ds
 
-    def synchronize_data(self, kb_id, ds_id):
+    def wait_for_knowledge_base(self, kb_id: str):
+        """
+        Wait with exponential backoff until the Knowledge Base is ACTIVE
+        Args:
+            kb_id: knowledge base id
+        """
+
+        def kb_active():
+            status = self.bedrock_agent_client.get_knowledge_base(
+                knowledgeBaseId=kb_id
+            )["knowledgeBase"]["status"]
+            if status == "FAILED":
+                raise RuntimeError(f"Knowledge Base {kb_id} creation failed")
+            return status == "ACTIVE"
+
+        start = time.perf_counter()
+        wait_until(kb_active, f"knowledge base {kb_id}", timeout=300)
+        self.step_timings["knowledge_base_active"] = time.perf_counter() - start
+
+    def synchronize_data(
+        self,
+        kb_id,
+        ds_id,
+        incremental: bool = False,
+        sync_state_path: str = None,
+    ):
         """
         Start an ingestion job to synchronize data from an S3 bucket to the Knowledge Base
-        and waits for the job to be completed
+        and waits for the job to be completed.
+        In incremental mode, the objects of the data source bucket are compared with a snapshot
+        taken at the last successful sync and no job is started when nothing changed. Any changes
+        accumulated since that sync (including those covered by a job that was already running)
+        are ingested by a single job
         Args:
             kb_id: knowledge base id
             ds_id: data source id
+            incremental: skip the ingestion job when the data source did not change
+            sync_state_path: path of the snapshot of the last successful sync (incremental mode only).
+                Defaults to kb_sync_state_<ds_id>.json under sync_state_dir
+
+        Returns:
+            dict with the job status, document statistics, detected changes and duration
         """
-        # ensure that the kb is available
-        i_status = ["CREATING", "DELETING", "UPDATING"]
-        while (
-            self.bedrock_agent_client.get_knowledge_base(knowledgeBaseId=kb_id)[
-                "knowledgeBase"
-            ]["status"]
-            in i_status
-        ):
-            time.sleep(10)
+        start = time.perf_counter()
+        if incremental:
+            sync_state_path = sync_state_path or os.path.join(
+                sync_state_dir, f"kb_sync_state_{ds_id}.json"
+            )
+            bucket_name = self._get_knowledge_base_s3_bucket(kb_id, ds_id)
+            if not bucket_name or bucket_name == "Data source is not an S3 bucket":
+                raise ValueError(
+                    f"Incremental sync requires an S3 data source, could not get the bucket of data source {ds_id}"
+                )
+
+        # ensure that the kb is available and no other ingestion job is running
+        self.wait_for_knowledge_base(kb_id)
+        self._wait_for_running_ingestion_jobs(kb_id, ds_id)
+
+        changes = {}
+        if incremental:
+            snapshot = dict(self._list_object_etags(bucket_name))
+            changes = self._diff_sync_state(
+                self._read_sync_state(sync_state_path), snapshot
+            )
+            if not any(changes.values()):
+                stats = self._ingestion_stats(None, changes, start)
+                print(f"No changes since the last sync of {ds_id}, skipping ingestion job")
+                return stats
+
         # Start an ingestion job
-        start_job_response = self.bedrock_agent_client.start_ingestion_job(
+        job = self.bedrock_agent_client.start_ingestion_job(
             knowledgeBaseId=kb_id, dataSourceId=ds_id
+        )["ingestionJob"]
+        job = self._wait_for_ingestion_job(kb_id, ds_id, job)
+
+        stats = self._ingestion_stats(job, changes, start)
+        if incremental and job["status"] == "COMPLETE":
+            if stats["documents_failed"]:
+                # The job does not report which documents failed, keep the previous snapshot
+                # so the next incremental sync ingests the changes again
+                print(f"{stats['documents_failed']} documents failed, sync snapshot of {ds_id} not updated")
+            else:
+                self._write_sync_state(sync_state_path, snapshot)
+        print(
+            f"Ingestion job {stats['ingestion_job_id']} {stats['status']} in {stats['duration_seconds']:.1f}s: "
+            f"{stats['documents_scanned']} scanned, {stats['documents_added']} added, "
+            f"{stats['documents_modified']} modified, {stats['documents_deleted']} deleted, "
+            f"{stats['documents_failed']} failed"
         )
-        job = start_job_response["ingestionJob"]
-        pp.pprint(job)
-        # Get job
-        while job["status"] != "COMPLETE" and job["status"] != "FAILED":
-            get_job_response = self.bedrock_agent_client.get_ingestion_job(
+        return stats
+
+    def _wait_for_ingestion_job(self, kb_id: str, ds_id: str, job: dict):
+        """
+        Poll an ingestion job with adaptive (exponential backoff) intervals until it finishes
+        Args:
+            kb_id: knowledge base id
+            ds_id: data source id
+            job: ingestion job as returned by start_ingestion_job or list_ingestion_jobs
+
+        Returns:
+            the finished ingestion job
+        """
+        current = {"job": job}
+
+        def job_finished():
+            current["job"] = self.bedrock_agent_client.get_ingestion_job(
                 knowledgeBaseId=kb_id,
                 dataSourceId=ds_id,
                 ingestionJobId=job["ingestionJobId"],
+            )["ingestionJob"]
+            return current["job"]["status"] in ("COMPLETE", "FAILED", "STOPPED")
+
+        if current["job"]["status"] not in ("COMPLETE", "FAILED", "STOPPED"):
+            wait_until(
+                job_finished,
+                f"ingestion job {job['ingestionJobId']}",
+                initial_delay=2,
+                max_delay=30,
+                timeout=3600,
             )
-            job = get_job_response["ingestionJob"]
-            interactive_sleep(5)
-        pp.pprint(job)
-        # interactive_sleep(40)
+        return current["job"]
+
+    def _wait_for_running_ingestion_jobs(self, kb_id: str, ds_id: str):
+        """
+        Wait for ingestion jobs already running on the data source, so that pending changes are
+        picked up by one new job instead of conflicting with the running one
+        Args:
+            kb_id: knowledge base id
+            ds_id: data source id
+        """
+        paginator = self.bedrock_agent_client.get_paginator("list_ingestion_jobs")
+        for page in paginator.paginate(
+            knowledgeBaseId=kb_id,
+            dataSourceId=ds_id,
+            filters=[
+                {
+                    "attribute": "STATUS",
+                    "operator": "EQ",
+                    "values": ["STARTING", "IN_PROGRESS", "STOPPING"],
+                }
+            ],
+        ):
+            for job in page["ingestionJobSummaries"]:
+                print(f"Waiting for running ingestion job {job['ingestionJobId']}")
+                self._wait_for_ingestion_job(kb_id, ds_id, job)
+
+    def _ingestion_stats(self, job, changes: dict, start: float):
+        """
+        Build the structured result of a synchronization
+        Args:
+            job: finished ingestion job, or None if the job was skipped
+            changes: dict of added/modified/deleted object keys detected in the data source
+            start: perf_counter value when the synchronization started
+        """
+        statistics = job.get("statistics", {}) if job else {}
+        return {
+            "status": job["status"] if job else "SKIPPED",
+            "ingestion_job_id": job["ingestionJobId"] if job else None,
+            "documents_scanned": statistics.get("numberOfDocumentsScanned", 0),
+            "documents_added": statistics.get("numberOfNewDocumentsIndexed", 0),
+            "documents_modified": statistics.get("numberOfModifiedDocumentsIndexed", 0),
+            "documents_deleted": statistics.get("numberOfDocumentsDeleted", 0),
+            "documents_failed": statistics.get("numberOfDocumentsFailed", 0),
+            "failure_reasons": job.get("failureReasons", []) if job else [],
+            "changes": {kind: len(keys) for kind, keys in changes.items()},
+            "duration_seconds": time.perf_counter() - start,
+        }
+
+    def _list_object_etags(self, bucket_name: str, prefix: str = ""):
+        """
+        List (key, etag) pairs for every object in a bucket, following pagination
+        Args:
+            bucket_name: bucket name
+            prefix: only list keys starting with this prefix
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["ETag"]
+
+    def _diff_sync_state(self, previous: dict, current: dict):
+        """
+        Compare two snapshots of key -> etag
+        Args:
+            previous: snapshot taken at the last successful sync
+            current: snapshot of the data source now
+
+        Returns:
+            dict with the added, modified and deleted keys
+        """
+        return {
+            "added": sorted(key for key in current if key not in previous),
+            "modified": sorted(
+                key
+                for key, etag in current.items()
+                if key in previous and previous[key] != etag
+            ),
+            "deleted": sorted(key for key in previous if key not in current),
+        }
+
+    def _read_sync_state(self, sync_state_path: str):
+        """
+        Read the snapshot of the data source taken at the last successful sync
+        Args:
+            sync_state_path: path of the snapshot file
+        """
+        try:
+            with open(sync_state_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_sync_state(self, sync_state_path: str, snapshot: dict):
+        """
+        Persist the snapshot of the data source after a successful sync
+        Args:
+            sync_state_path: path of the snapshot file
+            snapshot: dict of object key -> etag
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(sync_state_path)), exist_ok=True)
+        with open(sync_state_path, "w") as file:
+            json.dump(snapshot, file, indent=2)
 
     def get_kb(self, kb_id):
         """
@@ -879,22 +1417,73 @@ class KnowledgeBasesForAmazonBedrock:
         delete_aoss: bool = True,
     ):
         """
-        Delete the Knowledge Base resources
+        Delete the Knowledge Base resources.
+        Every listing is paginated. Once the Knowledge Base and its Data Source are gone, the
+        independent resources (OpenSearch Serverless, S3 bucket, IAM role and policies) are torn
+        down concurrently
         Args:
             kb_name: name of the knowledge base to delete
             delete_s3_bucket (bool): boolean to indicate if s3 bucket should also be deleted
             delete_iam_roles_and_policies (bool): boolean to indicate if IAM roles and Policies should also be deleted
             delete_aoss: boolean to indicate if amazon opensearch serverless resources should also be deleted
+
+        Returns:
+            list of the resources that could not be deleted
         """
-        kbs_available = self.bedrock_agent_client.list_knowledge_bases(
-            maxResults=100,
-        )
         kb_id = None
         ds_id = None
-        for kb in kbs_available["knowledgeBaseSummaries"]:
+        for kb in self._paginate(
+            self.bedrock_agent_client.list_knowledge_bases, "knowledgeBaseSummaries"
+        ):
             if kb_name == kb["name"]:
                 kb_id = kb["knowledgeBaseId"]
-        kb_details = self.bedrock_agent_client.get_knowledge_base(knowledgeBaseId=kb_id)
+
+        def find_policy(operation, result_key, policy_type):
+            for policy in self._paginate(operation, result_key, type=policy_type):
+                if policy["name"].startswith(kb_name):
+                    return policy["name"]
+            return None
+
+        def find_data_source():
+            for ds in self._paginate(
+                self.bedrock_agent_client.list_data_sources,
+                "dataSourceSummaries",
+                knowledgeBaseId=kb_id,
+            ):
+                if kb_id == ds["knowledgeBaseId"]:
+                    return ds["dataSourceId"]
+            return None
+
+        # Look up every resource concurrently
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            kb_details_future = executor.submit(
+                self.bedrock_agent_client.get_knowledge_base, knowledgeBaseId=kb_id
+            )
+            encryption_policy_future = executor.submit(
+                find_policy,
+                self.aoss_client.list_security_policies,
+                "securityPolicySummaries",
+                "encryption",
+            )
+            network_policy_future = executor.submit(
+                find_policy,
+                self.aoss_client.list_security_policies,
+                "securityPolicySummaries",
+                "network",
+            )
+            access_policy_future = executor.submit(
+                find_policy,
+                self.aoss_client.list_access_policies,
+                "accessPolicySummaries",
+                "data",
+            )
+            ds_id_future = executor.submit(find_data_source)
+        kb_details = kb_details_future.result()
+        encryption_policy_name = encryption_policy_future.result()
+        network_policy_name = network_policy_future.result()
+        access_policy_name = access_policy_future.result()
+        ds_id = ds_id_future.result()
+
         kb_role = kb_details["knowledgeBase"]["roleArn"].split("/")[1]
         collection_id = kb_details["knowledgeBase"]["storageConfiguration"][
             "opensearchServerlessConfiguration"
@@ -902,38 +1491,6 @@ class KnowledgeBasesForAmazonBedrock:
         index_name = kb_details["knowledgeBase"]["storageConfiguration"][
             "opensearchServerlessConfiguration"
         ]["vectorIndexName"]
-
-        encryption_policies = self.aoss_client.list_security_policies(
-            maxResults=100, type="encryption"
-        )
-        encryption_policy_name = None
-        for ep in encryption_policies["securityPolicySummaries"]:
-            if ep["name"].startswith(kb_name):
-                encryption_policy_name = ep["name"]
-
-        network_policies = self.aoss_client.list_security_policies(
-            maxResults=100, type="network"
-        )
-        network_policy_name = None
-        for np in network_policies["securityPolicySummaries"]:
-            if np["name"].startswith(kb_name):
-                network_policy_name = np["name"]
-
-        data_policies = self.aoss_client.list_access_policies(
-            maxResults=100, type="data"
-        )
-        access_policy_name = None
-        for dp in data_policies["accessPolicySummaries"]:
-            if dp["name"].startswith(kb_name):
-                access_policy_name = dp["name"]
-
-        ds_available = self.bedrock_agent_client.list_data_sources(
-            knowledgeBaseId=kb_id,
-            maxResults=100,
-        )
-        for ds in ds_available["dataSourceSummaries"]:
-            if kb_id == ds["knowledgeBaseId"]:
-                ds_id = ds["dataSourceId"]
         ds_details = self.bedrock_agent_client.get_data_source(
             dataSourceId=ds_id,
             knowledgeBaseId=kb_id,
@@ -941,63 +1498,103 @@ class KnowledgeBasesForAmazonBedrock:
         bucket_name = ds_details["dataSource"]["dataSourceConfiguration"][
             "s3Configuration"
         ]["bucketArn"].replace("arn:aws:s3:::", "")
-        try:
-            self.bedrock_agent_client.delete_data_source(
-                dataSourceId=ds_id, knowledgeBaseId=kb_id
-            )
-            print("Data Source deleted successfully!")
-        except Exception as e:
-            print(e)
-        try:
-            self.bedrock_agent_client.delete_knowledge_base(knowledgeBaseId=kb_id)
-            print("Knowledge Base deleted successfully!")
-        except Exception as e:
-            print(e)
-        if delete_aoss:
-            try:
-                self.oss_client.indices.delete(index=index_name)
-                print("OpenSource Serveless Index deleted successfully!")
-            except Exception as e:
-                print(e)
+
+        failures = []
+
+        def attempt(description, action, *args, **kwargs):
             try:
-                self.aoss_client.delete_collection(id=collection_id)
-                print("OpenSource Collection Index deleted successfully!")
+                action(*args, **kwargs)
+                print(f"{description} deleted successfully!")
+                return True
             except Exception as e:
-                print(e)
-            try:
-                self.aoss_client.delete_access_policy(
-                    type="data", name=access_policy_name
+                print(f"Error deleting {description}: {e}")
+                failures.append(description)
+                return False
+
+        attempt(
+            "Data Source",
+            self.bedrock_agent_client.delete_data_source,
+            dataSourceId=ds_id,
+            knowledgeBaseId=kb_id,
+        )
+        attempt(
+            "Knowledge Base",
+            self.bedrock_agent_client.delete_knowledge_base,
+            knowledgeBaseId=kb_id,
+        )
+
+        def delete_aoss_resources():
+            if self.oss_client is not None:
+                attempt(
+                    "OpenSource Serveless Index",
+                    self.oss_client.indices.delete,
+                    index=index_name,
                 )
-                print("OpenSource Serveless access policy deleted successfully!")
-            except Exception as e:
-                print(e)
-            try:
-                self.aoss_client.delete_security_policy(
-                    type="network", name=network_policy_name
+            attempt(
+                "OpenSource Collection Index",
+                self.aoss_client.delete_collection,
+                id=collection_id,
+            )
+            with ThreadPoolExecutor(max_workers=3) as policy_executor:
+                policy_executor.submit(
+                    attempt,
+                    "OpenSource Serveless access policy",
+                    self.aoss_client.delete_access_policy,
+                    type="data",
+                    name=access_policy_name,
                 )
-                print("OpenSource Serveless network policy deleted successfully!")
-            except Exception as e:
-                print(e)
-            try:
-                self.aoss_client.delete_security_policy(
-                    type="encryption", name=encryption_policy_name
+                policy_executor.submit(
+                    attempt,
+                    "OpenSource Serveless network policy",
+                    self.aoss_client.delete_security_policy,
+                    type="network",
+                    name=network_policy_name,
                 )
-                print("OpenSource Serveless encryption policy deleted successfully!")
-            except Exception as e:
-                print(e)
-        if delete_s3_bucket:
-            try:
-                self.delete_s3(bucket_name)
-                print("Knowledge Base S3 bucket deleted successfully!")
-            except Exception as e:
-                print(e)
-        if delete_iam_roles_and_policies:
-            try:
-                self.delete_iam_roles_and_policies(kb_role)
-                print("Knowledge Base Roles and Policies deleted successfully!")
-            except Exception as e:
-                print(e)
-        print("Resources deleted successfully!")
+                policy_executor.submit(
+                    attempt,
+                    "OpenSource Serveless encryption policy",
+                    self.aoss_client.delete_security_policy,
+                    type="encryption",
+                    name=encryption_policy_name,
+                )
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            if delete_aoss:
+                executor.submit(delete_aoss_resources)
+            if delete_s3_bucket:
+                executor.submit(
+                    attempt, "Knowledge Base S3 bucket", self.delete_s3, bucket_name
+                )
+            if delete_iam_roles_and_policies:
+                executor.submit(
+                    attempt,
+                    "Knowledge Base Roles and Policies",
+                    self.delete_iam_roles_and_policies,
+                    kb_role,
+                )
+
+        if failures:
+            print(f"Some resources could not be deleted: {failures}")
+        else:
+            print("Resources deleted successfully!")
+        return failures
+
+    def _paginate(self, operation, result_key: str, **kwargs):
+        """
+        Iterate over every item returned by a nextToken-paginated list operation
+        Args:
+            operation: boto3 client method, e.g. bedrock_agent_client.list_knowledge_bases
+            result_key: name of the list in the response
+            kwargs: extra arguments for the operation
+        """
+        kwargs.setdefault("maxResults", 100)
+        while True:
+            response = operation(**kwargs)
+            yield from response.get(result_key, [])
+            next_token = response.get("nextToken")
+            if not next_token:
+                return
+            kwargs["nextToken"] = next_token
 
     def delete_iam_roles_and_policies(self, kb_execution_role_name: str):
         """
@@ -1005,35 +1602,51 @@ class KnowledgeBasesForAmazonBedrock:
         Args:
             kb_execution_role_name: knowledge base execution role
         """
-        attached_policies = self.iam_client.list_attached_role_policies(
-            RoleName=kb_execution_role_name, MaxItems=100
-        )
+        paginator = self.iam_client.get_paginator("list_attached_role_policies")
         policies_arns = []
-        for policy in attached_policies["AttachedPolicies"]:
-            policies_arns.append(policy["PolicyArn"])
-        for policy in policies_arns:
+        for page in paginator.paginate(RoleName=kb_execution_role_name):
+            for policy in page["AttachedPolicies"]:
+                policies_arns.append(policy["PolicyArn"])
+
+        def detach_and_delete(policy):
             self.iam_client.detach_role_policy(
                 RoleName=kb_execution_role_name, PolicyArn=policy
             )
             self.iam_client.delete_policy(PolicyArn=policy)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(detach_and_delete, policies_arns))
         self.iam_client.delete_role(RoleName=kb_execution_role_name)
         return 0
 
-    def delete_s3(self, bucket_name: str):
+    def delete_s3(self, bucket_name: str, max_workers: int = 8):
         """
-        Delete the objects contained in the Knowledge Base S3 bucket.
+        Delete the objects contained in the Knowledge Base S3 bucket, including every object
+        version and delete marker, in batches of 1000 keys sent concurrently.
         Once the bucket is empty, delete the bucket
         Args:
             bucket_name: bucket name
+            max_workers: number of delete_objects requests sent in parallel
 
         """
-        objects = self.s3_client.list_objects(Bucket=bucket_name)
-        if "Contents" in objects:
-            for obj in objects["Contents"]:
-                self.s3_client.delete_object(Bucket=bucket_name, Key=obj["Key"])
+        # list everything first so that deletions do not invalidate the pagination markers
+        paginator = self.s3_client.get_paginator("list_object_versions")
+        objects = []
+        for page in paginator.paginate(Bucket=bucket_name):
+            for obj in page.get("Versions", []) + page.get("DeleteMarkers", []):
+                objects.append({"Key": obj["Key"], "VersionId": obj["VersionId"]})
+
+        batches = [objects[start : start + 1000] for start in range(0, len(objects), 1000)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            deleted = sum(
+                len(result)
+                for result in executor.map(
+                    lambda batch: self._delete_objects_batch(bucket_name, batch), batches
+                )
+            )
+        print(f"Deleted {deleted} of {len(objects)} objects from {bucket_name}")
         self.s3_client.delete_bucket(Bucket=bucket_name)
 
-
 if __name__ == '__main__':
     kb = KnowledgeBasesForAmazonBedrock()
     smm_client = boto3.client('ssm')
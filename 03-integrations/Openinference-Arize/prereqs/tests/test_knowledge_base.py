@@ -0,0 +1,167 @@
+"""
+Unit tests for the incremental S3 upload and sync of the knowledge base documents, against moto.
+"""
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import boto3
+from moto import mock_aws
+
+from knowledge_base import KnowledgeBasesForAmazonBedrock, upload_manifest_name
+
+BUCKET = "kb-test-bucket"
+
+
+class FakeBedrockAgent:
+    """Bedrock Agent client whose ingestion jobs finish at once with the given statistics."""
+
+    def __init__(self, data_source_config):
+        self.data_source_config = data_source_config
+        self.statistics = {}
+        self.jobs_started = 0
+        self.data_source_lookups = 0
+
+    def get_data_source(self, knowledgeBaseId, dataSourceId):
+        self.data_source_lookups += 1
+        return {"dataSource": {"dataSourceConfiguration": self.data_source_config}}
+
+    def get_knowledge_base(self, knowledgeBaseId):
+        return {"knowledgeBase": {"status": "ACTIVE"}}
+
+    def get_paginator(self, operation):
+        return SimpleNamespace(paginate=lambda **kwargs: [{"ingestionJobSummaries": []}])
+
+    def start_ingestion_job(self, knowledgeBaseId, dataSourceId):
+        self.jobs_started += 1
+        return {
+            "ingestionJob": {
+                "ingestionJobId": str(self.jobs_started),
+                "status": "COMPLETE",
+                "statistics": dict(self.statistics),
+            }
+        }
+
+
+class TestUploadDirectory(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+
+        # Only the S3 client is needed, so skip the IAM/STS/OpenSearch setup of __init__
+        self.kb = KnowledgeBasesForAmazonBedrock.__new__(KnowledgeBasesForAmazonBedrock)
+        self.kb.s3_client = boto3.client("s3", region_name="us-east-1")
+        self.kb.s3_client.create_bucket(Bucket=BUCKET)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.files = os.path.join(self.tmp.name, "kb_files")
+        os.makedirs(os.path.join(self.files, "menus"))
+        self.write("restaurants.txt", "Bistro AWS")
+        self.write("menus/bistro.txt", "Soup of the day")
+
+    def write(self, relative_path, content):
+        with open(os.path.join(self.files, relative_path), "w") as file:
+            file.write(content)
+
+    def keys(self):
+        response = self.kb.s3_client.list_objects_v2(Bucket=BUCKET)
+        return sorted(item["Key"] for item in response.get("Contents", []))
+
+    def test_first_upload_sends_every_file(self):
+        result = self.kb.upload_directory(self.files, BUCKET)
+        self.assertEqual(result["uploaded"], ["menus/bistro.txt", "restaurants.txt"])
+        self.assertEqual(result["skipped"], [])
+        self.assertEqual(self.keys(), ["menus/bistro.txt", "restaurants.txt"])
+        self.assertTrue(os.path.exists(os.path.join(self.files, upload_manifest_name)))
+
+    def test_second_upload_only_sends_changed_files(self):
+        self.kb.upload_directory(self.files, BUCKET)
+        self.write("menus/bistro.txt", "Soup of the day: tomato")
+        result = self.kb.upload_directory(self.files, BUCKET)
+        self.assertEqual(result["uploaded"], ["menus/bistro.txt"])
+        self.assertEqual(result["skipped"], ["restaurants.txt"])
+        body = self.kb.s3_client.get_object(Bucket=BUCKET, Key="menus/bistro.txt")["Body"].read()
+        self.assertEqual(body, b"Soup of the day: tomato")
+
+    def test_missing_object_is_uploaded_again(self):
+        self.kb.upload_directory(self.files, BUCKET)
+        self.kb.s3_client.delete_object(Bucket=BUCKET, Key="restaurants.txt")
+        result = self.kb.upload_directory(self.files, BUCKET)
+        self.assertEqual(result["uploaded"], ["restaurants.txt"])
+
+    def test_manifest_of_another_bucket_is_ignored(self):
+        self.kb.upload_directory(self.files, BUCKET)
+        self.kb.s3_client.create_bucket(Bucket="other-bucket")
+        result = self.kb.upload_directory(self.files, "other-bucket")
+        self.assertEqual(result["uploaded"], ["menus/bistro.txt", "restaurants.txt"])
+
+    def test_delete_stale_removes_deleted_files(self):
+        self.kb.upload_directory(self.files, BUCKET)
+        os.remove(os.path.join(self.files, "restaurants.txt"))
+        result = self.kb.upload_directory(self.files, BUCKET, delete_stale=True)
+        self.assertEqual(result["deleted"], ["restaurants.txt"])
+        self.assertEqual(self.keys(), ["menus/bistro.txt"])
+
+    def test_manifest_is_not_uploaded(self):
+        self.kb.upload_directory(self.files, BUCKET)
+        self.kb.upload_directory(self.files, BUCKET)
+        self.assertNotIn(upload_manifest_name, self.keys())
+
+
+class TestSynchronizeData(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+
+        self.kb = KnowledgeBasesForAmazonBedrock.__new__(KnowledgeBasesForAmazonBedrock)
+        self.kb.step_timings = {}
+        self.kb.s3_client = boto3.client("s3", region_name="us-east-1")
+        self.kb.s3_client.create_bucket(Bucket=BUCKET)
+        self.kb.s3_client.put_object(Bucket=BUCKET, Key="restaurants.txt", Body=b"Bistro AWS")
+        self.kb.bedrock_agent_client = FakeBedrockAgent(
+            {"type": "S3", "s3Configuration": {"bucketArn": f"arn:aws:s3:::{BUCKET}"}}
+        )
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.state_path = os.path.join(self.tmp.name, "state", "sync.json")
+
+    def sync(self, **kwargs):
+        return self.kb.synchronize_data("kb", "ds", sync_state_path=self.state_path, **kwargs)
+
+    def test_unchanged_data_source_is_skipped(self):
+        self.assertEqual(self.sync(incremental=True)["status"], "COMPLETE")
+        self.assertEqual(self.sync(incremental=True)["status"], "SKIPPED")
+        self.kb.s3_client.put_object(Bucket=BUCKET, Key="menu.txt", Body=b"Soup")
+        stats = self.sync(incremental=True)
+        self.assertEqual(stats["status"], "COMPLETE")
+        self.assertEqual(stats["changes"], {"added": 1, "modified": 0, "deleted": 0})
+
+    def test_failed_documents_are_synced_again(self):
+        self.kb.bedrock_agent_client.statistics = {"numberOfDocumentsFailed": 1}
+        self.sync(incremental=True)
+        self.assertFalse(os.path.exists(self.state_path))
+        self.kb.bedrock_agent_client.statistics = {}
+        self.assertEqual(self.sync(incremental=True)["status"], "COMPLETE")
+        self.assertEqual(self.kb.bedrock_agent_client.jobs_started, 2)
+
+    def test_full_sync_does_not_need_the_bucket(self):
+        self.kb.bedrock_agent_client.data_source_config = {"type": "WEB"}
+        self.assertEqual(self.sync()["status"], "COMPLETE")
+        self.assertEqual(self.kb.bedrock_agent_client.data_source_lookups, 0)
+        self.assertFalse(os.path.exists(self.state_path))
+        with self.assertRaises(ValueError):
+            self.sync(incremental=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,7 +7,11 @@ to OpenInference format for compatibility with Arize AI.
 
 import json
 import logging
-from typing import Any, Dict, List, Optional, Set
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
 from opentelemetry.sdk.trace import SpanProcessor
@@ -15,28 +19,181 @@ from opentelemetry.trace import Span
 
 logger = logging.getLogger(__name__)
 
+
+class SpanRegistry:
+    """
+    Bounded registry of in-flight spans used to resolve parent/child relationships.
+
+    Entries are kept in insertion order and evicted when the registry exceeds
+    `max_spans` or when they are older than `ttl_seconds`. All entries belonging
+    to a trace are pruned as soon as the trace's root span ends.
+    """
+
+    def __init__(self, max_spans: int = 10000, ttl_seconds: float = 3600.0):
+        """
+        Initialize the registry.
+
+        Args:
+            max_spans: Maximum number of spans kept at any time
+            ttl_seconds: Maximum age of an entry before it is evicted
+        """
+        self.max_spans = max_spans
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._traces = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted_size = 0
+        self.evicted_ttl = 0
+        self.pruned = 0
+
+    def add(self, span_id: int, trace_id: int, info: Dict[str, Any]):
+        """Register a span and evict expired or overflowing entries."""
+        now = time.monotonic()
+        with self._lock:
+            self._entries[span_id] = (now, trace_id, info)
+            self._entries.move_to_end(span_id)
+            self._traces.setdefault(trace_id, set()).add(span_id)
+            self._evict(now)
+
+    def get(self, span_id: Optional[int], default: Any = None) -> Any:
+        """Return the info registered for a span, counting hits and misses."""
+        with self._lock:
+            entry = self._entries.get(span_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[2]
+
+    def __contains__(self, span_id: int) -> bool:
+        with self._lock:
+            return span_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def prune_trace(self, trace_id: int):
+        """Drop every entry belonging to a trace."""
+        with self._lock:
+            for span_id in self._traces.pop(trace_id, ()):
+                if self._entries.pop(span_id, None) is not None:
+                    self.pruned += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "traces": len(self._traces),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted_size": self.evicted_size,
+                "evicted_ttl": self.evicted_ttl,
+                "pruned": self.pruned,
+            }
+
+    def _evict(self, now: float):
+        """Evict the oldest entries while over capacity or past their TTL."""
+        while self._entries:
+            span_id, (created, trace_id, _) = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_spans:
+                self.evicted_size += 1
+            elif now - created > self.ttl_seconds:
+                self.evicted_ttl += 1
+            else:
+                break
+            del self._entries[span_id]
+            trace_spans = self._traces.get(trace_id)
+            if trace_spans is not None:
+                trace_spans.discard(span_id)
+                if not trace_spans:
+                    del self._traces[trace_id]
+
+
 class StrandsToOpenInferenceProcessor(SpanProcessor):
     """
     SpanProcessor that converts Strands telemetry attributes to OpenInference format
     for compatibility with Arize AI.
+
+    By default spans are converted inline in `on_end`. With `async_conversion=True`,
+    `on_end` only records the span's hierarchy and queues it; a pool of worker
+    threads converts queued spans in batches and then hands them to `downstream`
+    (typically the `BatchSpanProcessor` wrapping the exporter), so the agent's
+    event loop never pays for the JSON transformation.
     """
 
-    def __init__(self, debug: bool = False):
+    BACKPRESSURE_POLICIES = ("drop", "block")
+    # How often a blocked on_end checks that workers are still running
+    BLOCK_PUT_TIMEOUT_SECONDS = 0.5
+
+    def __init__(
+        self,
+        debug: bool = False,
+        max_spans: int = 10000,
+        span_ttl_seconds: float = 3600.0,
+        max_attribute_length: Optional[int] = None,
+        downstream: Optional[SpanProcessor] = None,
+        async_conversion: bool = False,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 64,
+        workers: int = 1,
+        backpressure: str = "drop",
+    ):
         """
         Initialize the processor.
         
         Args:
             debug: Whether to log debug information
+            max_spans: Maximum number of in-flight spans tracked for hierarchy lookups
+            span_ttl_seconds: Age after which a tracked span is evicted even if its trace never ended
+            max_attribute_length: Optional cap on the length of each serialized message field;
+                longer values are cut and suffixed with a truncation marker
+            downstream: Processor that receives spans after conversion. Required when
+                `async_conversion` is enabled; it must not also be registered on the provider
+            async_conversion: Queue spans in `on_end` and convert them on worker threads
+            max_queue_size: Maximum number of spans waiting for conversion
+            max_batch_size: Maximum number of spans a worker converts per batch
+            workers: Number of conversion worker threads
+            backpressure: What `on_end` does when the queue is full: "drop" the span
+                or "block" until there is room
         """
         super().__init__()
+        if backpressure not in self.BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {self.BACKPRESSURE_POLICIES}, got {backpressure!r}")
+        if async_conversion and downstream is None:
+            raise ValueError("async_conversion requires a downstream processor to receive converted spans")
+
         self.debug = debug
-        self.processed_spans = set()
+        self.max_attribute_length = max_attribute_length
+        self.processed_count = 0
+        self.dropped_count = 0
         self.current_cycle_id = None
-        self.span_hierarchy = {}
+        self.span_hierarchy = SpanRegistry(max_spans=max_spans, ttl_seconds=span_ttl_seconds)
+        self.downstream = downstream
+        self.async_conversion = async_conversion
+        self.max_batch_size = max_batch_size
+        self.backpressure = backpressure
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._shutdown = False
+        self._workers = []
+
+        if async_conversion:
+            for idx in range(workers):
+                worker = threading.Thread(
+                    target=self._worker_loop, name=f"openinference-converter-{idx}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
 
     def on_start(self, span, parent_context=None):
         """Called when a span is started. Track span hierarchy."""
-        span_id = span.get_span_context().span_id
+        span_context = span.get_span_context()
+        span_id = span_context.span_id
         parent_id = None
         
         if parent_context and hasattr(parent_context, 'span_id'):
@@ -44,35 +201,144 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         elif span.parent and hasattr(span.parent, 'span_id'):
             parent_id = span.parent.span_id
             
-        self.span_hierarchy[span_id] = {
+        self.span_hierarchy.add(span_id, span_context.trace_id, {
             'name': span.name,
             'span_id': span_id,
             'parent_id': parent_id,
             'start_time': datetime.now().isoformat()
-        }
+        })
+
+    def get_registry_stats(self) -> Dict[str, int]:
+        """Return span registry counters (size, hits, misses, evictions, pruned)."""
+        return self.span_hierarchy.stats()
 
     def on_end(self, span: Span):
         """
         Called when a span ends. Transform the span attributes from Strands format
-        to OpenInference format.
+        to OpenInference format, either inline or by queueing it for a worker.
         """
+        try:
+            # Resolve the hierarchy now: the registry entries may be pruned before a worker runs
+            hierarchy = self._resolve_hierarchy(span)
+            if self.async_conversion:
+                self._enqueue(span, hierarchy)
+            else:
+                self._process_span(span, hierarchy)
+                if self.downstream is not None:
+                    self.downstream.on_end(span)
+        finally:
+            # Children always end before their root, so the whole trace can go once the root ends
+            if span.parent is None:
+                self.span_hierarchy.prune_trace(span.get_span_context().trace_id)
+
+    def _resolve_hierarchy(self, span: Span) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Look up the registry info of a span and of its parent."""
+        span_info = self.span_hierarchy.get(span.get_span_context().span_id, {})
+        parent_id = span_info.get('parent_id')
+        parent_info = self.span_hierarchy.get(parent_id, {}) if parent_id else {}
+        return span_info, parent_info
+
+    def _enqueue(self, span: Span, hierarchy: Tuple[Dict[str, Any], Dict[str, Any]]):
+        """Queue a span for conversion, applying the backpressure policy when full."""
+        # The flag is checked and the span counted as pending under the lock shutdown()
+        # sets the flag under, so shutdown drains it before queueing the worker sentinels
+        with self._pending_cond:
+            if self._shutdown:
+                self.dropped_count += 1
+                return
+            self._pending += 1
+            try:
+                self._queue.put_nowait((span, hierarchy))
+                return
+            except queue.Full:
+                if self.backpressure != "block":
+                    self._drop(span)
+                    return
+
+        # Blocking while holding the lock would stall the workers that make room
+        try:
+            self._put_blocking((span, hierarchy))
+        except queue.Full:
+            with self._pending_cond:
+                self._drop(span)
+
+    def _put_blocking(self, item):
+        """Wait for room in the queue, giving up once no worker is left to make some."""
+        while True:
+            try:
+                self._queue.put(item, timeout=self.BLOCK_PUT_TIMEOUT_SECONDS)
+                return
+            except queue.Full:
+                if not any(worker.is_alive() for worker in self._workers):
+                    raise
+
+    def _drop(self, span: Span):
+        """Count a span that could not be queued. Must be called with the lock held."""
+        self.dropped_count += 1
+        self._task_done(1)
+        if self.debug:
+            logger.info(f"Conversion queue full, dropped span '{span.name}'")
+
+    def _worker_loop(self):
+        """Convert queued spans in batches and forward them downstream."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            for span, hierarchy in batch:
+                try:
+                    self._process_span(span, hierarchy)
+                    self.downstream.on_end(span)
+                except Exception as e:
+                    logger.error(f"Failed to forward span '{span.name}': {e}", exc_info=True)
+            self._task_done(len(batch))
+
+            if stop:
+                return
+
+    def _task_done(self, count: int):
+        """Mark queued spans as handled and wake up flushers."""
+        with self._pending_cond:
+            self._pending -= count
+            if self._pending <= 0:
+                self._pending_cond.notify_all()
+
+    def _drain(self, timeout_millis: Optional[int]) -> bool:
+        """Wait until every queued span has been converted and forwarded."""
+        timeout = None if timeout_millis is None else timeout_millis / 1000
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending <= 0, timeout=timeout)
+
+    def _process_span(self, span: Span, hierarchy: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None):
+        """Transform a finished span in place."""
         if not hasattr(span, '_attributes') or not span._attributes:
             return
 
         original_attrs = dict(span._attributes)
-        span_id = span.get_span_context().span_id
-        
-        if span_id in self.span_hierarchy:
-            self.span_hierarchy[span_id]['attributes'] = original_attrs
         
         try:
             if "event_loop.cycle_id" in original_attrs:
                 self.current_cycle_id = original_attrs.get("event_loop.cycle_id")
             
-            transformed_attrs = self._transform_attributes(original_attrs, span)
+            transformed_attrs = self._transform_attributes(original_attrs, span, hierarchy)
             span._attributes.clear()
             span._attributes.update(transformed_attrs)
-            self.processed_spans.add(span_id)
+            # Workers convert concurrently, so the counter shares the pending-spans lock
+            with self._pending_cond:
+                self.processed_count += 1
             
             if self.debug:
                 logger.info(f"Transformed span '{span.name}': {len(original_attrs)} -> {len(transformed_attrs)} attributes")
@@ -82,14 +348,19 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             span._attributes.clear()
             span._attributes.update(original_attrs)
 
-    def _transform_attributes(self, attrs: Dict[str, Any], span: Span) -> Dict[str, Any]:
+    def _transform_attributes(
+        self,
+        attrs: Dict[str, Any],
+        span: Span,
+        hierarchy: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
         """
         Transform Strands attributes to OpenInference format.
         """
         result = {}
         span_kind = self._determine_span_kind(span, attrs)
         result["openinference.span.kind"] = span_kind
-        self._set_graph_node_attributes(span, attrs, result)
+        self._set_graph_node_attributes(span, attrs, result, hierarchy)
         prompt = attrs.get("gen_ai.prompt")
         completion = attrs.get("gen_ai.completion")
         model_id = attrs.get("gen_ai.request.model")
@@ -152,7 +423,13 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             return "CHAIN"
         return "CHAIN"
     
-    def _set_graph_node_attributes(self, span: Span, attrs: Dict[str, Any], result: Dict[str, Any]):
+    def _set_graph_node_attributes(
+        self,
+        span: Span,
+        attrs: Dict[str, Any],
+        result: Dict[str, Any],
+        hierarchy: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
+    ):
         """
         Set graph node attributes for Arize visualization.
         Hierarchy: Agent -> Cycles -> (LLMs and/or Tools)
@@ -162,9 +439,8 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         span_id = span.get_span_context().span_id
         
         # Get parent information from span hierarchy
-        span_info = self.span_hierarchy.get(span_id, {})
+        span_info, parent_info = hierarchy or self._resolve_hierarchy(span)
         parent_id = span_info.get('parent_id')
-        parent_info = self.span_hierarchy.get(parent_id, {}) if parent_id else {}
         parent_name = parent_info.get('name', '')
         
         if span_kind == "AGENT":
@@ -208,13 +484,14 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
 
     def _handle_chain_and_llm_span(self, attrs: Dict[str, Any], result: Dict[str, Any], prompt: Any, completion: Any):
         """Handle LLM-specific attributes."""
+        encoded_messages = {}
         if prompt:
-            self._map_messages(prompt, result, is_input=True)
+            encoded_messages["input"] = self._map_messages(prompt, result, is_input=True)
         
         if completion:
-            self._map_messages(completion, result, is_input=False)
+            encoded_messages["output"] = self._map_messages(completion, result, is_input=False)
         
-        self._add_input_output_values(attrs, result)
+        self._add_input_output_values(attrs, result, encoded_messages)
         self._map_invocation_parameters(attrs, result)
     
     def _handle_tool_span(self, attrs: Dict[str, Any], result: Dict[str, Any]):
@@ -232,11 +509,12 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             result["tool.description"] = tool_description
         
         if tool_params := attrs.get("tool.parameters"):
-            result["tool.parameters"] = self._serialize_value(tool_params)
+            serialized_params = self._serialize_value(tool_params)
+            result["tool.parameters"] = serialized_params
             tool_call = {
                 "tool_call.id": attrs.get("tool.id", ""),
                 "tool_call.function.name": attrs.get("tool.name", ""),
-                "tool_call.function.arguments": self._serialize_value(tool_params)
+                "tool_call.function.arguments": serialized_params
             }
             
             input_message = {
@@ -247,7 +525,7 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             result["llm.input_messages.0.message.role"] = "assistant"
             result["tool_call.id"] = attrs.get("tool.id", "")
             result["tool_call.function.name"] = attrs.get("tool.name", "")
-            result["tool_call.function.arguments"] = self._serialize_value(tool_params)
+            result["tool_call.function.arguments"] = serialized_params
         
             for key, value in tool_call.items():
                 result[f"llm.input_messages.0.message.tool_calls.0.{key}"] = value
@@ -261,9 +539,10 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 if "error" in tool_result:
                     result["tool.error"] = self._serialize_value(tool_result.get("error"))
 
+            serialized_content = self._serialize_value(tool_result_content)
             output_message = {
                 "message.role": "tool",
-                "message.content": self._serialize_value(tool_result_content),
+                "message.content": serialized_content,
                 "message.tool_call_id": attrs.get("tool.id", "")
             }
 
@@ -271,7 +550,7 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 output_message["message.name"] = tool_name
             result["llm.output_messages"] = json.dumps([output_message], separators=(",", ":"))
             result["llm.output_messages.0.message.role"] = "tool"
-            result["llm.output_messages.0.message.content"] = self._serialize_value(tool_result_content)
+            result["llm.output_messages.0.message.content"] = serialized_content
             result["llm.output_messages.0.message.tool_call_id"] = attrs.get("tool.id", "")
             
             if tool_name:
@@ -310,8 +589,15 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
             result["llm.input_messages.0.message.content"] = str(prompt)
         self._add_input_output_values(attrs, result)  
     
-    def _map_messages(self, messages_data: Any, result: Dict[str, Any], is_input: bool):
-        """Map Strands messages to OpenInference message format."""
+    def _map_messages(self, messages_data: Any, result: Dict[str, Any], is_input: bool) -> List[Dict[str, Tuple[Any, str]]]:
+        """
+        Map Strands messages to OpenInference message format.
+
+        Every message field is JSON-encoded exactly once. The encoded fragments are
+        spliced together to build the `llm.*_messages` attribute and are returned
+        (keyed by field name, as `(flat_value, encoded_json)` pairs) so callers can
+        reuse them for `input.value`/`output.value` without re-serializing.
+        """
         key_prefix = "llm.input_messages" if is_input else "llm.output_messages"
         
         if isinstance(messages_data, str):
@@ -321,25 +607,48 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
                 messages_data = [{"role": "user" if is_input else "assistant", "content": messages_data}]
         
         messages_list = self._normalize_messages(messages_data)
-        result[key_prefix] = json.dumps(messages_list, separators=(",", ":"))
+        flattened = {}
+        encoded_messages = []
+        message_fragments = []
 
         for idx, msg in enumerate(messages_list):
             if not isinstance(msg, dict):
+                message_fragments.append(self._encode_value(msg)[1])
                 continue
-                
+
+            fields = {}
+            field_fragments = []
             for sub_key, sub_val in msg.items():
                 clean_key = sub_key.replace("message.", "") if sub_key.startswith("message.") else sub_key
                 dotted_key = f"{key_prefix}.{idx}.message.{clean_key}"
                 
                 if clean_key == "tool_calls" and isinstance(sub_val, list):
                     # Handle tool calls with proper structure
+                    call_fragments = []
                     for tool_idx, tool_call in enumerate(sub_val):
-                        if isinstance(tool_call, dict):
-                            for tool_key, tool_val in tool_call.items():
-                                tool_dotted_key = f"{key_prefix}.{idx}.message.tool_calls.{tool_idx}.{tool_key}"
-                                result[tool_dotted_key] = self._serialize_value(tool_val)
+                        if not isinstance(tool_call, dict):
+                            call_fragments.append(self._encode_value(tool_call)[1])
+                            continue
+                        call_fields = []
+                        for tool_key, tool_val in tool_call.items():
+                            flat, encoded = self._encode_value(tool_val)
+                            flattened[f"{key_prefix}.{idx}.message.tool_calls.{tool_idx}.{tool_key}"] = flat
+                            call_fields.append(f"{json.dumps(tool_key)}:{encoded}")
+                        call_fragments.append("{" + ",".join(call_fields) + "}")
+                    encoded = "[" + ",".join(call_fragments) + "]"
+                    fields[clean_key] = (sub_val, encoded)
                 else:
-                    result[dotted_key] = self._serialize_value(sub_val)
+                    flat, encoded = self._encode_value(sub_val)
+                    flattened[dotted_key] = flat
+                    fields[clean_key] = (flat, encoded)
+                field_fragments.append(f"{json.dumps(sub_key)}:{encoded}")
+
+            encoded_messages.append(fields)
+            message_fragments.append("{" + ",".join(field_fragments) + "}")
+
+        result[key_prefix] = "[" + ",".join(message_fragments) + "]"
+        result.update(flattened)
+        return encoded_messages
     
     def _normalize_messages(self, data: Any) -> List[Dict[str, Any]]:
         """Normalize messages data to a consistent list format."""
@@ -438,71 +747,49 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
         if params:
             result["llm.invocation_parameters"] = json.dumps(params, separators=(",", ":"))
     
-    def _add_input_output_values(self, attrs: Dict[str, Any], result: Dict[str, Any]):
-        """Add input.value and output.value for Arize compatibility."""
+    def _add_input_output_values(
+        self,
+        attrs: Dict[str, Any],
+        result: Dict[str, Any],
+        encoded_messages: Optional[Dict[str, List[Dict[str, Tuple[Any, str]]]]] = None,
+    ):
+        """
+        Add input.value and output.value for Arize compatibility.
+
+        LLM payloads are assembled from the fragments produced by `_map_messages`
+        rather than by parsing and re-encoding `llm.*_messages`.
+        """
         span_kind = result.get("openinference.span.kind")
         model_name = result.get("llm.model_name") or attrs.get("gen_ai.request.model") or "unknown"
-        invocation_params = {}
-        if "llm.invocation_parameters" in result:
-            try:
-                invocation_params = json.loads(result["llm.invocation_parameters"])
-            except:
-                pass
+        encoded_messages = encoded_messages or {}
         
         if span_kind == "LLM":
-            if "llm.input_messages" in result:
-                try:
-                    input_messages = json.loads(result["llm.input_messages"])
-                    if input_messages:
-                        input_structure = {
-                            "messages": input_messages,
-                            "model": model_name
-                        }
-                        if max_tokens := invocation_params.get("max_tokens"):
-                            input_structure["max_tokens"] = max_tokens
-                        
-                        result["input.value"] = json.dumps(input_structure, separators=(",", ":"))
-                        result["input.mime_type"] = "application/json"
-                except:
-                    if prompt_content := result.get("llm.input_messages.0.message.content"):
-                        result["input.value"] = prompt_content
-                        result["input.mime_type"] = "application/json"
-
-            if "llm.output_messages" in result:
-                try:
-                    output_messages = json.loads(result["llm.output_messages"])
-                    if output_messages and len(output_messages) > 0:
-                        first_msg = output_messages[0]
-                        content = first_msg.get("message.content", "")
-                        role = first_msg.get("message.role", "assistant")
-                        finish_reason = first_msg.get("message.finish_reason", "stop")
-                        output_structure = {
-                            "id": attrs.get("gen_ai.response.id"),
-                            "choices": [{
-                                "finish_reason": finish_reason,
-                                "index": 0,
-                                "logprobs": None,
-                                "message": {
-                                    "content": content,
-                                    "role": role,
-                                    "refusal": None,
-                                    "annotations": []
-                                }
-                            }],
-                            "model": model_name,
-                            "usage": {
-                                "completion_tokens": result.get("llm.token_count.completion"),
-                                "prompt_tokens": result.get("llm.token_count.prompt"),
-                                "total_tokens": result.get("llm.token_count.total")
-                            }
-                        }
-                        
-                        result["output.value"] = json.dumps(output_structure, separators=(",", ":"))
-                        result["output.mime_type"] = "application/json"
-                except:
-                    if completion_content := result.get("llm.output_messages.0.message.content"):
-                        result["output.value"] = completion_content
-                        result["output.mime_type"] = "application/json"
+            if encoded_messages.get("input"):
+                input_value = '{"messages":' + result["llm.input_messages"] + ',"model":' + json.dumps(model_name)
+                if "llm.invocation_parameters" in result and (max_tokens := attrs.get("max_tokens")):
+                    input_value += ',"max_tokens":' + json.dumps(max_tokens)
+                result["input.value"] = input_value + "}"
+                result["input.mime_type"] = "application/json"
+
+            if encoded_messages.get("output"):
+                first_msg = encoded_messages["output"][0]
+                content = first_msg["content"][1] if "content" in first_msg else '""'
+                role = first_msg["role"][0] if "role" in first_msg else "assistant"
+                finish_reason = first_msg["finish_reason"][0] if "finish_reason" in first_msg else "stop"
+                usage = {
+                    "completion_tokens": result.get("llm.token_count.completion"),
+                    "prompt_tokens": result.get("llm.token_count.prompt"),
+                    "total_tokens": result.get("llm.token_count.total")
+                }
+                result["output.value"] = (
+                    '{"id":' + json.dumps(attrs.get("gen_ai.response.id"))
+                    + ',"choices":[{"finish_reason":' + json.dumps(finish_reason)
+                    + ',"index":0,"logprobs":null,"message":{"content":' + content
+                    + ',"role":' + json.dumps(role)
+                    + ',"refusal":null,"annotations":[]}}],"model":' + json.dumps(model_name)
+                    + ',"usage":' + json.dumps(usage, separators=(",", ":")) + "}"
+                )
+                result["output.mime_type"] = "application/json"
                     
         elif span_kind == "AGENT":
             if prompt := attrs.get("gen_ai.prompt"):
@@ -557,18 +844,64 @@ class StrandsToOpenInferenceProcessor(SpanProcessor):
     
     def _serialize_value(self, value: Any) -> Any:
         """Ensure a value is serializable."""
-        if isinstance(value, (str, int, float, bool)) or value is None:
-            return value
-        
+        return self._encode_value(value)[0]
+
+    def _encode_value(self, value: Any) -> Tuple[Any, str]:
+        """
+        Serialize a value once and return `(flat_value, encoded_json)`.
+
+        `flat_value` is what goes into a flattened span attribute (primitives as-is,
+        everything else as a JSON string); `encoded_json` is the same value as a JSON
+        fragment ready to be embedded in a larger document. Values longer than
+        `max_attribute_length` are truncated with a marker.
+        """
+        if isinstance(value, (int, float, bool)) or value is None:
+            return value, json.dumps(value)
+
+        if isinstance(value, str):
+            flat = self._truncate(value)
+            return flat, json.dumps(flat)
+
         try:
-            return json.dumps(value, separators=(",", ":"))
+            encoded = json.dumps(value, separators=(",", ":"))
         except (TypeError, OverflowError):
-            return str(value)
+            flat = self._truncate(str(value))
+            return flat, json.dumps(flat)
+
+        if self.max_attribute_length is not None and len(encoded) > self.max_attribute_length:
+            flat = self._truncate(encoded)
+            return flat, json.dumps(flat)
+        return encoded, encoded
+
+    def _truncate(self, text: str) -> str:
+        """Cut a string to `max_attribute_length` characters and append a marker."""
+        limit = self.max_attribute_length
+        if limit is None or len(text) <= limit:
+            return text
+        return f"{text[:limit]}...[truncated {len(text) - limit} chars]"
 
     def shutdown(self):
-        """Called when the processor is shutdown."""
-        pass
+        """Called when the processor is shutdown. Drains the queue and stops the workers."""
+        with self._pending_cond:
+            if self._shutdown:
+                return
+            self._shutdown = True
+
+        if self._workers:
+            self._drain(None)
+            for _ in self._workers:
+                self._queue.put(None)
+            for worker in self._workers:
+                worker.join()
+            self._workers = []
+
+        if self.downstream is not None:
+            self.downstream.shutdown()
 
-    def force_flush(self, timeout_millis=None):
-        """Called to force flush."""
+    def force_flush(self, timeout_millis=30000):
+        """Called to force flush. Waits for queued spans, then flushes downstream."""
+        if self._workers and not self._drain(timeout_millis):
+            return False
+        if self.downstream is not None:
+            return self.downstream.force_flush(timeout_millis)
         return True
\ No newline at end of file
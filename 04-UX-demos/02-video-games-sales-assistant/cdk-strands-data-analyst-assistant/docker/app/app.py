@@ -12,7 +12,9 @@ import os
 
 # Import my tools
 from tools import get_tables_information, load_file_content
-from postgresql_query_utils import run_sql_query_on_postgresql
+from postgresql_query_utils import run_sql_query_on_postgresql, get_connection_pool_metrics
+from postgresql_query_utils import ENV as POSTGRESQL_ENV
+from query_cache import create_query_cache, normalize_sql, is_read_only_query, referenced_tables
 from strands.models import BedrockModel
 from utils import save_raw_query_result
 from utils import read_messages_by_session
@@ -44,6 +46,10 @@ def load_system_prompt():
 # Load the system prompt
 DATA_ANALYST_SYSTEM_PROMPT = load_system_prompt()
 
+# Cache of SQL query results shared by all requests of this process
+QUERY_CACHE = create_query_cache()
+QUERY_CACHE_ENDPOINT = f"{POSTGRESQL_ENV['POSTGRESQL_HOST']}/{POSTGRESQL_ENV['DATABASE_NAME']}"
+
 @app.get('/health')
 def health_check():
     """
@@ -55,6 +61,47 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get('/metrics')
+def metrics():
+    """
+    Usage metrics of the process-wide resources (PostgreSQL connection pool, query cache).
+    
+    Returns:
+        dict: Metrics of the current worker process
+    """
+    return {
+        "pid": os.getpid(),
+        "postgresql_pool": get_connection_pool_metrics(),
+        "query_cache": QUERY_CACHE.stats() if QUERY_CACHE else None
+    }
+
+
+class CacheInvalidationRequest(BaseModel):
+    """
+    Request model for the query cache invalidation endpoint.
+    
+    Attributes:
+        table (str, optional): Only invalidate the queries reading from this table
+    """
+    table: str = None
+
+
+@app.post('/cache/invalidate')
+def invalidate_query_cache(request: CacheInvalidationRequest):
+    """
+    Invalidate cached SQL query results, e.g. after the data of a table was reloaded.
+    
+    Args:
+        request (CacheInvalidationRequest): The optional table to invalidate
+        
+    Returns:
+        dict: Number of entries removed from the local cache
+    """
+    if not QUERY_CACHE:
+        return {"invalidated": 0}
+    return {"invalidated": QUERY_CACHE.invalidate(QUERY_CACHE_ENDPOINT, request.table)}
+
+
 async def run_data_analyst_assistant_with_stream_response(bedrock_model, system_prompt: str, prompt: str, prompt_uuid: str, session_id: str):
     """
     Run the data analyst assistant and stream the response.
@@ -72,6 +119,8 @@ async def run_data_analyst_assistant_with_stream_response(bedrock_model, system_
     user_prompt = prompt
     user_prompt_uuid = prompt_uuid
     user_session_id = session_id
+    # Normalized queries already saved for this prompt, so repeated tool calls are stored once
+    saved_queries = set()
 
     @tool
     def execute_sql_query(sql_query: str, description: str) -> str:
@@ -88,13 +137,28 @@ async def run_data_analyst_assistant_with_stream_response(bedrock_model, system_
         nonlocal user_prompt
         nonlocal user_prompt_uuid
         try:
-            # Execute the SQL query using the existing function
-            # But we need to parse the response first
-            response_json = json.loads(run_sql_query_on_postgresql(sql_query))
+            # Reuse the result of an identical query when it is cached
+            cacheable = QUERY_CACHE is not None and is_read_only_query(sql_query)
+            cached_response = QUERY_CACHE.get(sql_query, QUERY_CACHE_ENDPOINT) if cacheable else None
+            if cached_response is not None:
+                response_json = json.loads(cached_response)
+            else:
+                # Execute the SQL query using the existing function
+                # But we need to parse the response first
+                raw_response = run_sql_query_on_postgresql(sql_query)
+                response_json = json.loads(raw_response)
             
             # Check if there was an error
             if "error" in response_json:
                 return json.dumps(response_json)
+
+            # Only successful reads are cached; writes invalidate the tables they touch
+            if QUERY_CACHE and cached_response is None:
+                if cacheable:
+                    QUERY_CACHE.put(sql_query, QUERY_CACHE_ENDPOINT, raw_response)
+                else:
+                    for table in referenced_tables(sql_query):
+                        QUERY_CACHE.invalidate(QUERY_CACHE_ENDPOINT, table)
             
             # Extract the results
             records_to_return = response_json.get("result", [])
@@ -111,6 +175,11 @@ async def run_data_analyst_assistant_with_stream_response(bedrock_model, system_
                     "result": records_to_return
                 }
             
+            # The same query is saved once per prompt; other prompts still get their own copy
+            normalized_query = normalize_sql(sql_query)
+            if normalized_query in saved_queries:
+                return json.dumps(result)
+
             # Save to DynamoDB using the new function
             save_result = save_raw_query_result(
                 user_prompt_uuid,
@@ -124,6 +193,8 @@ async def run_data_analyst_assistant_with_stream_response(bedrock_model, system_
             if not save_result["success"]:
                 result["saved"] = False
                 result["save_error"] = save_result["error"]
+            else:
+                saved_queries.add(normalized_query)
                 
             return json.dumps(result)
                 
@@ -1,8 +1,11 @@
+from contextlib import contextmanager
 from datetime import datetime, date
 import boto3
 import json
 import psycopg2
 import os
+import threading
+import time
 from botocore.exceptions import ClientError
 from decimal import Decimal
 
@@ -13,9 +16,23 @@ ENV = {
     "DATABASE_NAME": os.environ.get("DATABASE_NAME"),
     "QUESTION_ANSWERS_TABLE": os.environ.get("QUESTION_ANSWERS_TABLE"),
     "MAX_RESPONSE_SIZE_BYTES": int(os.environ.get("MAX_RESPONSE_SIZE_BYTES", 25600)),
-    "AWS_REGION": os.environ.get("AWS_REGION", "us-east-1")
+    "AWS_REGION": os.environ.get("AWS_REGION", "us-east-1"),
+    "SECRET_CACHE_TTL_SECONDS": int(os.environ.get("SECRET_CACHE_TTL_SECONDS", 300)),
+    "POOL_MAX_CONNECTIONS": int(os.environ.get("POOL_MAX_CONNECTIONS", 10)),
+    "POOL_MAX_LIFETIME_SECONDS": int(os.environ.get("POOL_MAX_LIFETIME_SECONDS", 1800)),
+    "POOL_HEALTH_CHECK_IDLE_SECONDS": int(os.environ.get("POOL_HEALTH_CHECK_IDLE_SECONDS", 30)),
+    "POOL_CHECKOUT_TIMEOUT_SECONDS": int(os.environ.get("POOL_CHECKOUT_TIMEOUT_SECONDS", 30)),
+    "FETCH_CHUNK_ROWS": int(os.environ.get("FETCH_CHUNK_ROWS", 500)),
 }
 
+# Statements that can be declared as a server-side cursor
+SERVER_SIDE_CURSOR_PREFIXES = ("select", "with", "values", "table", "(")
+
+# Secrets Manager clients and cached secrets, shared by every request of the process
+_secrets_manager_clients = {}
+_secret_cache = {}
+_secret_lock = threading.Lock()
+
 
 def validate_environment():
     """
@@ -31,9 +48,56 @@ def validate_environment():
         raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
 
+def get_secret_with_version(secret_name: str, region_name: str, force_refresh: bool = False) -> tuple:
+    """
+    Retrieves a secret from AWS Secrets Manager, caching it for SECRET_CACHE_TTL_SECONDS.
+    
+    Args:
+        secret_name: Name of the secret in AWS Secrets Manager
+        region_name: AWS region where the secret is stored
+        force_refresh: Ignore the cached value, e.g. after an authentication failure
+        
+    Returns:
+        tuple: The secret values as a dictionary and the secret VersionId
+        
+    Raises:
+        ClientError: If there's an error retrieving the secret
+    """
+    cache_key = (secret_name, region_name)
+    with _secret_lock:
+        cached = _secret_cache.get(cache_key)
+        if (
+            not force_refresh
+            and cached is not None
+            and time.monotonic() - cached["fetched_at"] < ENV["SECRET_CACHE_TTL_SECONDS"]
+        ):
+            return cached["secret"], cached["version_id"]
+
+        if region_name not in _secrets_manager_clients:
+            _secrets_manager_clients[region_name] = boto3.session.Session().client(
+                service_name="secretsmanager", region_name=region_name
+            )
+        client = _secrets_manager_clients[region_name]
+        print("get secret")
+        try:
+            get_secret_value_response = client.get_secret_value(SecretId=secret_name)
+        except ClientError as e:
+            # For a list of exceptions thrown, see
+            # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
+            raise e
+        secret = json.loads(get_secret_value_response["SecretString"])
+        version_id = get_secret_value_response.get("VersionId")
+        _secret_cache[cache_key] = {
+            "secret": secret,
+            "version_id": version_id,
+            "fetched_at": time.monotonic(),
+        }
+        return secret, version_id
+
+
 def get_secret(secret_name: str, region_name: str) -> dict:
     """
-    Retrieves a secret from AWS Secrets Manager.
+    Retrieves a secret from AWS Secrets Manager (cached, see get_secret_with_version).
     
     Args:
         secret_name: Name of the secret in AWS Secrets Manager
@@ -45,18 +109,7 @@ def get_secret(secret_name: str, region_name: str) -> dict:
     Raises:
         ClientError: If there's an error retrieving the secret
     """
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(service_name="secretsmanager", region_name=region_name)
-    print("get secret")
-    try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-    except ClientError as e:
-        # For a list of exceptions thrown, see
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
-    secret = json.loads(get_secret_value_response["SecretString"])
-    return secret
+    return get_secret_with_version(secret_name, region_name)[0]
 
 
 def get_postgresql_connection(secret_name: str, aws_region: str, postgresql_host: str, database_name: str):
@@ -73,7 +126,6 @@ def get_postgresql_connection(secret_name: str, aws_region: str, postgresql_host
         Connection object if successful, False otherwise
     """
     secret = get_secret(secret_name, aws_region)
-    print(secret)
     try:
         conn = psycopg2.connect(
             host=postgresql_host,
@@ -88,6 +140,260 @@ def get_postgresql_connection(secret_name: str, aws_region: str, postgresql_host
     return conn
 
 
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+
+class PostgreSQLConnectionPool:
+    """
+    Process-wide pool of PostgreSQL connections.
+    
+    Checkouts block (up to a timeout) while every connection is in use. Connections that
+    have been idle for a while are health-checked before being handed out, connections
+    older than the maximum lifetime are closed and replaced, and connections opened with a
+    previous version of the secret are retired once the secret has been rotated.
+    """
+
+    def __init__(
+        self,
+        secret_name: str,
+        aws_region: str,
+        postgresql_host: str,
+        database_name: str,
+        max_connections: int = 10,
+        max_lifetime_seconds: int = 1800,
+        health_check_idle_seconds: int = 30,
+        checkout_timeout_seconds: int = 30,
+    ):
+        """
+        Initializes an empty pool; connections are opened on demand.
+        
+        Args:
+            secret_name: Name of the secret containing database credentials
+            aws_region: AWS region where the secret is stored
+            postgresql_host: PostgreSQL server hostname
+            database_name: Name of the database to connect to
+            max_connections: Maximum number of open connections
+            max_lifetime_seconds: Age after which a connection is closed and replaced
+            health_check_idle_seconds: Idle time after which a connection is checked with SELECT 1
+            checkout_timeout_seconds: Maximum time to wait for a free connection
+        """
+        self.secret_name = secret_name
+        self.aws_region = aws_region
+        self.postgresql_host = postgresql_host
+        self.database_name = database_name
+        self.max_connections = max_connections
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.health_check_idle_seconds = health_check_idle_seconds
+        self.checkout_timeout_seconds = checkout_timeout_seconds
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._metrics = {
+            "checkouts": 0,
+            "checkout_timeouts": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "in_use": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_recycled": 0,
+            "failed_health_checks": 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a connection for the duration of a with block.
+        
+        Yields:
+            A psycopg2 connection. Any open transaction is rolled back when it is returned.
+            
+        Raises:
+            PoolTimeoutError: If no connection becomes available in time
+            psycopg2.Error: If a new connection cannot be opened
+        """
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout_seconds):
+            with self._lock:
+                self._metrics["checkout_timeouts"] += 1
+            raise PoolTimeoutError(
+                f"No database connection available after {self.checkout_timeout_seconds}s"
+            )
+        wait_seconds = time.monotonic() - start
+
+        try:
+            entry = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._metrics["checkouts"] += 1
+            self._metrics["in_use"] += 1
+            self._metrics["total_wait_seconds"] += wait_seconds
+            self._metrics["max_wait_seconds"] = max(self._metrics["max_wait_seconds"], wait_seconds)
+        try:
+            yield entry["connection"]
+        finally:
+            self._checkin(entry)
+            with self._lock:
+                self._metrics["in_use"] -= 1
+            self._slots.release()
+
+    def metrics(self) -> dict:
+        """
+        Returns pool usage metrics.
+        
+        Returns:
+            dict: Checkout counts, wait times and connection lifecycle counters
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["idle"] = len(self._idle)
+        metrics["max_connections"] = self.max_connections
+        metrics["avg_wait_seconds"] = (
+            metrics["total_wait_seconds"] / metrics["checkouts"] if metrics["checkouts"] else 0.0
+        )
+        return metrics
+
+    def close(self):
+        """Closes every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry)
+
+    def _checkout(self) -> dict:
+        """Returns a healthy idle connection, or opens a new one."""
+        _, version_id = get_secret_with_version(self.secret_name, self.aws_region)
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+
+            now = time.monotonic()
+            if (
+                entry["connection"].closed
+                or now - entry["created_at"] > self.max_lifetime_seconds
+                or entry["version_id"] != version_id
+            ):
+                with self._lock:
+                    self._metrics["connections_recycled"] += 1
+                self._close(entry)
+                continue
+
+            if now - entry["last_used"] > self.health_check_idle_seconds and not self._is_healthy(entry):
+                with self._lock:
+                    self._metrics["failed_health_checks"] += 1
+                self._close(entry)
+                continue
+            return entry
+
+    def _checkin(self, entry: dict):
+        """Returns a connection to the pool, or closes it if it can no longer be reused."""
+        connection = entry["connection"]
+        if connection.closed or time.monotonic() - entry["created_at"] > self.max_lifetime_seconds:
+            self._close(entry)
+            return
+        try:
+            if connection.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            self._close(entry)
+            return
+        entry["last_used"] = time.monotonic()
+        with self._lock:
+            self._idle.append(entry)
+
+    def _connect(self) -> dict:
+        """Opens a new connection, refreshing the secret once if authentication fails."""
+        for attempt in range(2):
+            secret, version_id = get_secret_with_version(
+                self.secret_name, self.aws_region, force_refresh=attempt > 0
+            )
+            try:
+                connection = psycopg2.connect(
+                    host=self.postgresql_host,
+                    database=self.database_name,
+                    user=secret["username"],
+                    password=secret["password"],
+                    connect_timeout=10,
+                )
+                break
+            except psycopg2.OperationalError as error:
+                # The secret may have been rotated since it was cached
+                if attempt > 0 or "authentication failed" not in str(error):
+                    raise
+        print("Connected to the PostgreSQL database!")
+        now = time.monotonic()
+        with self._lock:
+            self._metrics["connections_created"] += 1
+        return {"connection": connection, "version_id": version_id, "created_at": now, "last_used": now}
+
+    def _is_healthy(self, entry: dict) -> bool:
+        """Runs a trivial query to make sure an idle connection is still usable."""
+        try:
+            with entry["connection"].cursor() as cur:
+                cur.execute("SELECT 1")
+            entry["connection"].rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close(self, entry: dict):
+        """Closes a connection, ignoring errors from connections that are already broken."""
+        try:
+            entry["connection"].close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._metrics["connections_closed"] += 1
+
+
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> PostgreSQLConnectionPool:
+    """
+    Returns the process-wide connection pool, creating it on first use.
+    
+    Returns:
+        PostgreSQLConnectionPool: The shared pool
+        
+    Raises:
+        EnvironmentError: If any required environment variables are missing
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                validate_environment()
+                _connection_pool = PostgreSQLConnectionPool(
+                    ENV["SECRET_NAME"],
+                    ENV["AWS_REGION"],
+                    ENV["POSTGRESQL_HOST"],
+                    ENV["DATABASE_NAME"],
+                    max_connections=ENV["POOL_MAX_CONNECTIONS"],
+                    max_lifetime_seconds=ENV["POOL_MAX_LIFETIME_SECONDS"],
+                    health_check_idle_seconds=ENV["POOL_HEALTH_CHECK_IDLE_SECONDS"],
+                    checkout_timeout_seconds=ENV["POOL_CHECKOUT_TIMEOUT_SECONDS"],
+                )
+    return _connection_pool
+
+
+def get_connection_pool_metrics() -> dict:
+    """
+    Returns usage metrics of the process-wide connection pool.
+    
+    Returns:
+        dict: Pool metrics, or an empty dict if the pool has not been used yet
+    """
+    return _connection_pool.metrics() if _connection_pool is not None else {}
+
+
 def get_size(string: str) -> int:
     """
     Calculates the size of a string in bytes when encoded as UTF-8.
@@ -101,13 +407,70 @@ def get_size(string: str) -> int:
     return len(string.encode("utf-8"))
 
 
+def json_default(value):
+    """
+    Converts the PostgreSQL types that json cannot encode natively.
+    
+    Args:
+        value: A value returned by psycopg2
+        
+    Returns:
+        float for Decimal values, the string representation for dates and datetimes
+        
+    Raises:
+        TypeError: If the value type is not supported
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def serialize_rows(cursor, max_size_bytes: int, chunk_rows: int) -> tuple:
+    """
+    Fetches rows in chunks and JSON-encodes them one at a time until the byte budget is reached.
+    
+    Each row is encoded exactly once and its size is added to a running counter, so the work
+    and memory are proportional to the budget rather than to the size of the result set.
+    Fetching stops as soon as the next row would not fit.
+    
+    Args:
+        cursor: A cursor on which the query has been executed
+        max_size_bytes: Maximum size of the encoded JSON array of rows
+        chunk_rows: Number of rows fetched per round trip
+        
+    Returns:
+        tuple: List of JSON-encoded rows, and whether the result was truncated
+    """
+    encoded_rows = []
+    size = 2  # the enclosing brackets
+    column_names = None
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return encoded_rows, False
+        if column_names is None:
+            # Server-side cursors only expose their description after the first fetch
+            column_names = [desc[0] for desc in cursor.description]
+        for row in rows:
+            encoded = json.dumps(dict(zip(column_names, row)), default=json_default)
+            row_size = get_size(encoded) + (2 if encoded_rows else 0)  # ", " separator
+            # The first row is always returned, even if it alone exceeds the budget
+            if encoded_rows and size + row_size > max_size_bytes:
+                return encoded_rows, True
+            encoded_rows.append(encoded)
+            size += row_size
+
+
 def run_sql_query_on_postgresql(sql_query: str) -> str:
     """
     Executes a SQL query on the PostgreSQL database and returns the results as JSON.
     
-    The function handles connection to the database, query execution, and formatting
-    of results. Special data types (Decimal, date) are properly converted for JSON.
-    If the result size exceeds MAX_RESPONSE_SIZE_BYTES, it's truncated.
+    The function checks a connection out of the process-wide pool, executes the query,
+    and formats the results. Special data types (Decimal, date) are properly converted for JSON.
+    SELECT statements run on a server-side cursor and rows are fetched in chunks of
+    FETCH_CHUNK_ROWS; fetching stops as soon as the encoded rows reach MAX_RESPONSE_SIZE_BYTES.
     
     Args:
         sql_query: SQL query string to execute
@@ -119,70 +482,52 @@ def run_sql_query_on_postgresql(sql_query: str) -> str:
     try:
         # Validate environment variables before proceeding
         validate_environment()
-        
-        connection = get_postgresql_connection(
-            ENV["SECRET_NAME"], 
-            ENV["AWS_REGION"], 
-            ENV["POSTGRESQL_HOST"], 
-            ENV["DATABASE_NAME"]
-        )
-
-        if connection == False:
-            return json.dumps({
-                "error": "Something went wrong connecting to the database, ask the user to try again later."
-            })
-
-        print("connected")
+        connection_pool = get_connection_pool()
 
         message = ""
-        cur = connection.cursor()
-        records = []
-        records_to_return = []
+        use_server_side_cursor = sql_query.lstrip().lower().startswith(SERVER_SIDE_CURSOR_PREFIXES)
 
-        print(sql_query)
-
-        # Execute a SQL query
         try:
-            cur.execute(sql_query)
-            rows = cur.fetchall()
-            column_names = [desc[0] for desc in cur.description]
-            for item in rows:
-                record = {}
-                for x, value in enumerate(item):
-                    if type(value) is Decimal:
-                        record[column_names[x]] = float(value)
-                    elif isinstance(value, date):
-                        record[column_names[x]] = str(value)
+            with connection_pool.connection() as connection:
+                print("connected")
+                # A named (server-side) cursor streams the result instead of loading it all at once
+                cur = connection.cursor(name="run_sql_query") if use_server_side_cursor else connection.cursor()
+
+                # Execute a SQL query
+                try:
+                    cur.execute(sql_query)
+                    if not use_server_side_cursor and cur.description is None:
+                        encoded_rows, truncated = [], False
                     else:
-                        record[column_names[x]] = value
-                records.append(record)
-            if get_size(json.dumps(records)) > ENV["MAX_RESPONSE_SIZE_BYTES"]:
-                for item in records:
-                    if get_size(json.dumps(records_to_return)) <= ENV["MAX_RESPONSE_SIZE_BYTES"]:
-                        records_to_return.append(item)
-                message = (
-                    "The data is too large, it has been truncated from "
-                    + str(len(records))
-                    + " to "
-                    + str(len(records_to_return))
-                    + " rows."
-                )
-            else:
-                records_to_return = records
+                        encoded_rows, truncated = serialize_rows(
+                            cur, ENV["MAX_RESPONSE_SIZE_BYTES"], ENV["FETCH_CHUNK_ROWS"]
+                        )
+                    if truncated:
+                        message = (
+                            "The data is too large, it has been truncated to the first "
+                            + str(len(encoded_rows))
+                            + " rows."
+                        )
 
-        except (Exception, psycopg2.Error) as error:
-            print("Error executing SQL query:", error)
-            connection.rollback()  # Rollback the transaction if there's an error
-            return json.dumps({"error": str(error.pgerror) if hasattr(error, 'pgerror') else str(error)})
-        finally:
-            # Close the cursor and the connection
-            cur.close()
-            connection.close()
-            
+                except (Exception, psycopg2.Error) as error:
+                    print("Error executing SQL query:", error)
+                    connection.rollback()  # Rollback the transaction if there's an error
+                    return json.dumps({"error": str(error.pgerror) if hasattr(error, 'pgerror') else str(error)})
+                finally:
+                    # Close the cursor, the connection goes back to the pool
+                    cur.close()
+        except (PoolTimeoutError, psycopg2.Error, ClientError) as error:
+            print("Error connecting to the PostgreSQL database:", error)
+            return json.dumps({
+                "error": "Something went wrong connecting to the database, ask the user to try again later."
+            })
+
+        # The rows are already encoded, splice them into the response instead of re-encoding
+        result = '{"result": [' + ", ".join(encoded_rows) + "]"
         if message != "":
-            return json.dumps({"result": records_to_return, "message": message})
+            return result + ', "message": ' + json.dumps(message) + "}"
         else:
-            return json.dumps({"result": records_to_return})
+            return result + "}"
             
     except EnvironmentError as e:
         return json.dumps({"error": str(e)})
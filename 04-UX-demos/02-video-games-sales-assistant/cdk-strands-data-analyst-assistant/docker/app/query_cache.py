@@ -0,0 +1,403 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import boto3
+
+# Environment variables configuration
+ENV = {
+    "QUERY_CACHE_ENABLED": os.environ.get("QUERY_CACHE_ENABLED", "true").lower() == "true",
+    "QUERY_CACHE_MAX_ENTRIES": int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", 256)),
+    "QUERY_CACHE_TTL_SECONDS": int(os.environ.get("QUERY_CACHE_TTL_SECONDS", 300)),
+    "QUERY_CACHE_TABLE_NAME": os.environ.get("QUERY_CACHE_TABLE_NAME"),
+    "AWS_REGION": os.environ.get("AWS_REGION", "us-east-1")
+}
+
+# String literals, quoted identifiers, comments, numbers, words, multi-character operators, anything else
+SQL_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*')
+    | (?P<identifier>"(?:[^"]|"")*")
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<number>(?<![\w.])\d+(?:\.\d*)?(?:[eE][+-]?\d+)?(?![\w.]))
+    | (?P<word>[A-Za-z_][\w$]*(?:\.[A-Za-z_][\w$]*)*)
+    | (?P<operator><=|>=|<>|!=|::|\|\|)
+    | (?P<whitespace>\s+)
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def tokenize_sql(sql_query: str) -> List[tuple]:
+    """
+    Splits a SQL statement into (kind, text) tokens, dropping whitespace and comments.
+
+    Args:
+        sql_query: SQL query string
+
+    Returns:
+        List[tuple]: Tokens of the statement
+    """
+    tokens = []
+    for match in SQL_TOKEN_PATTERN.finditer(sql_query):
+        kind = match.lastgroup
+        if kind not in ("whitespace", "comment"):
+            tokens.append((kind, match.group()))
+    return tokens
+
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Returns a canonical form of a SQL statement used as the cache key.
+
+    Whitespace and comments are collapsed and keywords and unquoted identifiers are
+    lower-cased. String literals, quoted identifiers and numeric literals are kept
+    verbatim: 1/2 and 1.0/2 are different queries (integer vs numeric division), and
+    queries that differ only by a filter value get different keys.
+
+    Args:
+        sql_query: SQL query string
+
+    Returns:
+        str: The normalized statement
+    """
+    parts = []
+    for kind, text in tokenize_sql(sql_query):
+        if kind not in ("string", "identifier", "number"):
+            text = text.lower()
+        parts.append(text)
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts)
+
+
+# Keywords of statements whose results must not be cached
+MODIFYING_KEYWORDS = {
+    "insert", "update", "delete", "merge", "truncate", "create", "alter", "drop",
+    "copy", "grant", "revoke", "refresh", "vacuum", "call",
+}
+
+
+def is_read_only_query(sql_query: str) -> bool:
+    """
+    Checks whether a SQL statement only reads data, so its result can be cached.
+
+    Args:
+        sql_query: SQL query string
+
+    Returns:
+        bool: False when any data-modifying keyword appears outside literals
+    """
+    return not any(
+        kind == "word" and text.lower() in MODIFYING_KEYWORDS
+        for kind, text in tokenize_sql(sql_query)
+    )
+
+
+def referenced_tables(sql_query: str) -> List[str]:
+    """
+    Returns the (lower-cased) table names that follow FROM, JOIN, INTO, UPDATE or TABLE
+    in a SQL statement.
+
+    Args:
+        sql_query: SQL query string
+
+    Returns:
+        List[str]: Sorted table names, without schema prefix
+    """
+    tables = set()
+    tokens = tokenize_sql(sql_query)
+    for index, (kind, text) in enumerate(tokens[:-1]):
+        if kind == "word" and text.lower() in ("from", "join", "into", "update", "table"):
+            next_kind, next_text = tokens[index + 1]
+            if next_kind in ("word", "identifier"):
+                tables.add(next_text.strip('"').split(".")[-1].lower())
+    return sorted(tables)
+
+
+class InMemoryCacheBackend:
+    """
+    Shared-backend implementation that lives in the current process.
+
+    It follows the same contract as DynamoDBCacheBackend and is meant for local
+    development and tests.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._markers = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, dependencies: List[str]) -> Optional[str]:
+        """
+        Returns a stored value unless it expired or one of its dependencies was invalidated after it was stored.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item["expires_at"] <= time.time():
+                return None
+            invalidated_at = max((self._markers.get(name, 0) for name in dependencies), default=0)
+            if item["stored_at"] <= invalidated_at:
+                return None
+            return item["value"]
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        """Stores a value for ttl_seconds."""
+        now = time.time()
+        with self._lock:
+            self._items[key] = {"value": value, "stored_at": now, "expires_at": now + ttl_seconds}
+
+    def invalidate(self, dependency: str):
+        """Marks every value depending on `dependency` as stale."""
+        with self._lock:
+            self._markers[dependency] = time.time()
+
+
+class DynamoDBCacheBackend:
+    """
+    Shared cache backend stored in a DynamoDB table keyed by `cache_key` (String).
+
+    Entries carry an `expires_at` attribute that can be used as the table TTL attribute.
+    Invalidations are recorded as marker items; a lookup reads the entry and its markers
+    with a single batch_get_item call.
+    """
+
+    def __init__(self, table_name: str, region_name: str):
+        self.table_name = table_name
+        self.dynamodb_client = boto3.client('dynamodb', region_name=region_name)
+
+    def get(self, key: str, dependencies: List[str]) -> Optional[str]:
+        """
+        Returns a stored value unless it expired or one of its dependencies was invalidated after it was stored.
+        """
+        keys = [key] + [f"marker#{name}" for name in dependencies]
+        response = self.dynamodb_client.batch_get_item(
+            RequestItems={self.table_name: {"Keys": [{"cache_key": {"S": k}} for k in keys]}}
+        )
+        items = {item["cache_key"]["S"]: item for item in response["Responses"].get(self.table_name, [])}
+        item = items.get(key)
+        if item is None or float(item["expires_at"]["N"]) <= time.time():
+            return None
+        invalidated_at = max(
+            (float(marker["invalidated_at"]["N"]) for name, marker in items.items() if name != key),
+            default=0,
+        )
+        if float(item["stored_at"]["N"]) <= invalidated_at:
+            return None
+        return item["value"]["S"]
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        """Stores a value for ttl_seconds."""
+        now = time.time()
+        self.dynamodb_client.put_item(
+            TableName=self.table_name,
+            Item={
+                "cache_key": {"S": key},
+                "value": {"S": value},
+                "stored_at": {"N": str(now)},
+                "expires_at": {"N": str(int(now + ttl_seconds))},
+            },
+        )
+
+    def invalidate(self, dependency: str):
+        """Marks every value depending on `dependency` as stale."""
+        self.dynamodb_client.put_item(
+            TableName=self.table_name,
+            Item={
+                "cache_key": {"S": f"marker#{dependency}"},
+                "invalidated_at": {"N": str(time.time())},
+            },
+        )
+
+
+class QueryResultCache:
+    """
+    LRU + TTL cache of SQL query results keyed by endpoint and normalized SQL text.
+
+    Results are kept in a local LRU or, when a shared backend is configured, only in the
+    backend so that every process and container sees the same entries and invalidations.
+    Hit ratios are tracked per endpoint.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 300, backend=None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries: Maximum number of results kept in the local LRU (unused with a backend)
+            ttl_seconds: Time after which a cached result expires
+            backend: Optional shared backend (DynamoDBCacheBackend or InMemoryCacheBackend)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def get(self, sql_query: str, endpoint: str) -> Optional[str]:
+        """
+        Returns the cached result of a query, or None on a miss.
+
+        Args:
+            sql_query: SQL query string
+            endpoint: Database endpoint the query runs against
+
+        Returns:
+            str: The cached result, if any
+        """
+        key = self._key(sql_query, endpoint)
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key, self._dependencies(sql_query, endpoint))
+            except Exception as e:
+                print(f"Error reading the shared query cache: {str(e)}")
+                value = None
+        else:
+            value = self._get_local(key)
+
+        with self._lock:
+            self._endpoint_stats(endpoint)["hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, sql_query: str, endpoint: str, value: str):
+        """
+        Caches the result of a query.
+
+        Args:
+            sql_query: SQL query string
+            endpoint: Database endpoint the query ran against
+            value: The result to cache
+        """
+        key = self._key(sql_query, endpoint)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, self.ttl_seconds)
+            except Exception as e:
+                print(f"Error writing the shared query cache: {str(e)}")
+        else:
+            self._store_local(key, value, referenced_tables(sql_query), endpoint)
+
+    def invalidate(self, endpoint: str, table: str = None) -> int:
+        """
+        Drops cached results of an endpoint, or only those reading from a table.
+
+        Args:
+            endpoint: Database endpoint whose results are invalidated
+            table: Optional table name; when given only queries referencing it are dropped
+
+        Returns:
+            int: Number of local entries removed (always 0 with a shared backend, where
+            entries are invalidated lazily on lookup)
+        """
+        table = table.lower() if table else None
+        with self._lock:
+            stale_keys = [
+                key
+                for key, entry in self._entries.items()
+                if entry["endpoint"] == endpoint and (table is None or table in entry["tables"])
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+            self._endpoint_stats(endpoint)["invalidations"] += 1
+            hooks = list(self._hooks)
+
+        if self.backend is not None:
+            dependency = f"{endpoint}#table#{table}" if table else f"{endpoint}#all"
+            try:
+                self.backend.invalidate(dependency)
+            except Exception as e:
+                print(f"Error invalidating the shared query cache: {str(e)}")
+        for hook in hooks:
+            hook(endpoint, table)
+        return len(stale_keys)
+
+    def add_invalidation_hook(self, hook: Callable[[str, Optional[str]], None]):
+        """
+        Registers a callback called as hook(endpoint, table) after every invalidation,
+        e.g. to notify other processes.
+        """
+        with self._lock:
+            self._hooks.append(hook)
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Returns hit/miss counters and hit ratios per endpoint.
+
+        Returns:
+            dict: endpoint -> counters, plus the number of locally cached entries
+        """
+        with self._lock:
+            result = {"entries": len(self._entries), "endpoints": {}}
+            for endpoint, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                result["endpoints"][endpoint] = dict(
+                    stats,
+                    hit_ratio=stats["hits"] / lookups if lookups else 0.0,
+                )
+            return result
+
+    def _get_local(self, key: str) -> Optional[str]:
+        """Returns an unexpired entry of the local LRU."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def _store_local(self, key: str, value: str, tables: List[str], endpoint: str):
+        """Adds an entry to the local LRU, evicting the least recently used ones."""
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "tables": tables,
+                "endpoint": endpoint,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _endpoint_stats(self, endpoint: str) -> dict:
+        """Returns the counters of an endpoint. Must be called with the lock held."""
+        if endpoint not in self._stats:
+            self._stats[endpoint] = {"hits": 0, "misses": 0, "invalidations": 0}
+        return self._stats[endpoint]
+
+    def _key(self, sql_query: str, endpoint: str) -> str:
+        """Builds the cache key of a query."""
+        return hashlib.sha256(f"{endpoint}\n{normalize_sql(sql_query)}".encode("utf-8")).hexdigest()
+
+    def _dependencies(self, sql_query: str, endpoint: str) -> List[str]:
+        """Lists the invalidation markers a cached query depends on."""
+        return [f"{endpoint}#all"] + [f"{endpoint}#table#{table}" for table in referenced_tables(sql_query)]
+
+
+def create_query_cache() -> Optional[QueryResultCache]:
+    """
+    Creates the query result cache from the environment configuration.
+
+    Returns:
+        QueryResultCache: The cache, backed by DynamoDB when QUERY_CACHE_TABLE_NAME is set,
+        or None when QUERY_CACHE_ENABLED is false
+    """
+    if not ENV["QUERY_CACHE_ENABLED"]:
+        return None
+    backend = None
+    if ENV["QUERY_CACHE_TABLE_NAME"]:
+        backend = DynamoDBCacheBackend(ENV["QUERY_CACHE_TABLE_NAME"], ENV["AWS_REGION"])
+    return QueryResultCache(
+        max_entries=ENV["QUERY_CACHE_MAX_ENTRIES"],
+        ttl_seconds=ENV["QUERY_CACHE_TTL_SECONDS"],
+        backend=backend,
+    )
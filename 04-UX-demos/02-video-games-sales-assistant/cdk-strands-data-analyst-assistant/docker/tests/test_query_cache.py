@@ -0,0 +1,125 @@
+"""
+Unit tests for the SQL query result cache.
+"""
+
+import unittest
+from unittest import mock
+
+from app.query_cache import (
+    InMemoryCacheBackend,
+    QueryResultCache,
+    is_read_only_query,
+    normalize_sql,
+    referenced_tables,
+)
+
+ENDPOINT = "cluster.example.com"
+
+
+class TestNormalizeSql(unittest.TestCase):
+    def test_whitespace_comments_and_case(self):
+        self.assertEqual(
+            normalize_sql("SELECT  Name\n FROM video_games -- top titles\n WHERE year = 2010;"),
+            normalize_sql("select name from VIDEO_GAMES /* top */ where YEAR = 2010"),
+        )
+
+    def test_literals_are_kept_verbatim(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE name = 'Mario  Kart' AND \"Genre\" = 'RPG'"),
+            "select * from t where name = 'Mario  Kart' and \"Genre\" = 'RPG'",
+        )
+
+    def test_filter_values_change_the_key(self):
+        self.assertNotEqual(
+            normalize_sql("SELECT * FROM t WHERE year = 2010"),
+            normalize_sql("SELECT * FROM t WHERE year = 2011"),
+        )
+
+    def test_integer_and_numeric_literals_differ(self):
+        self.assertNotEqual(normalize_sql("SELECT 1/2"), normalize_sql("SELECT 1.0/2"))
+        self.assertNotEqual(
+            normalize_sql("SELECT SUM(sales)/1000 FROM t"),
+            normalize_sql("SELECT SUM(sales)/1000.0 FROM t"),
+        )
+        self.assertNotEqual(normalize_sql("SELECT 007"), normalize_sql("SELECT 7"))
+
+    def test_read_only_and_tables(self):
+        self.assertTrue(is_read_only_query("SELECT 'drop' FROM t"))
+        self.assertFalse(is_read_only_query("WITH x AS (SELECT 1) DELETE FROM t"))
+        self.assertEqual(
+            referenced_tables("SELECT * FROM public.Sales s JOIN \"games\" g ON s.id = g.id"),
+            ["games", "sales"],
+        )
+
+
+class TestQueryResultCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("app.query_cache.time")
+        self.time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.time.monotonic.side_effect = lambda: self.now
+        self.time.time.side_effect = lambda: self.now
+
+    def caches(self):
+        return (
+            QueryResultCache(ttl_seconds=60),
+            QueryResultCache(ttl_seconds=60, backend=InMemoryCacheBackend()),
+        )
+
+    def test_hit_on_equivalent_query(self):
+        for cache in self.caches():
+            cache.put("SELECT * FROM sales", ENDPOINT, "result")
+            self.assertEqual(cache.get("select *\nfrom SALES;", ENDPOINT), "result")
+            self.assertIsNone(cache.get("SELECT * FROM sales", "other-endpoint"))
+            stats = cache.stats()["endpoints"][ENDPOINT]
+            self.assertEqual((stats["hits"], stats["misses"]), (1, 0))
+
+    def test_numeric_literal_does_not_share_entry(self):
+        for cache in self.caches():
+            cache.put("SELECT SUM(sales)/1000 FROM sales", ENDPOINT, "integer division")
+            self.assertIsNone(cache.get("SELECT SUM(sales)/1000.0 FROM sales", ENDPOINT))
+
+    def test_ttl_expiry(self):
+        for cache in self.caches():
+            cache.put("SELECT * FROM sales", ENDPOINT, "result")
+            self.now += 59
+            self.assertEqual(cache.get("SELECT * FROM sales", ENDPOINT), "result")
+            self.now += 2
+            self.assertIsNone(cache.get("SELECT * FROM sales", ENDPOINT))
+
+    def test_lru_eviction(self):
+        cache = QueryResultCache(max_entries=2, ttl_seconds=60)
+        cache.put("SELECT 1", ENDPOINT, "1")
+        cache.put("SELECT 2", ENDPOINT, "2")
+        cache.get("SELECT 1", ENDPOINT)
+        cache.put("SELECT 3", ENDPOINT, "3")
+        self.assertEqual(cache.get("SELECT 1", ENDPOINT), "1")
+        self.assertIsNone(cache.get("SELECT 2", ENDPOINT))
+
+    def test_invalidate_table(self):
+        for cache in self.caches():
+            cache.put("SELECT * FROM sales", ENDPOINT, "sales")
+            cache.put("SELECT * FROM games", ENDPOINT, "games")
+            self.now += 1
+            cache.invalidate(ENDPOINT, "SALES")
+            self.assertIsNone(cache.get("SELECT * FROM sales", ENDPOINT))
+            self.assertEqual(cache.get("SELECT * FROM games", ENDPOINT), "games")
+
+    def test_invalidate_endpoint_and_hooks(self):
+        calls = []
+        for cache in self.caches():
+            cache.add_invalidation_hook(lambda endpoint, table: calls.append((endpoint, table)))
+            cache.put("SELECT * FROM sales", ENDPOINT, "sales")
+            self.now += 1
+            cache.invalidate(ENDPOINT)
+            self.assertIsNone(cache.get("SELECT * FROM sales", ENDPOINT))
+            # Entries stored after the invalidation are served again
+            self.now += 1
+            cache.put("SELECT * FROM sales", ENDPOINT, "fresh")
+            self.assertEqual(cache.get("SELECT * FROM sales", ENDPOINT), "fresh")
+        self.assertEqual(calls, [(ENDPOINT, None), (ENDPOINT, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
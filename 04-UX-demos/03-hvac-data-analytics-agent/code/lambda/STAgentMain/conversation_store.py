@@ -0,0 +1,291 @@
+'''
+MIT No Attribution
+
+Copyright 2024 Amazon Web Services
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+'''
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+MAX_APPEND_ATTEMPTS = 5
+MAX_LOAD_ATTEMPTS = 5
+SEGMENT_DIGITS = 8
+
+
+@dataclass
+class ThreadState:
+    """The stored conversation of a thread, and where its next segment goes."""
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    system_prompt: Optional[str] = None
+    #ETag of the base object, None when it does not exist yet
+    base_etag: Optional[str] = None
+    #first segment not included in the base object
+    base_next_segment: int = 0
+    #segments compacted by the previous base, kept for readers of the older base
+    previous_next_segment: int = 0
+    next_segment: int = 0
+
+
+def appended_messages(messages: List[Dict[str, Any]], previous: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Messages of an agent that were added after the ones of previous.
+
+    The conversation manager of the agent trims the oldest messages of its list after each
+    turn, so the new messages are the tail after the last message that was already in
+    previous (matched by identity), not an offset from its previous length.
+    """
+    known = {id(message) for message in previous}
+    start = len(messages)
+    while start > 0 and id(messages[start - 1]) not in known:
+        start -= 1
+    return messages[start:]
+
+
+class ConversationStore:
+    """
+    Conversation history of the agent threads in S3, written as deltas.
+
+    Each thread has a base object, threads/<thread_id>.json, holding the messages compacted
+    so far (the format of the original full-thread object, which is read as is), and one
+    segment object per turn, threads/<thread_id>/segments/<seq>.json, holding only the
+    messages appended by that turn.
+
+    Segments are created with If-None-Match so concurrent turns never overwrite each other,
+    and every compact_every segments the whole thread is rewritten into the base object with
+    If-Match on its ETag. Recently used threads are kept in an in-memory LRU, so a warm
+    container only lists and reads the segments written since its last turn.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str = "threads", cache_size: int = 64,
+                 compact_every: int = 20):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_size = cache_size
+        self.compact_every = compact_every
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def base_key(self, thread_id: str) -> str:
+        return f"{self.prefix}/{thread_id}.json"
+
+    def segment_prefix(self, thread_id: str) -> str:
+        return f"{self.prefix}/{thread_id}/segments/"
+
+    def segment_key(self, thread_id: str, seq: int) -> str:
+        return f"{self.segment_prefix(thread_id)}{seq:0{SEGMENT_DIGITS}d}.json"
+
+    def _get_json(self, key: str):
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        return json.loads(response['Body'].read().decode('utf-8')), response['ETag']
+
+    def _cached(self, thread_id: str) -> Optional[ThreadState]:
+        with self._lock:
+            state = self._cache.get(thread_id)
+            if state is not None:
+                self._cache.move_to_end(thread_id)
+            return state
+
+    def _remember(self, thread_id: str, state: ThreadState):
+        with self._lock:
+            self._cache[thread_id] = state
+            self._cache.move_to_end(thread_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, thread_id: str):
+        with self._lock:
+            self._cache.pop(thread_id, None)
+
+    def _load_base(self, thread_id: str) -> ThreadState:
+        try:
+            base, etag = self._get_json(self.base_key(thread_id))
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                return ThreadState()
+            raise
+        next_segment = base.get('next_segment', 0)
+        return ThreadState(
+            messages=base.get('messages', []),
+            system_prompt=base.get('system_prompt'),
+            base_etag=etag,
+            base_next_segment=next_segment,
+            previous_next_segment=base.get('previous_next_segment', 0),
+            next_segment=next_segment
+        )
+
+    @staticmethod
+    def _segment_seq(key: str) -> int:
+        return int(key.rsplit('/', 1)[-1].split('.')[0])
+
+    def _new_segment_keys(self, thread_id: str, next_segment: int) -> List[str]:
+        """Keys of the segments from next_segment on, in order."""
+        keys = []
+        kwargs = {
+            'Bucket': self.bucket,
+            'Prefix': self.segment_prefix(thread_id),
+            'StartAfter': self.segment_key(thread_id, next_segment - 1) if next_segment else ''
+        }
+        while True:
+            response = self.s3_client.list_objects_v2(**kwargs)
+            keys.extend(item['Key'] for item in response.get('Contents', []))
+            if not response.get('IsTruncated'):
+                return keys
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    def load(self, thread_id: str) -> ThreadState:
+        """
+        Load a thread: the cached or base messages plus any segment written since.
+
+        A cached state that other containers compacted past, so the segments following it
+        were deleted, is dropped and the newer base object is read instead.
+        Returns a copy, so the caller can hand the messages to an agent that modifies them.
+        """
+        state = self._cached(thread_id)
+        for _ in range(MAX_LOAD_ATTEMPTS):
+            if state is None:
+                state = self._load_base(thread_id)
+            keys = self._new_segment_keys(thread_id, state.next_segment)
+            if not keys or self._segment_seq(keys[0]) == state.next_segment:
+                break
+            #two or more compactions since the state was read deleted segments it still
+            #needs, the newer base holds their messages
+            self._forget(thread_id)
+            state = None
+        else:
+            raise RuntimeError(f"Could not load thread {thread_id} after {MAX_LOAD_ATTEMPTS} attempts")
+        if keys:
+            with ThreadPoolExecutor(max_workers=min(len(keys), 8)) as executor:
+                segments = list(executor.map(lambda key: self._get_json(key)[0], keys))
+            state = ThreadState(
+                messages=state.messages + [m for segment in segments for m in segment['messages']],
+                system_prompt=state.system_prompt,
+                base_etag=state.base_etag,
+                base_next_segment=state.base_next_segment,
+                previous_next_segment=state.previous_next_segment,
+                next_segment=self._segment_seq(keys[-1]) + 1
+            )
+        self._remember(thread_id, state)
+        return ThreadState(**{**state.__dict__, 'messages': list(state.messages)})
+
+    def append(self, thread_id: str, state: ThreadState, messages: List[Dict[str, Any]],
+               system_prompt: Optional[str] = None) -> ThreadState:
+        """
+        Store the messages a turn added to a loaded thread.
+
+        Args:
+            thread_id: Conversation thread id
+            state: Result of load() before the turn
+            messages: Messages added by the turn, see appended_messages
+            system_prompt: System prompt kept in the base object
+
+        Returns:
+            The state of the thread after the turn
+        """
+        seq = state.next_segment
+        body = json.dumps({'messages': messages}).encode('utf-8')
+        for _ in range(MAX_APPEND_ATTEMPTS):
+            try:
+                self.s3_client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.segment_key(thread_id, seq),
+                    Body=body,
+                    ContentType='application/json',
+                    IfNoneMatch='*'
+                )
+                break
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                    raise
+                #a concurrent turn took this segment, append after it
+                seq += 1
+        else:
+            raise RuntimeError(f"Could not append to thread {thread_id} after {MAX_APPEND_ATTEMPTS} attempts")
+
+        if seq != state.next_segment:
+            #the loaded messages miss the concurrent turns, reload them on next use
+            self._forget(thread_id)
+            return state
+
+        new_state = ThreadState(
+            messages=state.messages + list(messages),
+            system_prompt=system_prompt or state.system_prompt,
+            base_etag=state.base_etag,
+            base_next_segment=state.base_next_segment,
+            previous_next_segment=state.previous_next_segment,
+            next_segment=seq + 1
+        )
+        self._remember(thread_id, new_state)
+        if new_state.next_segment - new_state.base_next_segment >= self.compact_every:
+            new_state = self.compact(thread_id, new_state)
+        return new_state
+
+    def compact(self, thread_id: str, state: ThreadState) -> ThreadState:
+        """
+        Rewrite the base object with every message of the state.
+
+        The write is conditional on the base ETag the state was loaded with; when another
+        container compacted first, the state is returned unchanged and dropped from the
+        cache, so the next load reads the new base. Segments compacted by the
+        previous base are deleted; the ones just compacted are kept for readers that still
+        hold the older base.
+        """
+        base = {
+            'messages': state.messages,
+            'system_prompt': state.system_prompt,
+            'next_segment': state.next_segment,
+            'previous_next_segment': state.base_next_segment
+        }
+        condition = {'IfMatch': state.base_etag} if state.base_etag else {'IfNoneMatch': '*'}
+        try:
+            response = self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=self.base_key(thread_id),
+                Body=json.dumps(base).encode('utf-8'),
+                ContentType='application/json',
+                **condition
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                self._forget(thread_id)
+                return state
+            raise
+
+        stale = range(state.previous_next_segment, state.base_next_segment)
+        for start in range(stale.start, stale.stop, 1000):
+            self.s3_client.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    'Objects': [{'Key': self.segment_key(thread_id, seq)} for seq in range(start, min(start + 1000, stale.stop))],
+                    'Quiet': True
+                }
+            )
+        compacted = ThreadState(
+            messages=state.messages,
+            system_prompt=state.system_prompt,
+            base_etag=response['ETag'],
+            base_next_segment=state.next_segment,
+            previous_next_segment=state.base_next_segment,
+            next_segment=state.next_segment
+        )
+        self._remember(thread_id, compacted)
+        return compacted
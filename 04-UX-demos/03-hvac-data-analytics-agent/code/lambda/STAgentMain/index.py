@@ -19,10 +19,12 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''
 import os
 import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 import boto3
 import sys
-from botocore.exceptions import ClientError
 from io import StringIO
 import base64
 
@@ -30,8 +32,9 @@ from strands import Agent, tool
 from strands.models import BedrockModel
 
 
+from conversation_store import ConversationStore, appended_messages
 from tools.util import get_current_time
-from tools.site_info import  get_site_info, get_timeseries_data
+from tools.site_info import  get_site_info, get_timeseries_data, get_timeseries_data_many
 
 
 
@@ -43,11 +46,19 @@ WS_REPLY_API_ENDPOINT = WS_API_ENDPOINT.replace("wss:", "https:") + "/$default"
 
 #create S3 client
 s3_client = boto3.client('s3')
+#Conversation threads, stored as per-turn segments and cached for warm invocations
+conversation_store = ConversationStore(s3_client, BUCKET_NAME)
 # Create API Gateway management client
 api_client = boto3.client('apigatewaymanagementapi',
                         endpoint_url= WS_REPLY_API_ENDPOINT, 
                         region_name = REGION)
 
+#Stream partial responses to the websocket client instead of a single final reply
+STREAM_RESPONSES = os.environ.get('STREAM_RESPONSES', 'true').lower() == 'true'
+#Streamed text is sent once this many bytes are buffered, or this many seconds passed since the last frame
+STREAM_FRAME_BYTES = 512
+STREAM_FRAME_SECONDS = 0.1
+
 #Model id for the FM in Bedrock. Select a model that supports tools
 MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
 #System prompt for the agent. Explain here what you want the agent to be.
@@ -55,11 +66,13 @@ SYSTEM_PROMPT = """
                You are a smart data analytics assistant. You role is to follow the below steps to answer the questions asked by the human data analyst.
                 1. If the response requires ANY site information or timeseries data, ALWAYS generate the python code to generate the answer and call the execute_code tool. You HAVE to do this 
                     since the response from these functions can be very large. The return format of these tools are strictly defined as shown in the tool documentation.
-                    eg: if the user asks about a zones in a particular floor for the building, write and execute the code get a list of assets of type 'Floor', get the id of that floor and then 
-                        write code and execute to list the number of children for that floor id of type zone. These types are fixed and allowed values are listed in get_site_info documentation
+                    eg: if the user asks about a zones in a particular floor for the building, write and execute the code get a list of assets of type 'Floor' with get_site_info('s123', entity_type='Floor'),
+                        get the id of that floor and then call get_site_info('s123', entity_type='Zone', parent_id=floor_id) to list its zones. Use the filters instead of walking the full tree.
+                        These types are fixed and allowed values are listed in get_site_info documentation
                 2. If the response requires ANY mathematical calculations (eg:count, average, min, max), ALWAYS generate the python code to generate the answer and call the execute_code tool. 
                     DO NOT do ANY mathematical calculations without generating code. 
-                    The code executed inside the execute_code tool call call the get_site_info, get_timeseries_data and get_current_time tools. 
+                    The code executed inside the execute_code tool call call the get_site_info, get_timeseries_data, get_timeseries_data_many and get_current_time tools. 
+                    When the data of several entities is needed (eg: every sensor of a floor), call get_timeseries_data_many once instead of get_timeseries_data in a loop.
                     CALL these functions to retrieve the data for processing. eg: get_site_info('s123'). Otherwise the code execution DOES NOT have access to your tool_result.
                     ALWAYS use the print statement at the end to return the end result. eg: instead of sum, use print(sum) at the end of the generated code.
                 3. Use the resulting answer to give the response to user
@@ -87,6 +100,7 @@ def execute_code(code: str) -> Dict[str, str]:
 
         - get_site_info: Retrieves site information
         - get_timeseries_data: Retrieves time series data
+        - get_timeseries_data_many: Retrieves time series data of several entities concurrently
         - get_current_time: Gets the current time
  
 
@@ -113,6 +127,7 @@ def execute_code(code: str) -> Dict[str, str]:
     available_functions = {
         'get_site_info': get_site_info,
         'get_timeseries_data': get_timeseries_data,
+        'get_timeseries_data_many': get_timeseries_data_many,
         'get_current_time': get_current_time
     }
 
@@ -132,38 +147,18 @@ def execute_code(code: str) -> Dict[str, str]:
             }
 
 
-def get_agent_object(key: str):
+def get_agent_object(thread_id: str):
 
-    try:
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        state = json.loads(content)
-        
-        return create_agent(state['messages'])
-    
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            return create_agent([])
-        else:
-            raise  # Re-raise if it's a different error
+    state = conversation_store.load(thread_id)
+    #the agent trims its own list, the state keeps the whole thread
+    agent = create_agent(list(state.messages))
+    #the store keeps every turn, the model only sees the recent window
+    agent.conversation_manager.apply_management(agent)
+    return agent, state
 
-def put_agent_object(key: str, agent: Agent):
-    
-    state = {
-        "messages": agent.messages,
-        "system_prompt": agent.system_prompt
-    }
-    
-    content = json.dumps(state)
-    
-    response = s3_client.put_object(
-        Bucket=BUCKET_NAME,
-        Key=key,
-        Body=content.encode('utf-8'),
-        ContentType='application/json'
-    )
-    
-    return response
+def put_agent_object(thread_id: str, agent: Agent, state):
+
+    return conversation_store.append(thread_id, state, appended_messages(agent.messages, state.messages), agent.system_prompt)
 
 def create_agent(messages):
 
@@ -181,7 +176,8 @@ def create_agent(messages):
                     get_current_time,
                     execute_code,
                     get_site_info,
-                    get_timeseries_data
+                    get_timeseries_data,
+                    get_timeseries_data_many
                 ]
     )
 
@@ -200,6 +196,91 @@ def send_to_websocket_client(last_message, connection_id):
     except Exception as e:
         print(f"Error sending message to websocket client: {str(e)}")   
 
+class WebSocketStreamer:
+    """
+    Coalesces the agent's text deltas into frames and posts them to a websocket connection.
+
+    Frames are JSON objects with a type: "delta" (text to append), "tool" (a tool call started
+    or finished), "done" (the final answer) and "error". They are posted in order by a single
+    background thread, so a slow post_to_connection never holds up the agent.
+    """
+
+    def __init__(self, connection_id):
+        self.connection_id = connection_id
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.last_frame = time.monotonic()
+        self.seq = 0
+        self.gone = False
+        self.sender = ThreadPoolExecutor(max_workers=1)
+
+    def send(self, frame):
+        self.seq += 1
+        frame['seq'] = self.seq
+        self.last_frame = time.monotonic()
+        self.sender.submit(self._post, json.dumps(frame))
+
+    def _post(self, data):
+        if self.gone:
+            return
+        try:
+            api_client.post_to_connection(Data=data, ConnectionId=self.connection_id)
+        except api_client.exceptions.GoneException:
+            #the client disconnected, the agent still finishes and saves the thread
+            self.gone = True
+        except Exception as e:
+            print(f"Error sending frame to websocket client: {str(e)}")
+
+    def add_text(self, text):
+        self.buffer.append(text)
+        self.buffered_bytes += len(text.encode('utf-8'))
+        if self.buffered_bytes >= STREAM_FRAME_BYTES or time.monotonic() - self.last_frame >= STREAM_FRAME_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.send({"type": "delta", "text": "".join(self.buffer)})
+            self.buffer = []
+            self.buffered_bytes = 0
+
+    def tool_event(self, status, tool_use_id, name=None):
+        self.flush()
+        self.send({"type": "tool", "status": status, "tool_use_id": tool_use_id, "name": name})
+
+    def done(self, text):
+        self.flush()
+        self.send({"type": "done", "text": text})
+
+    def error(self, message):
+        self.flush()
+        self.send({"type": "error", "message": message})
+
+    def close(self):
+        self.sender.shutdown(wait=True)
+
+async def stream_agent(agent: Agent, human_message: str, streamer: WebSocketStreamer):
+    """Run the agent with stream_async, forwarding text and tool progress to the streamer."""
+    result = None
+    tool_names = {}
+    async for event in agent.stream_async(human_message):
+        if 'data' in event:
+            streamer.add_text(event['data'])
+        elif 'current_tool_use' in event:
+            tool_use = event['current_tool_use']
+            tool_use_id = tool_use.get('toolUseId')
+            if tool_use_id and tool_use_id not in tool_names:
+                tool_names[tool_use_id] = tool_use.get('name')
+                streamer.tool_event('started', tool_use_id, tool_use.get('name'))
+        elif 'message' in event:
+            for block in event['message'].get('content', []):
+                if 'toolResult' in block:
+                    tool_use_id = block['toolResult'].get('toolUseId')
+                    status = 'failed' if block['toolResult'].get('status') == 'error' else 'completed'
+                    streamer.tool_event(status, tool_use_id, tool_names.get(tool_use_id))
+        elif 'result' in event:
+            result = event['result']
+    return result
+
 def lambda_handler(event: Dict[str, Any], _context) -> str:
 
     print(event)
@@ -228,12 +309,28 @@ def lambda_handler(event: Dict[str, Any], _context) -> str:
         human_message = payload['human_message']
         thread_id = payload['thread_id']
 
+        if STREAM_RESPONSES:
+            streamer = WebSocketStreamer(connection_id)
+            try:
+
+                agent, state = get_agent_object(thread_id)
+                response = asyncio.run(stream_agent(agent, human_message, streamer))
+                streamer.done(str(response))
+                put_agent_object(thread_id, agent, state)
+
+            except Exception as e:
+                print(e)
+                streamer.error("Error processing request")
+            finally:
+                streamer.close()
+            return
+
         try:
 
-            agent = get_agent_object(key=f"threads/{thread_id}.json")            
+            agent, state = get_agent_object(thread_id)
             response = agent(human_message)
             content = str(response)
-            put_agent_object(key=f"threads/{thread_id}.json", agent=agent)        
+            put_agent_object(thread_id, agent, state)
             send_to_websocket_client(content, connection_id)
 
         except Exception as e:
@@ -19,28 +19,63 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 import random
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from strands import tool
 
+#Concurrent requests to the tool API and entities per timeseries request
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('TOOL_API_MAX_CONCURRENCY', '10'))
+TIMESERIES_BATCH_SIZE = 10
+REQUEST_TIMEOUT_SECONDS = 30
+
+#Keep-alive connections to the tool API, reused across calls and warm invocations
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+session.mount('https://', adapter)
+session.mount('http://', adapter)
+
 
 @tool
-def get_site_info(site_id: str) -> str:
+def get_site_info(site_id: str, entity_type: str = "", parent_id: str = "", entity_id: str = "", ancestor_id: str = "") -> str:
     """
-    Get the entity hierarchy of a given site as a nested json.
+    Get the entity hierarchy of a given site as a nested json, or only the entities matching filters.
 
     This function reads and returns the contents of the entity hierarchy file for a specified site.
-    The type field in the result can be one of the following: <Building/Floor/Zone/Plant/TemperatureSensor/VAV/ChilledWaterPump/Chiller>
+    The type field in the result can be one of the following: <Building/Floor/Zone/Plant/TemperatureSensor/VAV/ChilledWaterPump/Chiller/AirHandlingUnit>
+
+    PREFER the filters over walking the full tree: they return only the matching entities.
+    Each filter accepts a comma separated list and filters are combined with AND.
 
     Args:
         site_id (str): The unique identifier of the site to get information for. Example: 's123'
+        entity_type (str): Only entities of this type. Example: 'Floor' or 'Zone,VAV'
+        parent_id (str): Only the direct children of this entity id
+        entity_id (str): Only the entity with this id
+        ancestor_id (str): Only entities anywhere below this entity id. Example: all sensors of a floor
 
     Returns:
-        str: The entity hierarchy data as a JSON string in the following FIXED format.
+        str: When a filter is given, a JSON string with the flat list of matching entities:
+            '{
+                "count": 1,
+                "entities": [
+                    {
+                        "id": {"entityType": "DEVICE", "id": "gf-ts-1"},
+                        "name": "GF-TS-1",
+                        "type": "TemperatureSensor",
+                        "parent_id": "gf-zone-1",
+                        "ancestor_ids": ["b5c24680-50f1-11ef-b4ce-d5aee9e495ad", "b5c24681-50f1-11ef-b4ce-d5aee9e495ad", "gf-zone-1"],
+                        "path": "Office Building HVAC / Ground Floor / GF-Zone-1 / GF-TS-1",
+                        "child_count": 0
+                    }
+                ]
+            }'
+        Without filters, the whole entity hierarchy data as a JSON string in the following FIXED format.
             '{
                 "id": {"entityType": "<ASSET>/,<DEVICE>" , "id": "xxx"},
                 "name": "xxx",
@@ -72,6 +107,9 @@ def get_site_info(site_id: str) -> str:
             }'
 
     Example:
+        >>> get_site_info('s123', entity_type='Zone', parent_id='b5c24681-50f1-11ef-b4ce-d5aee9e495ad')
+        returns the zones of the Ground Floor as a flat list
+
         >>> get_site_info('s123')
         '{
             "id": {"entityType": "ASSET", "id": "b5c24680-50f1-11ef-b4ce-d5aee9e495ad"},
@@ -205,7 +243,14 @@ def get_site_info(site_id: str) -> str:
         headers = {
             'id_token': ID_TOKEN
         }
-        response = requests.get(TOOL_API_ENDPOINT + '/entities', headers=headers)
+        filters = {
+            'type': entity_type,
+            'parent_id': parent_id,
+            'id': entity_id,
+            'ancestor_id': ancestor_id
+        }
+        params = {name: value for name, value in filters.items() if value}
+        response = session.get(TOOL_API_ENDPOINT + '/entities', headers=headers, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
         return response.text
     else:
         return '{}'
@@ -213,18 +258,22 @@ def get_site_info(site_id: str) -> str:
 
 
 @tool
-def get_timeseries_data(entity_id: str, property: str, start_time: str, end_time: str) -> Dict[str, Any]:
+def get_timeseries_data(entity_id: str, property: str, start_time: str, end_time: str, interval: int = 0, agg: str = "mean") -> Dict[str, Any]:
     """
     Get timeseries data for a specific entity and property within a given time range.
 
     This function retrieves time-series values for a specified property of an entity
-    within the provided time window.
+    within the provided time window. Raw values are 10 minutes apart; use interval and agg
+    to get one aggregated value per interval instead, eg: interval=86400, agg="max" for daily maximums.
+    Long ranges are downsampled automatically to at most 5000 values.
 
     Args:
         entity_id (str): Unique identifier for the entity. Example: "0e4b4070-50ff-11ef-b4ce-d5aee9e495ad" this is NOT the name like "Inverter5"
         property (str): Name of the property to retrieve values for. Example: "power"
         start_time (str): Start date time string for the data range
         end_time (str): End date time string for the data range
+        interval (int): Optional spacing of the returned values in seconds, a multiple of 600
+        agg (str): Aggregation of the values within an interval: "mean", "min" or "max"
 
     Returns:
         dict: Dictionary containing timeseries data in the format:
@@ -247,30 +296,89 @@ def get_timeseries_data(entity_id: str, property: str, start_time: str, end_time
         }
     """
 
+    return fetch_timeseries([entity_id], property, start_time, end_time, interval, agg)[entity_id]
+
+
+@tool
+def get_timeseries_data_many(entity_ids: List[str], property: str, start_time: str, end_time: str, interval: int = 0, agg: str = "mean") -> Dict[str, Dict[str, Any]]:
+    """
+    Get timeseries data of the same property for several entities within a given time range.
+
+    ALWAYS use this instead of calling get_timeseries_data in a loop, eg: for every zone sensor of a floor.
+    The entities are fetched concurrently, which is much faster than one call per entity.
+
+    Args:
+        entity_ids (List[str]): Unique identifiers of the entities, NOT their names
+        property (str): Name of the property to retrieve values for. Example: "temperature"
+        start_time (str): Start date time string for the data range
+        end_time (str): End date time string for the data range
+        interval (int): Optional spacing of the returned values in seconds, a multiple of 600
+        agg (str): Aggregation of the values within an interval: "mean", "min" or "max"
+
+    Returns:
+        dict: One entry per entity id, each in the get_timeseries_data format.
+            An entity that could not be fetched has an empty data list and an "error".
+
+    Example:
+        >>> get_timeseries_data_many(["gf-ts-1", "gf-ts-2"], "temperature", "2024-01-01 00:00:00", "2024-01-01 00:10:00")
+        {
+            "gf-ts-1": {"data": [{"time": 1704067200, "value": 21.5}, {"time": 1704067800, "value": 21.7}]},
+            "gf-ts-2": {"data": [{"time": 1704067200, "value": 19.2}, {"time": 1704067800, "value": 19.4}]}
+        }
+    """
+    return fetch_timeseries(list(dict.fromkeys(entity_ids)), property, start_time, end_time, interval, agg)
+
+
+def fetch_timeseries(entity_ids: List[str], property: str, start_time: str, end_time: str, interval: int = 0, agg: str = "mean") -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch the timeseries of several entities: batches of TIMESERIES_BATCH_SIZE entities per
+    request, with up to MAX_CONCURRENT_REQUESTS requests in flight on the shared session.
+    """
     ID_TOKEN = os.environ.get('ID_TOKEN', '')
     TOOL_API_ENDPOINT = os.environ.get('TOOL_API_ENDPOINT', '')
-    if ID_TOKEN != "":
-        #invoke the HTTP GET API to get the site info
-        headers = {
-            'id_token': ID_TOKEN
-        }
+    if ID_TOKEN == "":
+        return {entity_id: {"data": []} for entity_id in entity_ids}
+
+    #invoke the HTTP GET API to get the timeseries
+    headers = {
+        'id_token': ID_TOKEN
+    }
+
+    def fetch_batch(batch):
         params = {
-            'entity_id': entity_id,
+            'entity_id': ','.join(batch),
             'property': property,
             'start_time': start_time,
-            'end_time': end_time
+            'end_time': end_time,
+            'agg': agg,
+            #columnar responses are about half the size of the row format
+            'format': 'columnar'
         }
-
-        response = requests.get(
-            TOOL_API_ENDPOINT + '/timeseries',
-            headers=headers,
-            params=params
-        )
-        return json.loads(response.text)
-    else:
+        if interval:
+            params['interval'] = interval
+        try:
+            response = session.get(
+                TOOL_API_ENDPOINT + '/timeseries',
+                headers=headers,
+                params=params,
+                timeout=REQUEST_TIMEOUT_SECONDS
+            )
+            response.raise_for_status()
+            series = json.loads(response.text)['series']
+        except Exception as e:
+            error = response.text if isinstance(e, requests.HTTPError) else str(e)
+            return {entity_id: {"data": [], "error": error} for entity_id in batch}
         return {
-            "data": []
+            s['entity_id']: {"data": [{"time": t, "value": v} for t, v in zip(s['times'], s['values'])]}
+            for s in series
         }
-    
-    
-       
+
+    batches = [entity_ids[i:i + TIMESERIES_BATCH_SIZE] for i in range(0, len(entity_ids), TIMESERIES_BATCH_SIZE)]
+    results = {}
+    if len(batches) == 1:
+        results.update(fetch_batch(batches[0]))
+    else:
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(batches))) as executor:
+            for batch_result in executor.map(fetch_batch, batches):
+                results.update(batch_result)
+    return results
@@ -18,8 +18,109 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 '''
 
-#This is a dummy API which will return a predefined entity_hierarchy
+import json
+import os
+from collections import defaultdict
+
+HIERARCHY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'entity_hierarchy_hvac.min.json')
+
+#Filters accepted as query string parameters. Values can be comma separated lists
+FILTERS = ('id', 'type', 'parent_id', 'ancestor_id')
+
+
+class EntityIndex:
+    """
+    The entity hierarchy indexed by id, type, parent and ancestor path.
+
+    Built once per container; queries return flat entity summaries instead of the nested tree.
+    """
+
+    def __init__(self, root):
+        self.by_id = {}
+        self.by_type = defaultdict(list)
+        self.children = defaultdict(list)
+        self.parent = {}
+        self.ancestors = {}
+
+        #iterative walk, so deep hierarchies do not hit the recursion limit
+        stack = [(root, None, [])]
+        while stack:
+            entity, parent_id, ancestors = stack.pop()
+            entity_id = entity['id']['id']
+            self.by_id[entity_id] = entity
+            self.by_type[entity['type']].append(entity_id)
+            self.parent[entity_id] = parent_id
+            self.ancestors[entity_id] = ancestors
+            if parent_id is not None:
+                self.children[parent_id].append(entity_id)
+            child_ancestors = ancestors + [entity_id]
+            for child in reversed(entity.get('children', [])):
+                stack.append((child['entity'], entity_id, child_ancestors))
+
+    def summary(self, entity_id):
+        """An entity without its subtree, with its parent, ancestor ids and name path."""
+        entity = self.by_id[entity_id]
+        result = {key: value for key, value in entity.items() if key != 'children'}
+        ancestors = self.ancestors[entity_id]
+        result['parent_id'] = self.parent[entity_id]
+        result['ancestor_ids'] = ancestors
+        result['path'] = ' / '.join([self.by_id[a]['name'] for a in ancestors] + [entity['name']])
+        result['child_count'] = len(self.children.get(entity_id, []))
+        return result
+
+    def query(self, ids=None, types=None, parent_ids=None, ancestor_ids=None):
+        """Ids of the entities matching every given filter, in hierarchy order."""
+        candidates = None
+        for matches in (
+            ids and [i for i in ids if i in self.by_id],
+            types and [i for t in types for i in self.by_type.get(t, [])],
+            parent_ids and [i for p in parent_ids for i in self.children.get(p, [])],
+        ):
+            if matches is None:
+                continue
+            matches = set(matches or [])
+            candidates = matches if candidates is None else candidates & matches
+        if ancestor_ids:
+            ancestor_ids = set(ancestor_ids)
+            pool = self.by_id if candidates is None else candidates
+            candidates = {i for i in pool if ancestor_ids.intersection(self.ancestors[i])}
+        if candidates is None:
+            candidates = self.by_id
+        return [i for i in self.by_id if i in candidates]
+
+
+#Parsed once per container and reused by warm invocations
+with open(HIERARCHY_FILE, 'r') as f:
+    HIERARCHY_JSON = f.read()
+ENTITY_INDEX = EntityIndex(json.loads(HIERARCHY_JSON))
+
+
+def parse_filters(event):
+    params = (event or {}).get('queryStringParameters') or {}
+    filters = {}
+    for name in FILTERS:
+        value = params.get(name)
+        if value:
+            filters[name] = [v.strip() for v in value.split(',') if v.strip()]
+    return filters
+
+
+#This is a dummy API which will return a predefined entity_hierarchy.
+#Without query parameters it returns the whole nested tree. With id, type, parent_id or
+#ancestor_id it returns only the matching entities as a flat list.
 def lambda_handler(event, context):
 
-    with open('entity_hierarchy_hvac.min.json', 'r') as f:
-        return f.read()
+    filters = parse_filters(event)
+    if not filters:
+        return HIERARCHY_JSON
+
+    entity_ids = ENTITY_INDEX.query(
+        ids=filters.get('id'),
+        types=filters.get('type'),
+        parent_ids=filters.get('parent_id'),
+        ancestor_ids=filters.get('ancestor_id')
+    )
+    return json.dumps({
+        "count": len(entity_ids),
+        "entities": [ENTITY_INDEX.summary(entity_id) for entity_id in entity_ids]
+    })
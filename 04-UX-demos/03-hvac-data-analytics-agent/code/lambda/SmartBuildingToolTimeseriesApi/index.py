@@ -17,38 +17,125 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 '''
-import time
-from datetime import datetime
-from typing import Dict, Any
-import random
-import os
 import json
+import math
+import random
+from array import array
+from datetime import datetime
+
+#Spacing of the raw samples, in seconds
+RAW_INTERVAL = 600
+#Upper bounds that keep the payload and latency independent of the requested range
+MAX_POINTS = 5000
+MAX_TOTAL_POINTS = 50000
+MAX_ENTITIES = 50
+MAX_SAMPLES_PER_BUCKET = 12
+AGGREGATIONS = {
+    'mean': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def plan_buckets(start_ts, end_ts, interval, series_count=1):
+    """
+    Number of raw samples in the range and the number of raw samples per returned point.
+
+    The requested interval is rounded up to a multiple of RAW_INTERVAL, and widened
+    further when a series would return more than MAX_POINTS points, or the whole
+    request more than MAX_TOTAL_POINTS.
+    """
+    raw_count = (end_ts - start_ts) // RAW_INTERVAL + 1
+    step = max(math.ceil(interval / RAW_INTERVAL), 1)
+    step = max(step, math.ceil(raw_count / MAX_POINTS), math.ceil(raw_count * series_count / MAX_TOTAL_POINTS))
+    return raw_count, step
+
 
-#This is a dummy API which will return a set of random timeseries data
+def generate_series(start_ts, raw_count, step, agg):
+    """Columnar times and values of one series: one point per bucket of step raw samples."""
+    uniform = random.uniform
+    times = array('q', range(start_ts, start_ts + raw_count * RAW_INTERVAL, step * RAW_INTERVAL))
+    if step == 1:
+        values = array('d', [round(uniform(18, 24), 2) for _ in range(raw_count)])
+        return times, values
+
+    aggregate = AGGREGATIONS[agg]
+    values = array('d')
+    for bucket in range(len(times)):
+        size = min(step, raw_count - bucket * step)
+        #the data is synthetic, so a bounded sample of the bucket stands in for all of it
+        samples = [uniform(18, 24) for _ in range(min(size, MAX_SAMPLES_PER_BUCKET))]
+        values.append(round(aggregate(samples), 2))
+    return times, values
+
+
+def parse_request(params):
+    try:
+        entity_ids = [e.strip() for e in params['entity_id'].split(',') if e.strip()]
+        property_name = params['property']
+        start_time = params['start_time']
+        end_time = params['end_time']
+    except KeyError as e:
+        raise BadRequest(f"Missing query parameter {e}")
+    if not entity_ids or len(entity_ids) > MAX_ENTITIES:
+        raise BadRequest(f"Between 1 and {MAX_ENTITIES} entity ids are allowed")
+
+    try:
+        # Convert string times to timestamps
+        start_ts = int(datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S").timestamp())
+        end_ts = int(datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S").timestamp())
+        interval = int(params.get('interval') or RAW_INTERVAL)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    if end_ts < start_ts:
+        raise BadRequest("end_time is before start_time")
+
+    agg = params.get('agg', 'mean')
+    if agg not in AGGREGATIONS:
+        raise BadRequest(f"agg must be one of {', '.join(AGGREGATIONS)}")
+    #a single entity keeps the original row format unless columnar output is requested
+    output_format = params.get('format') or ('rows' if len(entity_ids) == 1 else 'columnar')
+    if output_format not in ('rows', 'columnar'):
+        raise BadRequest("format must be rows or columnar")
+    return entity_ids, property_name, start_ts, end_ts, interval, agg, output_format
+
+
+#This is a dummy API which will return a set of random timeseries data.
+#entity_id can be a comma separated list; interval (seconds) and agg=mean|min|max
+#downsample the 10 minute samples. Responses hold at most MAX_POINTS points per series
+#and MAX_TOTAL_POINTS in total.
 def lambda_handler(event, context):
 
-    
-    end_time =  event['queryStringParameters']['end_time']
-    entity_id =  event['queryStringParameters']['entity_id']
-    property_name =  event['queryStringParameters']['property']
-    start_time =  event['queryStringParameters']['start_time'] 
-
-    # Convert string times to timestamps
-    start_ts = int(datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S").timestamp())
-    end_ts = int(datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S").timestamp())
-    
-    # Generate data points every 10 minutes
-    interval = 600  # 10 minutes in seconds
-    data = []
-    
-    current_ts = start_ts
-    while current_ts <= end_ts:
-        data.append({
-            "time": current_ts,
-            "value": round(random.uniform(18, 24), 2)
+    params = event.get('queryStringParameters') or {}
+    try:
+        entity_ids, property_name, start_ts, end_ts, interval, agg, output_format = parse_request(params)
+    except BadRequest as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    raw_count, step = plan_buckets(start_ts, end_ts, interval, len(entity_ids))
+    series = []
+    for entity_id in entity_ids:
+        times, values = generate_series(start_ts, raw_count, step, agg)
+        series.append({
+            "entity_id": entity_id,
+            "property": property_name,
+            "times": times.tolist(),
+            "values": values.tolist()
+        })
+
+    if output_format == 'rows':
+        return json.dumps({
+            "data" : [{"time": t, "value": v} for t, v in zip(series[0]["times"], series[0]["values"])]
         })
-        current_ts += interval
-        
     return json.dumps({
-        "data" : data
-    })
\ No newline at end of file
+        "interval": step * RAW_INTERVAL,
+        "agg": agg if step > 1 else None,
+        "series": series
+    }, separators=(',', ':'))
@@ -0,0 +1,155 @@
+'''
+Benchmark of the agent thread storage with moto's in-memory S3.
+
+Replays threads of N turns and compares:
+
+  - full:  the previous storage, which downloads and re-uploads threads/<thread_id>.json
+           with every message on each turn
+  - delta: ConversationStore, which writes one segment per turn and compacts periodically,
+           measured both with a warm container (LRU hit) and a cold one on every turn, and
+           with the agent's sliding window trimming its messages as the default
+           conversation manager does
+
+Reports bytes read and written, S3 requests and time per turn, and checks that a cold
+load returns every message of every turn.
+
+Usage:
+    pip install moto boto3
+    python scripts/benchmark_conversation_store.py --turns 200 --threads 5
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code', 'lambda', 'STAgentMain'))
+from conversation_store import ConversationStore, appended_messages  # noqa: E402
+
+BUCKET = 'benchmark-agent-bucket'
+#window_size of the default SlidingWindowConversationManager of the agent
+WINDOW_SIZE = 40
+SYSTEM_PROMPT = 'You are a smart data analytics assistant. ' * 20
+
+
+def turn_messages(turn):
+    """A user question, a tool round trip and the answer, roughly the size of a real turn."""
+    return [
+        {"role": "user", "content": [{"text": f"Question {turn}: what is the average temperature of the ground floor zones?"}]},
+        {"role": "assistant", "content": [{"toolUse": {"toolUseId": f"t{turn}", "name": "execute_code",
+                                                        "input": {"code": "data = get_timeseries_data_many(ids, 'temperature', start, end)\n" * 10}}}]},
+        {"role": "user", "content": [{"toolResult": {"toolUseId": f"t{turn}", "content": [{"text": "21.4 " * 200}]}}]},
+        {"role": "assistant", "content": [{"text": "The average temperature of the ground floor zones is 21.4 degrees. " * 5}]},
+    ]
+
+
+class MeteredS3:
+    """Counts requests and payload bytes of the S3 calls used by the stores."""
+
+    def __init__(self, client):
+        self.client = client
+        self.requests = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def get_object(self, **kwargs):
+        self.requests += 1
+        response = self.client.get_object(**kwargs)
+        body = response['Body'].read()
+        self.bytes_read += len(body)
+        response['Body'] = _Body(body)
+        return response
+
+    def put_object(self, **kwargs):
+        self.requests += 1
+        self.bytes_written += len(kwargs['Body'])
+        return self.client.put_object(**kwargs)
+
+    def list_objects_v2(self, **kwargs):
+        self.requests += 1
+        return self.client.list_objects_v2(**kwargs)
+
+    def delete_objects(self, **kwargs):
+        self.requests += 1
+        return self.client.delete_objects(**kwargs)
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+def run_full(s3, thread_id, turns):
+    key = f"threads/{thread_id}.json"
+    for turn in range(turns):
+        try:
+            messages = json.loads(s3.get_object(Bucket=BUCKET, Key=key)['Body'].read())['messages']
+        except s3.client.exceptions.NoSuchKey:
+            messages = []
+        messages += turn_messages(turn)
+        body = json.dumps({"messages": messages, "system_prompt": SYSTEM_PROMPT}).encode('utf-8')
+        s3.put_object(Bucket=BUCKET, Key=key, Body=body, ContentType='application/json')
+    return len(messages)
+
+
+def run_delta(s3, thread_id, turns, warm, window=None):
+    store = ConversationStore(s3, BUCKET)
+    for turn in range(turns):
+        if not warm:
+            store = ConversationStore(s3, BUCKET)
+        state = store.load(thread_id)
+        #the agent's own list, trimmed to the window before and after the turn
+        agent_messages = list(state.messages)
+        if window:
+            del agent_messages[:-window]
+        agent_messages += turn_messages(turn)
+        if window:
+            del agent_messages[:-window]
+        store.append(thread_id, state, appended_messages(agent_messages, state.messages), SYSTEM_PROMPT)
+    return len(ConversationStore(s3, BUCKET).load(thread_id).messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the agent thread storage')
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+    with mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        print(f"{args.threads} threads x {args.turns} turns")
+        for name, run in (
+            ('full', lambda s3, thread_id: run_full(s3, thread_id, args.turns)),
+            ('delta (cold)', lambda s3, thread_id: run_delta(s3, thread_id, args.turns, warm=False)),
+            ('delta (warm)', lambda s3, thread_id: run_delta(s3, thread_id, args.turns, warm=True)),
+            ('delta (window)', lambda s3, thread_id: run_delta(s3, thread_id, args.turns, warm=True, window=WINDOW_SIZE)),
+        ):
+            s3 = MeteredS3(client)
+            start = time.perf_counter()
+            for index in range(args.threads):
+                count = run(s3, f"{name.replace(' ', '').strip('()')}-{index}")
+                assert count == args.turns * 4, count
+            elapsed = time.perf_counter() - start
+            total_turns = args.turns * args.threads
+            print(
+                f"{name:<15} "
+                f"read {s3.bytes_read / total_turns / 1024:9.1f} KiB/turn  "
+                f"written {s3.bytes_written / total_turns / 1024:8.1f} KiB/turn  "
+                f"requests {s3.requests / total_turns:5.2f}/turn  "
+                f"time {elapsed / total_turns * 1000:7.2f} ms/turn"
+            )
+
+
+if __name__ == '__main__':
+    main()
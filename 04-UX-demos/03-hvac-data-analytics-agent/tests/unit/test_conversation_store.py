@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'lambda', 'STAgentMain'))
+from conversation_store import ConversationStore  # noqa: E402
+
+BUCKET = 'test-agent-bucket'
+
+
+def turn_messages(turn):
+    return [
+        {"role": "user", "content": [{"text": f"Question {turn}"}]},
+        {"role": "assistant", "content": [{"text": f"Answer {turn}"}]},
+    ]
+
+
+class TestConversationStore(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        self.s3_client = boto3.client('s3', region_name='us-east-1')
+        self.s3_client.create_bucket(Bucket=BUCKET)
+
+    def store(self):
+        return ConversationStore(self.s3_client, BUCKET, compact_every=20)
+
+    def run_turns(self, store, turns):
+        for turn in turns:
+            state = store.load('thread')
+            store.append('thread', state, turn_messages(turn), 'prompt')
+
+    def test_turns_of_one_container(self):
+        store = self.store()
+        self.run_turns(store, range(45))
+        self.assertEqual(store.load('thread').messages, [m for turn in range(45) for m in turn_messages(turn)])
+
+    def test_cache_behind_two_compactions(self):
+        first, second = self.store(), self.store()
+        self.run_turns(first, range(5))
+        #the second container compacts twice, deleting the segments after the cache of the first
+        self.run_turns(second, range(5, 45))
+
+        expected = [m for turn in range(45) for m in turn_messages(turn)]
+        self.assertEqual(self.store().load('thread').messages, expected)
+        self.assertEqual(first.load('thread').messages, expected)
+
+        self.run_turns(first, [45])
+        self.assertEqual(self.store().load('thread').messages, expected + turn_messages(45))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Benchmark for the SQLite query tool
+
+Builds a synthetic wealth-management database with millions of investment rows and
+compares the previous implementation of run_sqlite_query (a new connection per call,
+fetchall and a per-column copy of every row) with the pooled, read-only, streaming
+implementation. Reports the median latency per call and the peak Python memory of
+one call for each query.
+
+Usage:
+    python benchmark_sqlite_tool.py --rows 2000000
+    python benchmark_sqlite_tool.py --rows 5000000 --database /tmp/bench.db --repeat 20
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from src.tools.sqllite_tool import execute_sqlite_query
+
+ASSET_TYPES = ["Stocks", "Bonds", "ETF", "Mutual Fund", "Real Estate", "Crypto"]
+
+
+def build_database(path: str, rows: int):
+    """Create the client and investment tables with `rows` investments."""
+    clients = max(rows // 100, 1)
+    with sqlite3.connect(path) as conn:
+        conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE client (
+                client_id INTEGER PRIMARY KEY NOT NULL,
+                first_name TEXT,
+                last_name TEXT,
+                age INTEGER,
+                risk_tolerance TEXT
+            );
+            CREATE TABLE investment (
+                investment_id INTEGER PRIMARY KEY NOT NULL,
+                client_id INTEGER,
+                asset_type TEXT,
+                investment_amount REAL,
+                current_value REAL,
+                purchase_date VARCHAR
+            );
+        """)
+        rng = random.Random(42)
+        conn.executemany(
+            "INSERT INTO client VALUES (?, ?, ?, ?, ?)",
+            ((i, f"First{i}", f"Last{i}", rng.randint(20, 90), rng.choice(["Conservative", "Moderate", "Aggressive"]))
+             for i in range(1, clients + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO investment VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, rng.randint(1, clients), rng.choice(ASSET_TYPES), round(rng.uniform(1000, 100000), 2),
+              round(rng.uniform(500, 150000), 2), f"20{rng.randint(10, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+             for i in range(1, rows + 1)),
+        )
+        conn.execute("CREATE INDEX idx_investment_client ON investment (client_id)")
+
+
+def legacy_query(database_path: str, query: str):
+    """The previous run_sqlite_query read path."""
+    with sqlite3.connect(database_path) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        columns = [description[0] for description in cursor.description] if cursor.description else []
+        data = []
+        for row in rows:
+            item = {}
+            for column in columns:
+                value = row[column]
+                item[column] = value if value is not None else None
+            data.append(item)
+        return {"success": True, "data": data, "query": query}
+
+
+def measure(fn, repeat: int):
+    """Return the median latency and the peak traced memory of fn()."""
+    fn()  # warm up caches and the connection pool
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(latencies), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite query tool")
+    parser.add_argument("--rows", type=int, default=2000000, help="Number of investment rows")
+    parser.add_argument("--database", type=str, default=None, help="Database file to create or reuse")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per query")
+    parser.add_argument("--max-rows", type=int, default=10000, help="Row budget of the new implementation")
+    args = parser.parse_args()
+
+    database_path = args.database or os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    if not os.path.exists(database_path):
+        print(f"Building {database_path} with {args.rows} investments...")
+        start = time.perf_counter()
+        build_database(database_path, args.rows)
+        print(f"Built in {time.perf_counter() - start:.1f}s")
+
+    config = {
+        "sqlite_database_path": database_path,
+        "sqlite_max_rows": args.max_rows,
+    }
+    queries = {
+        "point lookup": f"SELECT * FROM investment WHERE investment_id = {args.rows // 2}",
+        "aggregate": "SELECT asset_type, COUNT(*) AS n, SUM(current_value) AS total FROM investment GROUP BY asset_type",
+        "join, ~1k rows": (
+            "SELECT c.first_name, c.last_name, i.asset_type, i.current_value FROM client c "
+            "JOIN investment i ON i.client_id = c.client_id WHERE c.client_id BETWEEN 1 AND 10"
+        ),
+        "full scan": "SELECT * FROM investment",
+    }
+
+    print(f"{'query':<16} {'impl':<8} {'median ms':>10} {'peak MiB':>10} {'rows':>9}")
+    for name, query in queries.items():
+        implementations = {
+            "legacy": lambda: legacy_query(database_path, query),
+            "records": lambda: execute_sqlite_query(query, config=config),
+            "columns": lambda: execute_sqlite_query(query, result_format="columns", config=config),
+        }
+        for impl, fn in implementations.items():
+            result = fn()
+            data = result["data"]
+            rows = len(data) if isinstance(data, list) else len(next(iter(data.values()), []))
+            latency, peak = measure(fn, args.repeat if name != "full scan" else max(args.repeat // 5, 1))
+            print(f"{name:<16} {impl:<8} {latency * 1000:>10.2f} {peak / 1024 / 1024:>10.1f} {rows:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -33,9 +33,25 @@ def get_config() -> Dict[str, Any]:
         # Athena Configuration
         "athena_database": os.environ.get("ATHENA_DATABASE", ""),
         "athena_output_location": os.environ.get("ATHENA_OUTPUT_LOCATION", ""),
+        "athena_workgroup": os.environ.get("ATHENA_WORKGROUP", ""),
+        "athena_result_reuse_minutes": int(os.environ.get("ATHENA_RESULT_REUSE_MINUTES", "0")),  # 0 disables reuse
+        "athena_query_timeout_seconds": float(os.environ.get("ATHENA_QUERY_TIMEOUT_SECONDS", "300")),
+        "athena_result_fetch": os.environ.get("ATHENA_RESULT_FETCH", "auto"),  # auto, api or s3
+        "athena_max_rows": int(os.environ.get("ATHENA_MAX_ROWS", "10000")),
+        "athena_max_bytes": int(os.environ.get("ATHENA_MAX_BYTES", str(1024 * 1024))),
+
+        # SQLite Configuration
+        "sqlite_database_path": os.environ.get("SQLITE_DATABASE_PATH", "./data/wealthmanagement.db"),
+        "sqlite_immutable": os.environ.get("SQLITE_IMMUTABLE", "false").lower() == "true",  # only if the file never changes
+        "sqlite_mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "sqlite_pool_size": int(os.environ.get("SQLITE_POOL_SIZE", "4")),
+        "sqlite_statement_cache_size": int(os.environ.get("SQLITE_STATEMENT_CACHE_SIZE", "128")),
+        "sqlite_max_rows": int(os.environ.get("SQLITE_MAX_ROWS", "10000")),
         
         # Knowledge Base Configuration
         "knowledge_base_id": os.environ.get("KNOWLEDGE_BASE_ID", ""),
+        "schema_cache_ttl_seconds": float(os.environ.get("SCHEMA_CACHE_TTL_SECONDS", "3600")),
+        "schema_version": os.environ.get("SCHEMA_VERSION", ""),  # change to invalidate cached schemas
 
     }
     
@@ -3,107 +3,303 @@ Athena Query Tool for executing SQL queries.
 """
 from strands import tool
 import boto3
+import codecs
+import csv
 import time
 import logging
 import os
 import json
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Polling backoff while a query runs: small queries finish in well under a second
+POLL_INITIAL_DELAY_SECONDS = 0.05
+POLL_MAX_DELAY_SECONDS = 2.0
+POLL_BACKOFF_FACTOR = 1.5
+
+# Rows per get_query_results page (API maximum)
+RESULTS_PAGE_SIZE = 1000
+
+
+@lru_cache(maxsize=None)
+def _get_client(service_name: str, region_name: str):
+    """
+    Return a boto3 client shared by all calls for the given service and region.
+
+    Args:
+        service_name: AWS service name (athena, s3)
+        region_name: AWS region
+
+    Returns:
+        boto3 client
+    """
+    return boto3.client(service_name, region_name=region_name)
+
+
+def _start_query(athena_client, query: str, config: Dict[str, Any]) -> str:
+    """
+    Start a query execution, with the optional workgroup and result reuse settings.
+
+    Args:
+        athena_client: Athena client
+        query: SQL query string to execute
+        config: Configuration from get_config
+
+    Returns:
+        str: The query execution ID
+    """
+    request = {
+        "QueryString": query,
+        "QueryExecutionContext": {
+            "Database": config['athena_database']
+        }
+    }
+    if config.get('athena_output_location'):
+        request["ResultConfiguration"] = {
+            "OutputLocation": config['athena_output_location']
+        }
+    if config.get('athena_workgroup'):
+        request["WorkGroup"] = config['athena_workgroup']
+    if config.get('athena_result_reuse_minutes', 0) > 0:
+        # Serve repeated queries from a previous result instead of scanning again
+        request["ResultReuseConfiguration"] = {
+            "ResultReuseByAgeConfiguration": {
+                "Enabled": True,
+                "MaxAgeInMinutes": config['athena_result_reuse_minutes']
+            }
+        }
+    response = athena_client.start_query_execution(**request)
+    return response['QueryExecutionId']
+
+
+def _wait_for_query(athena_client, query_execution_id: str, timeout_seconds: float) -> Dict[str, Any]:
+    """
+    Poll a query execution with exponential backoff until it reaches a final state.
+
+    The query is cancelled if it is still running after timeout_seconds.
+
+    Args:
+        athena_client: Athena client
+        query_execution_id: ID of the query execution
+        timeout_seconds: Maximum time to wait
+
+    Returns:
+        Dict: The QueryExecution description of the final state
+    """
+    deadline = time.monotonic() + timeout_seconds
+    delay = POLL_INITIAL_DELAY_SECONDS
+    while True:
+        response = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
+        execution = response['QueryExecution']
+        state = execution['Status']['State']
+        if state in ('SUCCEEDED', 'FAILED', 'CANCELLED'):
+            logger.info(f"Query {query_execution_id} {state.lower()}")
+            return execution
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning(f"Query {query_execution_id} still {state} after {timeout_seconds}s, cancelling it")
+            athena_client.stop_query_execution(QueryExecutionId=query_execution_id)
+            execution['Status']['State'] = 'CANCELLED'
+            execution['Status']['StateChangeReason'] = f"Query timed out after {timeout_seconds} seconds"
+            return execution
+
+        logger.debug(f"Query state: {state}, polling again in {delay:.2f}s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * POLL_BACKOFF_FACTOR, POLL_MAX_DELAY_SECONDS)
+
+
+def _iter_api_pages(athena_client, query_execution_id: str, page_size: int = RESULTS_PAGE_SIZE) -> Iterator[Tuple[List[str], List[List[Optional[str]]], bool]]:
+    """
+    Iterate over all get_query_results pages.
+
+    Args:
+        athena_client: Athena client
+        query_execution_id: ID of the query execution
+        page_size: Rows requested per page
+
+    Yields:
+        Tuple of (columns, rows of the page, whether more pages follow)
+    """
+    columns = None
+    next_token = None
+    while True:
+        request = {"QueryExecutionId": query_execution_id, "MaxResults": page_size}
+        if next_token:
+            request["NextToken"] = next_token
+        results = athena_client.get_query_results(**request)
+        rows = results['ResultSet']['Rows']
+        if columns is None:
+            columns = [col['Label'] for col in results['ResultSet']['ResultSetMetadata']['ColumnInfo']]
+            # The first row of the first page is the header of SELECT results
+            if rows and [value.get('VarCharValue') for value in rows[0]['Data']] == columns:
+                rows = rows[1:]
+        next_token = results.get('NextToken')
+        yield columns, [[value.get('VarCharValue') for value in row['Data']] for row in rows], bool(next_token)
+        if not next_token:
+            return
+
+
+def _iter_s3_csv_rows(s3_client, output_location: str) -> Iterator[List[Optional[str]]]:
+    """
+    Stream the rows of a query's CSV result file from S3, without the header.
+
+    Athena quotes every non-null value, so unquoted empty fields are nulls. The csv
+    module does not expose quoting, so empty fields are returned as None.
+
+    Args:
+        s3_client: S3 client
+        output_location: s3://bucket/key of the result file
+
+    Yields:
+        List of column values of each row
+    """
+    bucket, key = output_location[len("s3://"):].split("/", 1)
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    lines = codecs.iterdecode(body.iter_lines(keepends=True), 'utf-8')
+    reader = csv.reader(lines)
+    next(reader, None)  # header
+    for row in reader:
+        yield [value if value != "" else None for value in row]
+
+
+def _iter_rows(execution: Dict[str, Any], config: Dict[str, Any]) -> Iterator[Tuple[List[str], List[Optional[str]]]]:
+    """
+    Iterate over all result rows of a succeeded query.
+
+    With the "auto" fetch mode the first page comes from get_query_results, so small
+    results need a single API call; when more pages follow and the result is a CSV
+    file, the remaining rows are streamed from S3 instead of paging 1000 rows at a time.
+
+    Args:
+        execution: QueryExecution description of the succeeded query
+        config: Configuration from get_config
+
+    Yields:
+        Tuple of (columns, row values)
+    """
+    region = config['aws_region']
+    athena_client = _get_client('athena', region)
+    query_execution_id = execution['QueryExecutionId']
+    fetch_mode = config.get('athena_result_fetch', 'auto')
+    output_location = execution.get('ResultConfiguration', {}).get('OutputLocation', '')
+    can_stream = output_location.startswith('s3://') and output_location.endswith('.csv')
+
+    stream_only = fetch_mode == 's3' and can_stream
+    pages = _iter_api_pages(athena_client, query_execution_id, page_size=2 if stream_only else RESULTS_PAGE_SIZE)
+    columns, rows, has_more = next(pages)
+    if stream_only:
+        # The first page was only needed for the column labels
+        rows = []
+    else:
+        for row in rows:
+            yield columns, row
+        if not has_more:
+            return
+        if fetch_mode == 'api' or not can_stream:
+            for columns, rows, _ in pages:
+                for row in rows:
+                    yield columns, row
+            return
+
+    logger.info(f"Streaming results of {query_execution_id} from {output_location}")
+    s3_rows = _iter_s3_csv_rows(_get_client('s3', region), output_location)
+    for index, row in enumerate(s3_rows):
+        if index >= len(rows):
+            yield columns, row
+
+
+def _collect_rows(execution: Dict[str, Any], config: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Collect result rows as dictionaries, within the configured row and byte budget.
+
+    Args:
+        execution: QueryExecution description of the succeeded query
+        config: Configuration from get_config
+
+    Returns:
+        Tuple of (rows, whether the budget truncated the result)
+    """
+    max_rows = config.get('athena_max_rows', 10000)
+    max_bytes = config.get('athena_max_bytes', 1024 * 1024)
+    data = []
+    size = 0
+    for columns, row in _iter_rows(execution, config):
+        size += sum(len(value) for value in row if value is not None) + len(row)
+        if len(data) >= max_rows or (size > max_bytes and data):
+            return data, True
+        data.append(dict(zip(columns, row)))
+    return data, False
+
+
 @tool
 def run_athena_query(query: str) -> Dict[str, Any]:
     """
     Execute a SQL query on Amazon Athena.
-    
+
     Uses boto3 to execute the query on Athena and returns the results.
-    
+
     Args:
         query: SQL query string to execute
-    
+
     Returns:
         Dict containing either query results or error information
     """
-    try:    
-        # Create Athena client using the environment variables
+    try:
+        # Athena client using the environment variables
         # AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, and AWS_SESSION_TOKEN
         # are automatically used by boto3
         from config import get_config
         config = get_config()
-        
-        athena_client = boto3.client('athena', region_name=config['aws_region'])
-        
+
+        athena_client = _get_client('athena', config['aws_region'])
+
         # Start query execution
         logger.info(f"Executing Athena query: {query}")
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={
-                'Database': config['athena_database']
-            },
-            ResultConfiguration={
-                'OutputLocation': config['athena_output_location']
-            }
-        )
-        
-        query_execution_id = response['QueryExecutionId']
+        query_execution_id = _start_query(athena_client, query, config)
         logger.info(f"Query execution ID: {query_execution_id}")
-        
+
         # Wait for query to complete
-        max_retries = 20  # Avoid infinite loops
-        retries = 0
-
-        while retries < max_retries:
-            response = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
-            state = response['QueryExecution']['Status']['State']
-            if state == 'SUCCEEDED':
-                print("Query succeeded!")
-                break
-            elif state in ['FAILED', 'CANCELLED']:
-                print(f"Query {state.lower()}.")
-                break
-            else:
-                print(f"Query state: {state}, sleeping for 10 seconds")
-                time.sleep(2)
-                retries += 1
-        
+        execution = _wait_for_query(athena_client, query_execution_id, config['athena_query_timeout_seconds'])
+        status = execution['Status']
+
         # Check final state
-        if state == 'SUCCEEDED':
-            # Get query results
-            results = athena_client.get_query_results(QueryExecutionId=query_execution_id)
-            
-            # Process results
-            columns = [col['Label'] for col in results['ResultSet']['ResultSetMetadata']['ColumnInfo']]
-            rows = results['ResultSet']['Rows'][1:]  # Skip header row
-            
-            data = []
-            for row in rows:
-                item = {}
-                for i, value in enumerate(row['Data']):
-                    # Handle null values
-                    if 'VarCharValue' in value:
-                        item[columns[i]] = value['VarCharValue']
-                    else:
-                        item[columns[i]] = None
-                data.append(item)
-            
-            return {
+        if status['State'] == 'SUCCEEDED':
+            data, truncated = _collect_rows(execution, config)
+            statistics = execution.get('Statistics', {})
+
+            result = {
                 "success": True,
                 "data": data,
-                "query": query
+                "query": query,
+                "statistics": {
+                    "data_scanned_bytes": statistics.get('DataScannedInBytes'),
+                    "engine_execution_time_ms": statistics.get('EngineExecutionTimeInMillis'),
+                    "reused_previous_result": statistics.get('ResultReuseInformation', {}).get('ReusedPreviousResult', False)
+                }
             }
+            if truncated:
+                result["truncated"] = True
+                result["message"] = (
+                    f"The result is too large, it has been truncated to the first {len(data)} rows. "
+                    "Add filters or aggregations to reduce it."
+                )
+            return result
         else:
             # Query failed
-            error_message = response['QueryExecution']['Status'].get('StateChangeReason', 'Query failed with an Unknown error')
-            error_details = response['QueryExecution']['Status'].get('AthenaError', "Query failed with an Unknown Athena error")
-            logger.error(f"Query failed response: {response['QueryExecution']['Status']}")
-            
+            error_message = status.get('StateChangeReason', 'Query failed with an Unknown error')
+            error_details = status.get('AthenaError', "Query failed with an Unknown Athena error")
+            logger.error(f"Query failed response: {status}")
+
             return {
                 "success": False,
                 "error": error_message,
                 "athena_error_details": error_details,
                 "query": query
             }
-    
+
     except Exception as e:
         logger.exception("Error executing Athena query")
         return {
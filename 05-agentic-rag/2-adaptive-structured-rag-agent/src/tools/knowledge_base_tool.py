@@ -6,6 +6,9 @@ import boto3
 import logging
 import os
 import json
+import threading
+import time
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
 
 logger = logging.getLogger(__name__)
@@ -152,8 +155,143 @@ WEALTH_MANAGEMENT_SCHEMA = [
     }
 ]
 
+class SchemaIndex:
+    """
+    Precomputed lookups over a list of table schema definitions.
+
+    Every table block and the full schema text are formatted once, so lookups by
+    table or column name are dictionary reads.
+    """
+
+    def __init__(self, schema_data: List[Dict[str, Any]]):
+        """
+        Build the index.
+
+        Args:
+            schema_data: List of table schema definitions
+        """
+        self.table_blocks = {}
+        self.column_tables = {}
+        for table in schema_data:
+            table_key = table["table_name"].lower()
+            self.table_blocks[table_key] = _format_table_schema(table)
+            for column in table["columns"]:
+                self.column_tables.setdefault(column["Name"].lower(), []).append(table_key)
+        self.all_tables = "Database: wealthmanagement-db\n\n" + "".join(
+            block + "\n\n" for block in self.table_blocks.values()
+        )
+
+    def format(self, table_name: str = None) -> str:
+        """
+        Return the formatted schema of one table, or of all tables.
+
+        When table_name is not a table but a column name, the tables containing
+        that column are returned.
+
+        Args:
+            table_name: Optional name of a specific table
+
+        Returns:
+            str: Formatted schema information
+        """
+        if not table_name:
+            return self.all_tables
+        block = self.table_blocks.get(table_name.lower())
+        if block is not None:
+            return block
+        tables = self.column_tables.get(table_name.lower())
+        if tables:
+            return "\n\n".join(self.table_blocks[table] for table in tables)
+        return f"No schema information found for table: {table_name}"
+
+    def tables_with_column(self, column_name: str) -> List[str]:
+        """
+        Return the names of the tables containing a column.
+
+        Args:
+            column_name: Column name
+
+        Returns:
+            List[str]: Table names
+        """
+        return list(self.column_tables.get(column_name.lower(), []))
+
+
+class SchemaCache:
+    """
+    TTL cache of schema text retrieved from the knowledge base.
+
+    Entries are tagged with the schema version they were retrieved under; changing
+    the version (SCHEMA_VERSION or set_version) invalidates all of them at once.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, version: str = ""):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Time after which an entry is retrieved again
+            version: Current schema version
+        """
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        """
+        Return a cached schema, or None when missing, expired or from another version.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, version, value = entry
+            if version != self.version or expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key: tuple, value: str):
+        """Cache a schema under the current version."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, self.version, value)
+
+    def set_version(self, version: str):
+        """Switch to a new schema version, invalidating entries of other versions."""
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+
+    def invalidate(self, key: tuple = None):
+        """Drop one entry, or all entries."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+SCHEMA_CACHE = SchemaCache()
+
+
+@lru_cache(maxsize=None)
+def _get_bedrock_client(region_name: str):
+    """
+    Return the bedrock-agent-runtime client shared by all calls for a region.
+
+    Args:
+        region_name: AWS region
+
+    Returns:
+        boto3 client
+    """
+    return boto3.client('bedrock-agent-runtime', region_name=region_name)
+
+
 @tool
-def get_schema(flag: bool = False, table_name: str = None) -> str:
+def get_schema(flag: bool = False, table_name: str = None, refresh: bool = False) -> str:
     """
     Retrieve schema information from a knowledge base.
     
@@ -163,6 +301,7 @@ def get_schema(flag: bool = False, table_name: str = None) -> str:
     Args:
         table_name: Optional name of a specific table to retrieve schema for.
                    If None, returns all tables in the knowledge base.
+        refresh: Query the knowledge base again even if the schema is cached.
     
     Returns:
         str: Schema information formatted for the LLM context.
@@ -171,7 +310,7 @@ def get_schema(flag: bool = False, table_name: str = None) -> str:
         # For testing purposes, check if we should use mock data
         if flag == True:
             logger.info("get_schema called with flag=True")
-            return _format_schema_from_data(WEALTH_MANAGEMENT_SCHEMA, table_name)
+            return WEALTH_MANAGEMENT_SCHEMA_INDEX.format(table_name)
         
         # Get knowledge base ID from environment
         from config import get_config
@@ -180,11 +319,21 @@ def get_schema(flag: bool = False, table_name: str = None) -> str:
         
         if not knowledge_base_id or knowledge_base_id == "default-kb-id":
             logger.warning("No knowledge base ID provided, using mock schema data")
-            return _format_schema_from_data(WEALTH_MANAGEMENT_SCHEMA, table_name)
+            return WEALTH_MANAGEMENT_SCHEMA_INDEX.format(table_name)
+
+        # Serve from the cache unless the schema version changed or a refresh is requested
+        SCHEMA_CACHE.ttl_seconds = config['schema_cache_ttl_seconds']
+        SCHEMA_CACHE.set_version(config['schema_version'])
+        cache_key = (knowledge_base_id, table_name.lower() if table_name else None)
+        if not refresh:
+            cached_schema = SCHEMA_CACHE.get(cache_key)
+            if cached_schema is not None:
+                logger.debug(f"Schema cache hit for {cache_key}")
+                return cached_schema
         
         # Create Bedrock client
         logger.debug(f"Connecting to knowledge base: {knowledge_base_id}")
-        bedrock_client = boto3.client('bedrock-agent-runtime', region_name=config['aws_region'])
+        bedrock_client = _get_bedrock_client(config['aws_region'])
         
         # Prepare the query
         query = f"Describe the schema for {table_name} table" if table_name else "Describe all tables and their schemas"
@@ -204,22 +353,24 @@ def get_schema(flag: bool = False, table_name: str = None) -> str:
         )
         
         # Process and format the response
-        schema_info = ""
-        for result in response.get('retrievalResults', []):
-            if 'content' in result and 'text' in result['content']:
-                schema_info += result['content']['text'] + "\n\n"
+        schema_info = "".join(
+            result['content']['text'] + "\n\n"
+            for result in response.get('retrievalResults', [])
+            if 'content' in result and 'text' in result['content']
+        )
 
         if not schema_info:
             logger.warning("No schema information retrieved from knowledge base, using mock data")
-            return _format_schema_from_data(WEALTH_MANAGEMENT_SCHEMA, table_name)
+            return WEALTH_MANAGEMENT_SCHEMA_INDEX.format(table_name)
         
         logger.info("Successfully retrieved schema from knowledge base")
+        SCHEMA_CACHE.put(cache_key, schema_info)
         return schema_info
         
     except Exception as e:
         logger.exception(f"Error retrieving schema from knowledge base: {e}")
         # Fall back to the provided schema
-        return _format_schema_from_data(WEALTH_MANAGEMENT_SCHEMA, table_name)
+        return WEALTH_MANAGEMENT_SCHEMA_INDEX.format(table_name)
 
 
 def _format_schema_from_data(schema_data: List[Dict[str, Any]], table_name: str = None) -> str:
@@ -233,19 +384,9 @@ def _format_schema_from_data(schema_data: List[Dict[str, Any]], table_name: str
     Returns:
         str: Formatted schema information
     """
-    if table_name:
-        # Filter for the specific table
-        table_info = next((table for table in schema_data if table["table_name"].lower() == table_name.lower()), None)
-        if not table_info:
-            return f"No schema information found for table: {table_name}"
-        
-        return _format_table_schema(table_info)
-    else:
-        # Return all tables
-        result = "Database: wealthmanagement-db\n\n"
-        for table in schema_data:
-            result += _format_table_schema(table) + "\n\n"
-        return result
+    if schema_data is WEALTH_MANAGEMENT_SCHEMA:
+        return WEALTH_MANAGEMENT_SCHEMA_INDEX.format(table_name)
+    return SchemaIndex(schema_data).format(table_name)
 
 
 def _format_table_schema(table_info: Dict[str, Any]) -> str:
@@ -258,23 +399,29 @@ def _format_table_schema(table_info: Dict[str, Any]) -> str:
     Returns:
         str: Formatted table schema
     """
-    result = f"Table: {table_info['table_name']}\n"
-    result += f"Description: {table_info['table_description']}\n"
-    result += "Columns:\n"
-    
-    for column in table_info["columns"]:
-        result += f"- {column['Name']} ({column['Type']}): {column['Comment']}\n"
+    lines = [
+        f"Table: {table_info['table_name']}",
+        f"Description: {table_info['table_description']}",
+        "Columns:",
+    ]
+    lines.extend(f"- {column['Name']} ({column['Type']}): {column['Comment']}" for column in table_info["columns"])
     
     # Add relationship information
     if "relationships" in table_info:
-        result += "Relationships:\n"
+        lines.append("Relationships:")
         
         if "primary_key" in table_info["relationships"]:
             pk_cols = [pk["column_name"] for pk in table_info["relationships"]["primary_key"]]
-            result += f"- Primary Key: {', '.join(pk_cols)}\n"
+            lines.append(f"- Primary Key: {', '.join(pk_cols)}")
         
         if "foreign_keys" in table_info["relationships"]:
-            for fk in table_info["relationships"]["foreign_keys"]:
-                result += f"- Foreign Key: {fk['join_on_column']} references {fk['table_name']}\n"
+            lines.extend(
+                f"- Foreign Key: {fk['join_on_column']} references {fk['table_name']}"
+                for fk in table_info["relationships"]["foreign_keys"]
+            )
     
-    return result
+    return "\n".join(lines) + "\n"
+
+
+# Built once at import: fallback lookups never reformat the schema
+WEALTH_MANAGEMENT_SCHEMA_INDEX = SchemaIndex(WEALTH_MANAGEMENT_SCHEMA)
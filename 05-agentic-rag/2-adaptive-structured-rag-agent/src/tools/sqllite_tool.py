@@ -5,28 +5,248 @@ from strands import tool
 import sqlite3
 import logging
 import os
-from typing import Dict, Any, Optional
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-@tool
-def run_sqlite_query(query: str) -> Dict[str, Any]:
+# Rows fetched from SQLite per fetchmany call
+FETCH_SIZE = 500
+
+
+class SQLiteReadOnlyPool:
     """
-    Execute a SQL query on SQLite database.
-    
-    Uses sqlite3 to execute the query on local SQLite database and returns the results.
-    
+    Pool of read-only connections to one SQLite database file.
+
+    Connections are opened with a mode=ro URI (plus immutable=1 when the file never
+    changes, which also skips file locking), memory-map the database and keep a
+    prepared-statement cache, so repeated queries skip the open and parse steps.
+    """
+
+    def __init__(self, database_path: str, size: int = 4, immutable: bool = False,
+                 mmap_size: int = 256 * 1024 * 1024, statement_cache_size: int = 128):
+        """
+        Initialize the pool. Connections are opened lazily.
+
+        Args:
+            database_path: Path of the SQLite database file
+            size: Maximum number of connections
+            immutable: Open the file with immutable=1
+            mmap_size: Bytes of the database to memory-map (0 disables mmap)
+            statement_cache_size: Prepared statements cached per connection
+        """
+        self.database_path = database_path
+        self.size = size
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self.statement_cache_size = statement_cache_size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a read-only connection.
+
+        Returns:
+            sqlite3.Connection: The new connection
+        """
+        uri = f"{Path(self.database_path).resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection, blocking while all of them are in use.
+
+        Yields:
+            sqlite3.Connection: A read-only connection
+        """
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """Close the idle connections of the pool."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools: Dict[tuple, SQLiteReadOnlyPool] = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_read_only_pool(config: Dict[str, Any]) -> SQLiteReadOnlyPool:
+    """
+    Return the per-process read-only pool for the configured database.
+
+    Pools are not shared with forked children: a new process gets new connections.
+
+    Args:
+        config: Configuration from get_config
+
+    Returns:
+        SQLiteReadOnlyPool: The pool of the database
+    """
+    global _pools_pid
+    key = (
+        str(Path(config.get('sqlite_database_path', './data/wealthmanagement.db')).resolve()),
+        config.get('sqlite_immutable', False),
+    )
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLiteReadOnlyPool(
+                key[0],
+                size=config.get('sqlite_pool_size', 4),
+                immutable=key[1],
+                mmap_size=config.get('sqlite_mmap_size', 256 * 1024 * 1024),
+                statement_cache_size=config.get('sqlite_statement_cache_size', 128)
+            )
+            _pools[key] = pool
+        return pool
+
+
+def iter_query_rows(cursor: sqlite3.Cursor, max_rows: Optional[int] = None, fetch_size: int = FETCH_SIZE) -> Iterator[tuple]:
+    """
+    Stream the rows of an executed cursor in fetchmany batches.
+
+    Args:
+        cursor: Cursor of an executed query
+        max_rows: Stop after this many rows (None for all rows)
+        fetch_size: Rows fetched per batch
+
+    Yields:
+        tuple: The values of each row
+    """
+    remaining = max_rows
+    while remaining is None or remaining > 0:
+        batch = cursor.fetchmany(fetch_size if remaining is None else min(fetch_size, remaining))
+        if not batch:
+            return
+        if remaining is not None:
+            remaining -= len(batch)
+        yield from batch
+
+
+def _run_read_query(query: str, result_format: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a query on the read-only connection pool.
+
     Args:
         query: SQL query string to execute
-    
+        result_format: "records" or "columns", see execute_sqlite_query
+        config: Configuration from get_config
+
+    Returns:
+        Dict containing the query results, truncated to sqlite_max_rows rows
+
+    Raises:
+        sqlite3.OperationalError: SQLITE_READONLY when the statement writes
+    """
+    max_rows = config.get('sqlite_max_rows', 10000)
+    with get_read_only_pool(config).connection() as conn:
+        cursor = conn.execute(query)
+        try:
+            # Get column names
+            columns = [description[0] for description in cursor.description] if cursor.description else []
+            # One row past the budget tells whether the result was truncated
+            rows = list(iter_query_rows(cursor, max_rows + 1))
+        finally:
+            cursor.close()
+
+    truncated = len(rows) > max_rows
+    if truncated:
+        del rows[max_rows:]
+
+    if result_format == "columns":
+        data = {column: list(values) for column, values in zip(columns, zip(*rows))} if rows else {column: [] for column in columns}
+    else:
+        data = [dict(zip(columns, row)) for row in rows]
+
+    logger.info(f"Query succeeded! Returned {len(rows)} rows")
+
+    result = {
+        "success": True,
+        "data": data,
+        "query": query
+    }
+    if truncated:
+        result["truncated"] = True
+        result["message"] = (
+            f"The result is too large, it has been truncated to the first {max_rows} rows. "
+            "Add filters or aggregations to reduce it."
+        )
+    return result
+
+
+def execute_sqlite_query(query: str, result_format: str = "records", config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Execute a SQL query on the SQLite database.
+
+    SELECT and WITH queries run on the read-only connection pool and return at most
+    sqlite_max_rows rows; other statements, and WITH statements that turn out to
+    write, run on a read-write connection.
+
+    Args:
+        query: SQL query string to execute
+        result_format: "records" for a list of row dictionaries, "columns" for a
+            dictionary of column name to list of values
+        config: Configuration from get_config (loaded when not given)
+
     Returns:
         Dict containing either query results or error information
     """
     try:
         # Get database path from config
-        from config import get_config
-        config = get_config()
+        if config is None:
+            from config import get_config
+            config = get_config()
         
         database_path = config.get('sqlite_database_path', './data/wealthmanagement.db')
         
@@ -43,54 +263,36 @@ def run_sqlite_query(query: str) -> Dict[str, Any]:
         # Execute query
         logger.info(f"Executing SQLite query: {query}")
         
+        # Handle different query types
+        query_upper = query.strip().upper()
+        if query_upper.startswith(('SELECT', 'WITH')):
+            try:
+                return _run_read_query(query, result_format, config)
+            except sqlite3.OperationalError as e:
+                if not _is_readonly_error(e):
+                    raise
+                # A WITH clause can prefix an INSERT, UPDATE or DELETE
+                logger.info("Query writes to the database, running it on a read-write connection")
+
         with sqlite3.connect(database_path) as conn:
-            # Enable row factory for dictionary-like access
-            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
             # Execute the query
             cursor.execute(query)
             
-            # Handle different query types
-            query_upper = query.strip().upper()
-            if query_upper.startswith(('SELECT', 'WITH')):
-                # For SELECT queries, fetch results
-                rows = cursor.fetchall()
-                
-                # Get column names
-                columns = [description[0] for description in cursor.description] if cursor.description else []
-                
-                # Convert rows to list of dictionaries
-                data = []
-                for row in rows:
-                    item = {}
-                    for column in columns:
-                        value = row[column]
-                        # Handle None values consistently with Athena tool
-                        item[column] = value if value is not None else None
-                    data.append(item)
-                
-                logger.info(f"Query succeeded! Returned {len(data)} rows")
-                
-                return {
-                    "success": True,
-                    "data": data,
-                    "query": query
-                }
-            else:
-                # For INSERT, UPDATE, DELETE queries
-                affected_rows = cursor.rowcount
-                conn.commit()
-                
-                logger.info(f"Query succeeded! {affected_rows} rows affected")
-                
-                return {
-                    "success": True,
-                    "data": [],
-                    "affected_rows": affected_rows,
-                    "message": f"Query executed successfully. {affected_rows} rows affected.",
-                    "query": query
-                }
+            # For INSERT, UPDATE, DELETE queries
+            affected_rows = cursor.rowcount
+            conn.commit()
+            
+            logger.info(f"Query succeeded! {affected_rows} rows affected")
+            
+            return {
+                "success": True,
+                "data": [],
+                "affected_rows": affected_rows,
+                "message": f"Query executed successfully. {affected_rows} rows affected.",
+                "query": query
+            }
     
     except sqlite3.Error as e:
         # Handle SQLite-specific errors
@@ -112,6 +314,39 @@ def run_sqlite_query(query: str) -> Dict[str, Any]:
             "query": query
         }
 
+
+@tool
+def run_sqlite_query(query: str, result_format: str = "records") -> Dict[str, Any]:
+    """
+    Execute a SQL query on SQLite database.
+    
+    Uses sqlite3 to execute the query on local SQLite database and returns the results.
+    
+    Args:
+        query: SQL query string to execute
+        result_format: "records" (default) returns a list of rows as dictionaries,
+            "columns" returns a dictionary of column name to list of values, which is
+            more compact for wide results
+    
+    Returns:
+        Dict containing either query results or error information
+    """
+    return execute_sqlite_query(query, result_format=result_format)
+
+def _is_readonly_error(error: sqlite3.Error) -> bool:
+    """
+    Check whether an error was raised because a statement tried to write on a read-only connection.
+
+    Args:
+        error: Error raised by sqlite3
+
+    Returns:
+        bool: True for SQLITE_READONLY errors
+    """
+    if getattr(error, 'sqlite_errorname', None):
+        return error.sqlite_errorname.startswith('SQLITE_READONLY')
+    return 'readonly database' in str(error).lower()
+
 def _format_sqlite_error(error_message: str) -> str:
     """
     Format SQLite error messages for better readability.